@@ -1,28 +1,31 @@
+import numpy as np
 import pandas as pd
 import logging
 import re
 from datetime import datetime
-from utils import normalize_start_month, normalize_utility, normalize_zone, debug_column_headers, find_start_month_column
+from utils import normalize_start_month_series, normalize_utility, normalize_zone, debug_column_headers, find_start_month_column
+from ingest import detect_header_row, read_sheet, sheet_frame
 
-def auto_detect_header(path: str, sheet_name=0, preview_rows=10) -> int:
-    preview_df = pd.read_excel(path, sheet_name=sheet_name, header=None, nrows=preview_rows, engine="openpyxl")
-    target_cols = {"start date", "utility", "zone", "load factor"}
+def auto_detect_header(path: str, sheet_name=0, preview_rows=10, rows=None) -> int:
+    if rows is None:
+        rows = read_sheet(path, sheet_name)
     logging.info(f"Previewing first {preview_rows} rows to detect header in sheet: {sheet_name}")
-    for idx, row in preview_df.iterrows():
-        row_set = set(str(cell).strip().lower() for cell in row if pd.notnull(cell))
-        logging.debug(f"Row {idx}: {row_set}")
-        if target_cols.issubset(row_set):
-            logging.info(f"Header row detected at index: {idx}")
-            return idx
+    idx = detect_header_row(rows, {"start date", "utility", "zone", "load factor"}, preview_rows)
+    if idx is not None:
+        logging.info(f"Header row detected at index: {idx}")
+        return idx
     logging.warning(f"Could not detect header row for {path}. Defaulting to row 10.")
     return 10
 
-def load_atlantic(atlantic_path, sheet_name="AE Texas Matrix"):
+def load_atlantic(atlantic_path, sheet_name="AE Texas Matrix", rows=None):
+    """rows: the sheet's values if the workbook was already streamed (see ingest.py)."""
     logging.info(f"Loading Atlantic data from file: {atlantic_path}, sheet: {sheet_name}")
-    df = pd.read_excel(atlantic_path, sheet_name=sheet_name, header=None, engine="openpyxl")
+    if rows is None:
+        rows = read_sheet(atlantic_path, sheet_name)
+    df = sheet_frame(rows)
 
     # Attempt to detect header row by looking for known labels
-    header_row = auto_detect_header(atlantic_path, sheet_name=sheet_name)
+    header_row = auto_detect_header(atlantic_path, sheet_name=sheet_name, rows=rows)
     df.columns = df.iloc[header_row]
     df = df[header_row + 1:].reset_index(drop=True)
 
@@ -31,46 +34,37 @@ def load_atlantic(atlantic_path, sheet_name="AE Texas Matrix"):
     col = find_start_month_column(df)
     if col:
         df.rename(columns={col: "Start Month"}, inplace=True)
-        df["Start Month"] = df["Start Month"].apply(normalize_start_month)
+        df["Start Month"] = normalize_start_month_series(df["Start Month"])
     else:
         raise ValueError("Could not find or assign 'Start Month' column in Atlantic sheet.")
 
     df["Utility"] = df["Utility"].apply(normalize_utility)
     df["Zone"] = df["Zone"].apply(normalize_zone)
     df.rename(columns={"Zone": "Congestion Zone"}, inplace=True)
+    df["Load Factor"] = df["Load Factor"].str.strip().str.upper()
 
-    return df
-
-def filter_atlantic_data(df, req):
-    results = []
-
+    # Melt the term columns ('6m', '12m', ...) into one typed row per term, once per refresh
+    id_cols = ["Start Month", "Utility", "Congestion Zone", "Load Factor"]
     term_columns = [col for col in df.columns if isinstance(col, str) and col.endswith("m")]
     if not term_columns:
         logging.warning(f"Atlantic: No term columns found. Columns: {list(df.columns)}")
-        return results
-    
-    melted = df.melt(
-        id_vars=["Utility", "Congestion Zone", "Load Factor", "Start Month"],
-        value_vars=term_columns,
-        var_name="Term",
-        value_name="Price"
-    )
+        return pd.DataFrame(columns=id_cols + ["Term", "Price Cents"])
 
-    # Convert '6m' → 6, etc.
+    melted = df.melt(id_vars=id_cols, value_vars=term_columns, var_name="Term", value_name="Price")
     melted["Term"] = melted["Term"].str.replace("m", "").astype(int)
-    melted["Price"] = pd.to_numeric(melted["Price"], errors="coerce")
-    melted.dropna(subset=["Price"], inplace=True)
+    melted["Price Cents"] = (pd.to_numeric(melted["Price"], errors="coerce") * 100).round(4)
+    return melted.dropna(subset=["Price Cents"]).drop(columns="Price").reset_index(drop=True)
 
-    for _, row in melted.iterrows():
-        #if (
-        #    normalize_start_month(row["Start Month"]) == req.start_month
-        #    and row["Utility"] == normalize_utility(req.utility)
-        #    and row["Congestion Zone"] == req.congestion_zone.upper()
-        #    and row["Load Factor"] == req.load_factor.upper()
-        #):
-            results.append({
-                "rep": "Atlantic",
-                "term": int(row["Term"]),
-                "price_cents_per_kwh": round(float(row["Price"])*100, 4)
-            })
-    return results
+def atlantic_quote_rows(df):
+    """Quote store rows from the long Atlantic table. Atlantic has no volume brackets, so every row covers all volumes."""
+    quotes = df.copy()
+    quotes["Volume Min"] = -np.inf
+    quotes["Volume Max"] = np.inf
+    return quotes
+
+def filter_atlantic_data(df, req):
+    """Quotes for rows already selected from the long Atlantic table."""
+    return [
+        {"rep": "Atlantic", "term": term, "price_cents_per_kwh": price}
+        for term, price in zip(df["Term"].tolist(), df["Price Cents"].tolist())
+    ]
@@ -0,0 +1,268 @@
+"""In-process benchmarks for loading and pricing, with results saved so runs can be compared.
+
+    python benchmark.py                                   # synthetic data set (see synthetic_matrices.py)
+    python benchmark.py --start-months 60 --extra-utilities 10 --zip-exact 60000 --zip-ranges 6000
+    python benchmark.py --data-dir pricing_data --zip-map pricing_data/ZipCodeMap.xlsx
+    python benchmark.py --compare benchmark_results/<old>.json benchmark_results/<new>.json
+
+Measures refresh_pricing_data (cold: empty frame cache, warm: cached frames), load_zip_zone_map
+(cold / cached table), zip_to_zone and zips_to_zones, and /get-prices driven through the ASGI app
+(result cache misses, then hits) at --concurrency. Run from backend/; caches go to a temp directory
+and shared snapshots are disabled, so the real pricing_data/.cache is never touched.
+"""
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import asyncio
+import logging
+import argparse
+import platform
+import tempfile
+import statistics
+import subprocess
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Tuple
+
+RESULTS_DIR = "benchmark_results"
+VOLUMES = [50_000, 150_000, 250_000, 350_000, 450_000, 550_000, 650_000, 750_000, 850_000, 950_000]
+
+def _timed(fn, *args) -> float:
+    t = time.perf_counter()
+    fn(*args)
+    return time.perf_counter() - t
+
+def _summary(seconds: List[float]) -> Dict[str, Any]:
+    return {"min_s": round(min(seconds), 4), "median_s": round(statistics.median(seconds), 4), "runs_s": [round(s, 4) for s in seconds]}
+
+def _latency_summary(latencies: List[float], elapsed: float, statuses: Dict[int, int]) -> Dict[str, Any]:
+    ordered = sorted(latencies)
+
+    def pct(q: float) -> float:
+        return round(ordered[min(int(q * len(ordered)), len(ordered) - 1)] * 1000, 3)
+
+    return {
+        "requests": len(ordered),
+        "seconds": round(elapsed, 4),
+        "requests_per_s": round(len(ordered) / elapsed, 1),
+        "p50_ms": pct(0.50),
+        "p95_ms": pct(0.95),
+        "p99_ms": pct(0.99),
+        "max_ms": round(ordered[-1] * 1000, 3),
+        "statuses": {str(k): v for k, v in sorted(statuses.items())},
+    }
+
+# --- Minimal in-process ASGI client (no HTTP server, no extra dependencies) ---
+async def asgi_post_json(app, path: str, payload: Any) -> Tuple[int, bytes]:
+    body = json.dumps(payload).encode("utf-8")
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "POST", "scheme": "http",
+        "path": path, "raw_path": path.encode("latin-1"), "query_string": b"", "root_path": "",
+        "headers": [(b"host", b"benchmark"), (b"content-type", b"application/json"), (b"content-length", str(len(body)).encode("latin-1"))],
+        "client": ("127.0.0.1", 0), "server": ("benchmark", 80),
+    }
+    received = False
+    disconnected = asyncio.get_running_loop().create_future()  # never resolves; the client stays connected
+    status = 0
+    chunks: List[bytes] = []
+
+    async def receive():
+        nonlocal received
+        if not received:
+            received = True
+            return {"type": "http.request", "body": body, "more_body": False}
+        return await disconnected
+
+    async def send(message):
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+        elif message["type"] == "http.response.body":
+            chunks.append(message.get("body", b""))
+
+    await app(scope, receive, send)
+    return status, b"".join(chunks)
+
+async def _drive(app, payloads: List[Dict[str, Any]], concurrency: int) -> Dict[str, Any]:
+    latencies: List[float] = []
+    statuses: Dict[int, int] = {}
+    queue = list(reversed(payloads))
+
+    async def worker():
+        while queue:
+            payload = queue.pop()
+            t = time.perf_counter()
+            status, _ = await asgi_post_json(app, "/get-prices", payload)
+            latencies.append(time.perf_counter() - t)
+            statuses[status] = statuses.get(status, 0) + 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return _latency_summary(latencies, time.perf_counter() - started, statuses)
+
+# --- Benchmarks ---
+def bench_refresh(main, frame_cache_dir: str, repeats: int) -> Dict[str, Any]:
+    cold, warm = [], []
+    for _ in range(repeats):
+        shutil.rmtree(frame_cache_dir, ignore_errors=True)
+        cold.append(_timed(main.refresh_pricing_data, True))
+        warm.append(_timed(main.refresh_pricing_data, True))
+    snap = main.pricing_snapshot
+    return {
+        "cold": _summary(cold),
+        "warm_frame_cache": _summary(warm),
+        "frame_rows": {rep_name: len(df) for rep_name, df in snap.frames.items()},
+        "quote_store_rows": snap.store["rows"],
+    }
+
+def bench_zip_map(utils, table_cache_dir: str, repeats: int) -> Dict[str, Any]:
+    cold, warm = [], []
+    for _ in range(repeats):
+        shutil.rmtree(table_cache_dir, ignore_errors=True)
+        cold.append(_timed(utils.load_zip_zone_map, True))
+        warm.append(_timed(utils.load_zip_zone_map, True))
+    return {"cold": _summary(cold), "cached_table": _summary(warm), "counts": utils.zip_map_status()["counts"]}
+
+def bench_zip_lookup(utils, lookups: int, rng: random.Random) -> Dict[str, Any]:
+    zips = [f"{rng.randrange(100000):05d}" for _ in range(lookups)]
+    single = _timed(lambda: [utils.zip_to_zone(z) for z in zips])
+    bulk = _timed(utils.zips_to_zones, zips)
+    return {
+        "lookups": lookups,
+        "zip_to_zone_us_per_call": round(single / lookups * 1e6, 3),
+        "zips_to_zones_us_per_zip": round(bulk / lookups * 1e6, 3),
+    }
+
+def build_price_requests(main, utils, count: int, rng: random.Random) -> List[Dict[str, Any]]:
+    """Requests over the public catalog (main.request_keys, as served by /debug/catalog and used for
+    warm-up), so the spellings are those real clients send, with a ZIP that maps to the zone and a
+    random annual volume."""
+    all_zips = [f"{i:05d}" for i in range(100000)]
+    zips_by_zone: Dict[str, List[str]] = {}
+    for z, zone in zip(all_zips, utils.zips_to_zones(all_zips)):
+        if zone:
+            zips_by_zone.setdefault(utils.normalize_zone(zone), []).append(z)
+    keys = [key for key in main.request_keys(main.pricing_snapshot.store) if key[2] in zips_by_zone]
+    if not keys:
+        raise SystemExit("No catalog key has a zone reachable from the ZIP map; nothing to price.")
+    return [
+        {"start_month": start, "utility": utility, "zipcode": rng.choice(zips_by_zone[zone]), "load_factor": lf, "annual_volume": rng.choice(VOLUMES)}
+        for start, utility, zone, lf in (rng.choice(keys) for _ in range(count))
+    ]
+
+def bench_get_prices(main, payloads: List[Dict[str, Any]], concurrency: int) -> Dict[str, Any]:
+    main.cache_clear()
+    misses = asyncio.run(_drive(main.app, payloads, concurrency))
+    hits = asyncio.run(_drive(main.app, payloads, concurrency))
+    return {"concurrency": concurrency, "distinct_requests": len({json.dumps(p, sort_keys=True) for p in payloads}),
+            "cache_cold": misses, "cache_warm": hits}
+
+# --- Result files ---
+def _environment() -> Dict[str, Any]:
+    versions = {}
+    for module in ("pandas", "numpy", "openpyxl", "fastapi", "starlette", "pydantic"):
+        try:
+            versions[module] = __import__(module).__version__
+        except Exception:
+            versions[module] = None
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, timeout=10).stdout.strip() or None
+    except Exception:
+        commit = None
+    return {"git_commit": commit, "python": platform.python_version(), "platform": platform.platform(), "cpu_count": os.cpu_count(), "versions": versions}
+
+def _numeric_leaves(obj: Any, prefix: str = "") -> Dict[str, float]:
+    out: Dict[str, float] = {}
+    if isinstance(obj, dict):
+        for k, v in obj.items():
+            out.update(_numeric_leaves(v, f"{prefix}.{k}" if prefix else str(k)))
+    elif isinstance(obj, (int, float)) and not isinstance(obj, bool):
+        out[prefix] = obj
+    return out
+
+def compare(old_path: str, new_path: str) -> None:
+    with open(old_path, encoding="utf-8") as f:
+        old = _numeric_leaves(json.load(f)["results"])
+    with open(new_path, encoding="utf-8") as f:
+        new = _numeric_leaves(json.load(f)["results"])
+    width = max((len(k) for k in new), default=10)
+    for key in sorted(set(old) & set(new)):
+        change = f"{(new[key] - old[key]) / old[key] * 100:+.1f}%" if old[key] else ""
+        print(f"{key:<{width}}  {old[key]:>12}  {new[key]:>12}  {change}")
+
+def main_cli() -> None:
+    parser = argparse.ArgumentParser(description="In-process pricing API benchmarks.")
+    parser.add_argument("--data-dir", help="existing pricing directory (default: generate a synthetic one)")
+    parser.add_argument("--zip-map", help="ZIP map to use with --data-dir (default: ZIP_MAP_PATH / pricing_data)")
+    parser.add_argument("--start-months", type=int, default=12)
+    parser.add_argument("--extra-utilities", type=int, default=0)
+    parser.add_argument("--zip-exact", type=int, default=3000)
+    parser.add_argument("--zip-ranges", type=int, default=0)
+    parser.add_argument("--zip-prefixes", type=int, default=0)
+    parser.add_argument("--zip-format", choices=["xlsx", "csv"], default="xlsx")
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--lookups", type=int, default=100_000)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", help=f"result file (default: {RESULTS_DIR}/<UTC timestamp>.json)")
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"), help="print the difference between two result files and exit")
+    args = parser.parse_args()
+    if args.compare:
+        compare(*args.compare)
+        return
+
+    work = tempfile.mkdtemp(prefix="pricing-bench-")
+    try:
+        # Configuration is read at import time (also by synthetic_matrices' imports), so set it first
+        os.environ["FRAME_CACHE_DIR"] = os.path.join(work, "frames")
+        os.environ["ZIP_TABLE_CACHE_DIR"] = os.path.join(work, "zipmap")
+        os.environ["PRICING_SNAPSHOT_DIR"] = ""
+        os.environ.pop("PROFILE_ADMIN_TOKEN", None)
+        if args.data_dir:
+            data = {"data_dir": os.path.abspath(args.data_dir), "zip_map": args.zip_map}
+            os.environ["PRICING_DIR"] = args.data_dir
+            if args.zip_map:
+                os.environ["ZIP_MAP_PATH"] = args.zip_map
+        else:
+            from synthetic_matrices import generate
+            data = generate(os.path.join(work, "data"), args.start_months, args.extra_utilities, args.zip_exact,
+                            args.zip_ranges, args.zip_prefixes, args.zip_format, args.seed)
+            os.environ["PRICING_DIR"] = os.path.join(work, "data")
+            os.environ["ZIP_MAP_PATH"] = data["zip_map"]["path"]
+        os.makedirs("logs", exist_ok=True)
+        import main
+        import utils
+        logging.getLogger().setLevel(logging.WARNING)
+
+        rng = random.Random(args.seed)
+        results: Dict[str, Any] = {}
+        print("refresh_pricing_data ...", file=sys.stderr)
+        results["refresh_pricing_data"] = bench_refresh(main, os.environ["FRAME_CACHE_DIR"], args.repeats)
+        print("load_zip_zone_map ...", file=sys.stderr)
+        results["load_zip_zone_map"] = bench_zip_map(utils, os.environ["ZIP_TABLE_CACHE_DIR"], args.repeats)
+        print("zip_to_zone ...", file=sys.stderr)
+        results["zip_to_zone"] = bench_zip_lookup(utils, args.lookups, rng)
+        print("/get-prices ...", file=sys.stderr)
+        results["get_prices"] = bench_get_prices(main, build_price_requests(main, utils, args.requests, rng), args.concurrency)
+
+        report = {
+            "created": datetime.now(timezone.utc).isoformat(),
+            "environment": _environment(),
+            "params": {k: v for k, v in vars(args).items() if k not in ("out", "compare")},
+            "data": data,
+            "results": results,
+        }
+        out = args.out or os.path.join(RESULTS_DIR, datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ") + ".json")
+        os.makedirs(os.path.dirname(out) or ".", exist_ok=True)
+        with open(out, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(json.dumps(results, indent=2))
+        print(f"Saved {out}", file=sys.stderr)
+    finally:
+        shutil.rmtree(work, ignore_errors=True)
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,70 @@
+import os
+import sys
+import shutil
+import tempfile
+import numpy as np
+import pytest
+
+# Caches and shared snapshots go to a throwaway directory; these are read when the modules are imported,
+# so they are set before any test imports them. main.py opens logs/ relative to backend/.
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+_TMP = tempfile.mkdtemp(prefix="pricing-tests-")
+os.environ["FRAME_CACHE_DIR"] = os.path.join(_TMP, "frames")
+os.environ["ZIP_TABLE_CACHE_DIR"] = ""
+os.environ["PRICING_SNAPSHOT_DIR"] = ""
+os.environ["PRICING_LOAD_WORKERS"] = "1"
+os.environ.pop("PROFILE_ADMIN_TOKEN", None)
+sys.path.insert(0, BACKEND_DIR)
+os.chdir(BACKEND_DIR)
+
+from synthetic_matrices import generate  # noqa: E402
+
+def pytest_unconfigure(config):
+    shutil.rmtree(_TMP, ignore_errors=True)
+
+@pytest.fixture(scope="session")
+def synthetic_data():
+    """Manifest of a small synthetic data set (see synthetic_matrices.generate). Treat it as read-only;
+    tests that edit workbooks use pricing_dir."""
+    return generate(os.path.join(_TMP, "synthetic"), start_months=2, zip_exact=500, zip_ranges=20, zip_prefixes=20)
+
+@pytest.fixture
+def pricing_dir(tmp_path, synthetic_data):
+    """A private copy of the synthetic data set's directory."""
+    target = tmp_path / "pricing_data"
+    shutil.copytree(os.path.dirname(synthetic_data["engie"]["path"]), target)
+    return str(target)
+
+@pytest.fixture
+def pricing_app(pricing_dir, monkeypatch):
+    """main with pricing data and the ZIP map loaded from pricing_dir; the previous ZIP map is put back afterwards."""
+    import main
+    import utils
+    monkeypatch.setattr(main, "PRICING_DIR", pricing_dir)
+    monkeypatch.setattr(main, "pricing_snapshot", main.EMPTY_SNAPSHOT)
+    monkeypatch.setattr(main, "last_refresh_status", dict.fromkeys(main.last_refresh_status, None))
+    monkeypatch.setattr(main, "readiness", dict.fromkeys(main.readiness, None))
+    monkeypatch.setenv("ZIP_MAP_PATH", os.path.join(pricing_dir, "ZipCodeMap.xlsx"))
+    for name in ("_ZIP_MAP_CACHE", "_ZIP_MAP_LOADED", "_ZIP_MAP_PATH_ACTUAL"):
+        monkeypatch.setattr(utils, name, getattr(utils, name))
+    utils.load_zip_zone_map(force=True)
+    assert main.refresh_pricing_data(force=True), main.last_refresh_status
+    return main
+
+def zip_in_zone(zone):
+    """A ZIP the loaded ZIP map resolves to zone."""
+    import utils
+    zip_map = utils.load_zip_zone_map()
+    return f"{int(np.flatnonzero(zip_map['table'] == zip_map['zones'].index(zone))[0]):05d}"
+
+@pytest.fixture
+def price_request(pricing_app):
+    """A /get-prices body for a key the synthetic data quotes."""
+    start, utility, zone, load_factor = pricing_app.request_keys(pricing_app.pricing_snapshot.store)[0]
+    return {"start_month": start, "utility": utility, "zipcode": zip_in_zone(zone), "load_factor": load_factor, "annual_volume": 100000}
+
+@pytest.fixture
+def client(pricing_app):
+    """A test client for main.app; the background loader is not started."""
+    from fastapi.testclient import TestClient
+    return TestClient(pricing_app.app)
@@ -1,49 +1,77 @@
+import numpy as np
 import pandas as pd
 import logging
 import re
+from bisect import bisect_right
 from datetime import datetime
-from utils import normalize_start_month, normalize_utility, normalize_zone, resolve_utility_for_rep, debug_column_headers
+from typing import Optional
+from utils import normalize_start_month_series, normalize_utility, normalize_zone, resolve_utility_for_rep, debug_column_headers
+from ingest import detect_header_row, read_sheet, sheet_frame
 
-def auto_detect_header(path: str, sheet_name=0, preview_rows=10) -> int:
-    preview_df = pd.read_excel(path, sheet_name=sheet_name, header=None, nrows=preview_rows, engine="openpyxl")
-    target_cols = {"start month", "utility", "congestion zone", "load factor"}
-    for idx, row in preview_df.iterrows():
-        row_set = set(str(cell).strip().lower() for cell in row if pd.notnull(cell))
-        if target_cols.issubset(row_set):
-            return idx
-    raise ValueError(f"Could not detect header row for {path}")
+VOLUME_BRACKETS = [
+    (0, "0 - 199,999"),
+    (200_000, "200,000 - 399,999"),
+    (400_000, "400,000 - 599,999"),
+    (600_000, "600,000 - 799,999"),
+    (800_000, "800,000 - 999,999")
+]
+_BRACKET_THRESHOLDS = [threshold for threshold, _ in VOLUME_BRACKETS]  # ascending
 
-def load_engie(engie_path, sheet_name="All In Matrix"):
-    header_row = auto_detect_header(engie_path, sheet_name=sheet_name)
-    df = pd.read_excel(engie_path, sheet_name=sheet_name, header=header_row, engine="openpyxl")
-    df["Start Month"] = df["Start Month"].apply(normalize_start_month)
+def engie_bracket_column(annual_volume: float) -> Optional[str]:
+    """Column of the highest bracket whose threshold is <= annual_volume; None below the first bracket."""
+    i = bisect_right(_BRACKET_THRESHOLDS, annual_volume) - 1
+    return VOLUME_BRACKETS[i][1] if i >= 0 else None
+
+def auto_detect_header(path: str, sheet_name=0, preview_rows=10, rows=None) -> int:
+    if rows is None:
+        rows = read_sheet(path, sheet_name)
+    idx = detect_header_row(rows, {"start month", "utility", "congestion zone", "load factor"}, preview_rows)
+    if idx is None:
+        raise ValueError(f"Could not detect header row for {path}")
+    return idx
+
+def load_engie(engie_path, sheet_name="All In Matrix", rows=None):
+    """rows: the sheet's values if the workbook was already streamed (see ingest.py)."""
+    if rows is None:
+        rows = read_sheet(engie_path, sheet_name)
+    header_row = auto_detect_header(engie_path, sheet_name=sheet_name, rows=rows)
+    df = sheet_frame(rows, header=header_row)
+    df["Start Month"] = normalize_start_month_series(df["Start Month"])
     df["Utility"] = df["Utility"].apply(normalize_utility)
     df["Congestion Zone"] = df["Congestion Zone"].apply(normalize_zone)
+    df["Load Factor"] = df["Load Factor"].str.strip().str.upper()
     return df
 
+def engie_quote_rows(df):
+    """Long quote rows for the quote store: one per matrix row and volume bracket (prices already in cents)."""
+    key_cols = ["Start Month", "Utility", "Congestion Zone", "Load Factor", "Term"]
+    upper_bounds = [threshold for threshold, _ in VOLUME_BRACKETS[1:]] + [np.inf]
+    parts = []
+    for (threshold, col), upper in zip(VOLUME_BRACKETS, upper_bounds):
+        if col not in df.columns:
+            continue
+        price = pd.to_numeric(df[col], errors="coerce")
+        keep = df["Term"].notna() & price.notna() & (price != 0)
+        part = df.loc[keep, key_cols].copy()
+        part["Volume Min"] = float(threshold)
+        part["Volume Max"] = upper
+        part["Price Cents"] = price[keep].round(4)
+        parts.append(part)
+    if not parts:
+        return pd.DataFrame(columns=key_cols + ["Volume Min", "Volume Max", "Price Cents"])
+    long_df = pd.concat(parts, ignore_index=True)
+    long_df["Term"] = long_df["Term"].astype(int)
+    return long_df
+
 def filter_engie_data(df, req):
-    results = []
-    volume_brackets = [
-        (0, "0 - 199,999"),
-        (200_000, "200,000 - 399,999"),
-        (400_000, "400,000 - 599,999"),
-        (600_000, "600,000 - 799,999"),
-        (800_000, "800,000 - 999,999")
-    ]
-    bracket_col = None
-    for threshold, col in volume_brackets:
-        if req.annual_volume >= threshold:
-            bracket_col = col
+    bracket_col = engie_bracket_column(req.annual_volume)
+    if bracket_col is None or bracket_col not in df.columns or "Term" not in df.columns:
+        return []
 
-    for _, row in df.iterrows():
-        term = row.get("Term")
-        price = row.get(bracket_col)
-        if term is None or price is None:
-            continue
-        if price != 0:
-            results.append({
-                "rep": "Engie",
-                "term": int(term),
-                "price_cents_per_kwh": round(float(price), 4)
-            })
-    return results
+    price = pd.to_numeric(df[bracket_col], errors="coerce").to_numpy(dtype=np.float64)
+    term = pd.to_numeric(df["Term"], errors="coerce").to_numpy(dtype=np.float64)
+    keep = (price != 0) & ~np.isnan(price) & ~np.isnan(term)
+    return [
+        {"rep": "Engie", "term": t, "price_cents_per_kwh": p}
+        for t, p in zip(term[keep].astype(np.int64).tolist(), np.round(price[keep], 4).tolist())
+    ]
@@ -0,0 +1,136 @@
+import os
+import json
+import shutil
+import hashlib
+import logging
+import tempfile
+import numpy as np
+import pandas as pd
+from typing import Any, Callable, Dict, List, Optional
+
+# --- Persistent cache of normalized loader output, keyed by workbook content ---
+# One directory per (loader version, workbook sha256, loader, sheet) holding a .npy file per column.
+# Numeric and datetime columns are memory-mapped on load; string columns are stored fixed-width with
+# a null mask. Set FRAME_CACHE_DIR="" to disable.
+FRAME_CACHE_DIR = os.getenv("FRAME_CACHE_DIR", os.path.join("pricing_data", ".cache", "frames"))
+FRAME_CACHE_KEEP = int(os.getenv("FRAME_CACHE_KEEP", "12"))
+
+# Bump whenever a loader or normalizer changes its output, so stale parses are never reused
+LOADER_VERSION = 1
+
+def frame_cache_key(loader: Callable, sheet_name: Any, file_hash: str) -> str:
+    ident = f"{LOADER_VERSION}|{loader.__module__}.{loader.__qualname__}|{sheet_name}|{file_hash}"
+    return hashlib.sha1(ident.encode("utf-8")).hexdigest()[:24]
+
+def _column_kind(s: pd.Series) -> str:
+    if pd.api.types.is_bool_dtype(s.dtype) or pd.api.types.is_integer_dtype(s.dtype) or pd.api.types.is_float_dtype(s.dtype):
+        return "numeric" if isinstance(s.dtype, np.dtype) else "object"
+    if pd.api.types.is_datetime64_dtype(s.dtype) and isinstance(s.dtype, np.dtype):
+        return "numeric"
+    values = s.dropna()
+    if pd.api.types.is_string_dtype(s.dtype) and all(isinstance(v, str) for v in values):
+        return "str"
+    return "object"
+
+def _json_labels(labels: List[Any]) -> bool:
+    return all(isinstance(c, (str, int)) and not isinstance(c, bool) for c in labels)
+
+def write_frame(directory: str, df: pd.DataFrame) -> None:
+    """Write df's columns and meta.json into an existing directory. Column labels other than str/int
+    (a date or number in a header row) are pickled like object columns so they read back unchanged."""
+    labels: List[Any] = list(df.columns)
+    kinds = []
+    for i, label in enumerate(labels):
+        s = df.iloc[:, i]
+        kind = _column_kind(s)
+        if kind == "numeric":
+            np.save(os.path.join(directory, f"c{i}.npy"), s.to_numpy())
+        elif kind == "str":
+            mask = s.isna().to_numpy()
+            np.save(os.path.join(directory, f"c{i}.npy"), s.where(~mask, "").to_numpy(dtype=str))
+            np.save(os.path.join(directory, f"c{i}.mask.npy"), mask)
+        else:
+            np.save(os.path.join(directory, f"c{i}.npy"), s.to_numpy(dtype=object), allow_pickle=True)
+        kinds.append(kind)
+    if not _json_labels(labels):
+        pickled = np.empty(len(labels), dtype=object)
+        pickled[:] = labels
+        np.save(os.path.join(directory, "columns.npy"), pickled, allow_pickle=True)
+    with open(os.path.join(directory, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump({"columns": labels if _json_labels(labels) else None, "kinds": kinds, "rows": len(df)}, f)
+
+def read_frame(directory: str) -> pd.DataFrame:
+    """Frame written by write_frame. Numeric and datetime columns stay memory-mapped (read-only)."""
+    with open(os.path.join(directory, "meta.json"), encoding="utf-8") as f:
+        meta = json.load(f)
+    columns: Dict[int, pd.Series] = {}
+    for i, kind in enumerate(meta["kinds"]):
+        path = os.path.join(directory, f"c{i}.npy")
+        if kind == "numeric":
+            values = np.asarray(np.load(path, mmap_mode="r"))  # plain ndarray view over the mapping
+        elif kind == "str":
+            values = np.load(path, mmap_mode="r").astype(object)
+            values[np.load(os.path.join(directory, f"c{i}.mask.npy"))] = np.nan
+        else:
+            values = np.load(path, allow_pickle=True)
+        columns[i] = pd.Series(values, copy=False)
+    df = pd.DataFrame(columns, copy=False)
+    labels = meta["columns"]
+    if labels is None:
+        labels = np.load(os.path.join(directory, "columns.npy"), allow_pickle=True).tolist()
+    df.columns = labels
+    return df
+
+def save_frame(key: str, df: pd.DataFrame) -> bool:
+    """Write df under key atomically (temp dir + rename). Returns True if the entry exists afterwards."""
+    if not FRAME_CACHE_DIR:
+        return False
+    os.makedirs(FRAME_CACHE_DIR, exist_ok=True)
+    tmp = tempfile.mkdtemp(prefix=f".{key}.", dir=FRAME_CACHE_DIR)
+    try:
+        write_frame(tmp, df)
+        final = os.path.join(FRAME_CACHE_DIR, key)
+        if os.path.isdir(final):
+            shutil.rmtree(tmp)
+        else:
+            os.replace(tmp, final)
+    except Exception:
+        shutil.rmtree(tmp, ignore_errors=True)
+        raise
+    _prune()
+    return True
+
+def load_frame(key: str) -> Optional[pd.DataFrame]:
+    if not FRAME_CACHE_DIR:
+        return None
+    entry = os.path.join(FRAME_CACHE_DIR, key)
+    if not os.path.isfile(os.path.join(entry, "meta.json")):
+        return None
+    df = read_frame(entry)
+    os.utime(entry)  # recently used entries survive pruning
+    return df
+
+def _prune() -> None:
+    entries = [os.path.join(FRAME_CACHE_DIR, d) for d in os.listdir(FRAME_CACHE_DIR) if not d.startswith(".")]
+    entries.sort(key=os.path.getmtime, reverse=True)
+    for stale in entries[FRAME_CACHE_KEEP:]:
+        shutil.rmtree(stale, ignore_errors=True)
+
+def lookup_frame(loader: Callable, sheet_name: Any, file_hash: str, path: str) -> Optional[pd.DataFrame]:
+    """Cached output of loader for this sheet of this workbook content, or None if it must be parsed."""
+    key = frame_cache_key(loader, sheet_name, file_hash)
+    try:
+        df = load_frame(key)
+        if df is not None:
+            logging.info(f"Frame cache hit for {path} [{sheet_name}]")
+        return df
+    except Exception as e:
+        logging.warning(f"Frame cache entry {key} unreadable, re-parsing {path}: {e}")
+        return None
+
+def store_frame(loader: Callable, sheet_name: Any, file_hash: str, path: str, df: pd.DataFrame) -> bool:
+    try:
+        return save_frame(frame_cache_key(loader, sheet_name, file_hash), df)
+    except Exception as e:
+        logging.warning(f"Failed to write frame cache for {path} [{sheet_name}]: {e}")
+        return False
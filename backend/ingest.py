@@ -0,0 +1,182 @@
+import os
+import logging
+import multiprocessing
+import numpy as np
+import pandas as pd
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+from openpyxl import load_workbook
+from openpyxl.cell.cell import ERROR_CODES
+from pandas.io.parsers import TextParser
+from frame_cache import frame_cache_key, load_frame, lookup_frame, store_frame
+
+# --- Single-pass workbook ingestion ---
+# Each workbook is opened once per refresh and every sheet a loader needs is streamed from that one
+# handle as plain values. Loaders detect headers from rows already in memory instead of re-opening
+# the file, and sheet_frame() runs the rows through the same parser pd.read_excel uses, so frames
+# come out identical to read_excel's (labels, NaN handling, dtypes).
+_ERROR_CODES = frozenset(ERROR_CODES)
+
+def _sheet_rows(ws, max_rows: Optional[int] = None) -> List[list]:
+    """Cell values of one read-only sheet, converted and trimmed the way pandas' openpyxl reader does.
+    With max_rows, iteration stops after that many rows instead of reading the whole sheet."""
+    ws.reset_dimensions()  # stored dimensions are often stale; read what is actually there
+    data: List[list] = []
+    last_row_with_data = -1
+    for row_number, values in enumerate(ws.iter_rows(max_row=max_rows, values_only=True)):
+        row = [
+            "" if v is None
+            else int(v) if type(v) is float and v.is_integer()
+            else np.nan if type(v) is str and v in _ERROR_CODES
+            else v
+            for v in values
+        ]
+        while row and row[-1] == "":
+            row.pop()
+        if row:
+            last_row_with_data = row_number
+        data.append(row)
+    data = data[: last_row_with_data + 1]
+    if data:
+        width = max(len(row) for row in data)
+        for row in data:
+            if len(row) < width:
+                row.extend([""] * (width - len(row)))
+    return data
+
+def read_workbook_sheets(path: str, sheet_names: Iterable[Any], max_rows: Optional[int] = None) -> Dict[Any, List[list]]:
+    """Open path once and return {sheet: rows} for every requested sheet (name or position)."""
+    wb = load_workbook(path, read_only=True, data_only=True, keep_links=False)
+    try:
+        sheets = {}
+        for name in dict.fromkeys(sheet_names):
+            ws = wb.worksheets[name] if isinstance(name, int) else wb[name]
+            sheets[name] = _sheet_rows(ws, max_rows)
+        return sheets
+    finally:
+        wb.close()
+
+def read_sheet(path: str, sheet_name: Any = 0, max_rows: Optional[int] = None) -> List[list]:
+    return read_workbook_sheets(path, [sheet_name], max_rows)[sheet_name]
+
+def detect_header_row(rows: List[list], target_cols: Set[str], preview_rows: int = 10) -> Optional[int]:
+    """Index of the first of the leading preview_rows rows whose labels include all target_cols."""
+    for idx, row in enumerate(rows[:preview_rows]):
+        row_set = set(str(cell).strip().lower() for cell in row if cell != "" and pd.notnull(cell))
+        if target_cols.issubset(row_set):
+            return idx
+    return None
+
+def sheet_frame(rows: List[list], header: Optional[int] = None, dtype: Any = None) -> pd.DataFrame:
+    """DataFrame equivalent to pd.read_excel(..., header=header, dtype=dtype) over already streamed rows."""
+    if not rows:
+        return pd.DataFrame()
+    return TextParser(rows, header=header, dtype=dtype, skip_blank_lines=False).read()
+
+# --- Refresh entry point ---
+# Sheets that miss the frame cache are parsed in a spawn-context process pool, one workbook per task
+# (its sheets are read from a single open), so refresh takes as long as the slowest workbook rather than
+# the sum. Workers write their normalized frames to the frame cache and return only the keys; the parent
+# memory-maps the .npy columns instead of unpickling a frame. With the frame cache disabled frames come
+# back pickled. PRICING_LOAD_WORKERS=1 parses in-process the same way, and so does a refresh whose pool
+# breaks (a worker killed mid-parse) for whatever the pool did not finish.
+PRICING_LOAD_WORKERS = int(os.getenv("PRICING_LOAD_WORKERS", str(min(4, os.cpu_count() or 1))))
+
+Source = Tuple[Callable[..., pd.DataFrame], str, Any, str]  # (loader, path, sheet, file_hash)
+
+def _group_by_path(sources: Dict[str, Source], rep_names: List[str]) -> Dict[str, List[str]]:
+    by_path: Dict[str, List[str]] = defaultdict(list)
+    for rep_name in rep_names:
+        by_path[sources[rep_name][1]].append(rep_name)
+    return by_path
+
+def _load_workbook(path: str, specs: List[Tuple[Callable[..., pd.DataFrame], Any, str]]) -> List[Tuple[str, Any]]:
+    """Pool worker: open path once and parse each (loader, sheet, file_hash) in specs. Returns, per spec,
+    ("cache", key), ("frame", df) or ("error", message); only failing to open the workbook raises."""
+    sheets = read_workbook_sheets(path, [sheet for _, sheet, _ in specs])
+    results: List[Tuple[str, Any]] = []
+    for loader, sheet, file_hash in specs:
+        try:
+            df = loader(path, sheet_name=sheet, rows=sheets[sheet])
+        except Exception as e:
+            results.append(("error", f"{path} [{sheet}]: {e}"))
+            continue
+        if store_frame(loader, sheet, file_hash, path, df):
+            results.append(("cache", frame_cache_key(loader, sheet, file_hash)))
+        else:
+            results.append(("frame", df))
+    return results
+
+def _ingest_serial(sources: Dict[str, Source], rep_names: List[str], loaded: Dict[str, pd.DataFrame], errors: Dict[str, str]) -> None:
+    for path, group in _group_by_path(sources, rep_names).items():
+        try:
+            sheets = read_workbook_sheets(path, [sources[rep_name][2] for rep_name in group])
+        except Exception as e:
+            for rep_name in group:
+                errors[rep_name] = f"{path}: {e}"
+            continue
+        logging.info(f"Ingested {path} in one pass: sheets {list(sheets)}")
+        for rep_name in group:
+            loader, _, sheet, file_hash = sources[rep_name]
+            try:
+                loaded[rep_name] = loader(path, sheet_name=sheet, rows=sheets[sheet])
+            except Exception as e:
+                errors[rep_name] = f"{path} [{sheet}]: {e}"
+                continue
+            store_frame(loader, sheet, file_hash, path, loaded[rep_name])
+
+def _ingest_parallel(sources: Dict[str, Source], rep_names: List[str], loaded: Dict[str, pd.DataFrame], errors: Dict[str, str]) -> None:
+    """Raises BrokenProcessPool if a worker died; REPs already in loaded or errors are final."""
+    by_path = _group_by_path(sources, rep_names)
+    workers = min(PRICING_LOAD_WORKERS, len(by_path))
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+        futures = {
+            path: pool.submit(_load_workbook, path, [(sources[rep_name][0], sources[rep_name][2], sources[rep_name][3]) for rep_name in group])
+            for path, group in by_path.items()
+        }
+        for path, future in futures.items():
+            group = by_path[path]
+            try:
+                results = future.result()
+            except BrokenProcessPool:
+                raise
+            except Exception as e:
+                for rep_name in group:
+                    errors[rep_name] = f"{path}: {e}"
+                continue
+            logging.info(f"Ingested {path} in one pass: sheets {[sources[rep_name][2] for rep_name in group]}")
+            for rep_name, (kind, payload) in zip(group, results):
+                if kind == "error":
+                    errors[rep_name] = payload
+                    continue
+                df = load_frame(payload) if kind == "cache" else payload
+                if df is None:
+                    errors[rep_name] = f"{path} [{sources[rep_name][2]}]: frame cache entry {payload} vanished"
+                    continue
+                loaded[rep_name] = df
+
+def ingest_sources(sources: Dict[str, Source]) -> Tuple[Dict[str, pd.DataFrame], Dict[str, str]]:
+    """Load rep -> (loader, path, sheet, file_hash) specs. Returns (frames, errors): a source that fails
+    to parse lands in errors with its message and never takes the other sources down with it."""
+    loaded: Dict[str, pd.DataFrame] = {}
+    errors: Dict[str, str] = {}
+    misses: List[str] = []
+    for rep_name, (loader, path, sheet, file_hash) in sources.items():
+        df = lookup_frame(loader, sheet, file_hash, path)
+        if df is not None:
+            loaded[rep_name] = df
+        else:
+            misses.append(rep_name)
+
+    # A pool only pays off with several workbooks to parse; Engie and X-Con share one
+    if PRICING_LOAD_WORKERS > 1 and len(_group_by_path(sources, misses)) > 1:
+        try:
+            _ingest_parallel(sources, misses, loaded, errors)
+            return loaded, errors
+        except Exception as e:  # pool could not start or broke; parse whatever it did not finish in-process
+            logging.warning(f"Parallel ingest failed, falling back to in-process loading: {type(e).__name__}: {e}")
+            misses = [rep_name for rep_name in misses if rep_name not in loaded and rep_name not in errors]
+    _ingest_serial(sources, misses, loaded, errors)
+    return loaded, errors
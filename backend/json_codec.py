@@ -0,0 +1,17 @@
+import json
+from typing import Any
+
+try:
+    import orjson
+except ImportError:  # stdlib fallback: same JSON, a few times slower
+    orjson = None
+
+# --- JSON encoding for hot responses ---
+# Pricing responses are encoded once, straight to bytes, and cached that way (see quote_store.render_quotes).
+# Output matches Starlette's JSONResponse: compact separators, UTF-8, shortest round-trip floats.
+JSON_ENCODER = "orjson" if orjson is not None else "json"
+
+def dumps(obj: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
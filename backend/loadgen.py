@@ -0,0 +1,308 @@
+"""Load generator replaying quote-like traffic against a running pricing API (asyncio, stdlib only).
+
+    python loadgen.py --url http://localhost:8000 --concurrency 32 --duration 30
+    python loadgen.py --url http://localhost:8000 --rate 200 --duration 60 --mix get-prices=8,batch=1,zip-zones=1
+    python loadgen.py --serve-synthetic --start-months 24 --rate 300 --duration 30 --out run.json
+
+Requests are drawn from the server's own catalog (/debug/catalog): start month, utility, zone and
+load factor come from the keys real requests use, with popularity skewed toward the soonest start months
+(--skew), ZIPs come from the zone, volumes are log-uniform between --min-volume and --max-volume.
+--concurrency runs a closed loop (each connection sends its next request when the last returns);
+--rate runs an open loop at that many requests per second (exponential gaps with --poisson), with
+latency measured from the scheduled send time so a slow server is not hidden by a slow client.
+--serve-synthetic generates a synthetic data set (see synthetic_matrices.py), starts uvicorn on it
+locally and stops it afterwards.
+"""
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import asyncio
+import argparse
+import tempfile
+import subprocess
+import urllib.request
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+# --- Minimal HTTP/1.1 keep-alive client ---
+class HTTPConnection:
+    def __init__(self, host: str, port: int):
+        self.host, self.port = host, port
+        self.reader: Optional[asyncio.StreamReader] = None
+        self.writer: Optional[asyncio.StreamWriter] = None
+
+    async def request(self, method: str, path: str, body: bytes = b"", content_type: str = "application/json") -> Tuple[int, bytes]:
+        if self.writer is None:
+            self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+        try:
+            head = (f"{method} {path} HTTP/1.1\r\nHost: {self.host}:{self.port}\r\nContent-Type: {content_type}\r\n"
+                    f"Content-Length: {len(body)}\r\nConnection: keep-alive\r\n\r\n")
+            self.writer.write(head.encode("latin-1") + body)
+            await self.writer.drain()
+            status = int((await self.reader.readline()).split()[1])
+            headers: Dict[str, str] = {}
+            while True:
+                line = await self.reader.readline()
+                if line in (b"\r\n", b"\n", b""):
+                    break
+                name, _, value = line.decode("latin-1").partition(":")
+                headers[name.strip().lower()] = value.strip()
+            if headers.get("transfer-encoding", "").lower() == "chunked":
+                chunks = []
+                while True:
+                    size = int((await self.reader.readline()).split(b";")[0], 16)
+                    if size == 0:
+                        await self.reader.readline()
+                        break
+                    chunks.append(await self.reader.readexactly(size))
+                    await self.reader.readline()
+                payload = b"".join(chunks)
+            else:
+                payload = await self.reader.readexactly(int(headers.get("content-length", "0")))
+            if headers.get("connection", "").lower() == "close":
+                self.close()
+            return status, payload
+        except BaseException:
+            self.close()
+            raise
+
+    def close(self) -> None:
+        if self.writer is not None:
+            self.writer.close()
+        self.reader = self.writer = None
+
+def http_get_json(base_url: str, path: str, timeout: float = 30) -> Any:
+    with urllib.request.urlopen(base_url + path, timeout=timeout) as r:
+        return json.loads(r.read())
+
+def wait_ready(base_url: str, timeout: float) -> None:
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            with urllib.request.urlopen(base_url + "/readyz", timeout=5) as r:
+                if r.status == 200:
+                    return
+        except Exception:
+            pass
+        if time.monotonic() > deadline:
+            raise SystemExit(f"{base_url} did not become ready within {timeout:.0f}s")
+        time.sleep(0.5)
+
+# --- Workload ---
+class Workload:
+    """Builds request payloads from the server's catalog."""
+    def __init__(self, catalog: Dict[str, Any], args: argparse.Namespace, rng: random.Random):
+        self.rng = rng
+        self.args = args
+        self.zips = {zone: zips for zone, zips in catalog["zips_by_zone"].items() if zips}
+        self.keys = [key for key in catalog["keys"] if key[2] in self.zips]
+        if not self.keys:
+            raise SystemExit("The catalog has no key whose zone has a ZIP in the ZIP map; nothing to request.")
+        # Keys arrive upcoming start months first, soonest first; weight rank i by 1 / (i + 1) ** skew
+        self.key_weights = [1.0 / (i + 1) ** args.skew for i in range(len(self.keys))]
+        self.all_zips = [z for zips in self.zips.values() for z in zips]
+        mix = dict(part.split("=") for part in args.mix.split(","))
+        self.endpoints = list(mix)
+        self.endpoint_weights = [float(mix[name]) for name in self.endpoints]
+        unknown = set(self.endpoints) - set(ENDPOINTS)
+        if unknown:
+            raise SystemExit(f"Unknown endpoints in --mix: {sorted(unknown)} (choose from {sorted(ENDPOINTS)})")
+
+    def volume(self) -> float:
+        lo, hi = self.args.min_volume, self.args.max_volume
+        return round(lo * (hi / lo) ** self.rng.random())
+
+    def quote(self) -> Dict[str, Any]:
+        start, utility, zone, load_factor = self.rng.choices(self.keys, self.key_weights)[0]
+        zipcode = self.rng.choice(self.zips[zone])
+        if self.rng.random() < self.args.bad_zip_rate:
+            zipcode = self.rng.choice(["00000", "1234", "ABCDE"])
+        return {"start_month": start, "utility": utility, "zipcode": zipcode, "load_factor": load_factor, "annual_volume": self.volume()}
+
+    def next_request(self) -> Tuple[str, str, bytes]:
+        endpoint = self.rng.choices(self.endpoints, self.endpoint_weights)[0]
+        if endpoint == "get-prices":
+            body = self.quote()
+        elif endpoint == "batch":
+            body = [self.quote() for _ in range(self.args.batch_size)]
+        else:
+            body = [self.rng.choice(self.all_zips) for _ in range(self.args.zip_batch_size)]
+        return endpoint, ENDPOINTS[endpoint], json.dumps(body).encode("utf-8")
+
+ENDPOINTS = {"get-prices": "/get-prices", "batch": "/get-prices/batch", "zip-zones": "/zip-zones"}
+
+# --- Runners ---
+class Recorder:
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = {}
+        self.statuses: Dict[str, Dict[str, int]] = {}
+
+    def record(self, endpoint: str, status: str, seconds: float) -> None:
+        self.latencies.setdefault(endpoint, []).append(seconds)
+        counts = self.statuses.setdefault(endpoint, {})
+        counts[status] = counts.get(status, 0) + 1
+
+async def _send(conn: HTTPConnection, workload: Workload, recorder: Recorder, started: float) -> None:
+    endpoint, path, body = workload.next_request()
+    try:
+        status, _ = await conn.request("POST", path, body)
+        status = str(status)
+    except (OSError, asyncio.IncompleteReadError, ValueError, IndexError) as e:
+        status = f"error:{type(e).__name__}"
+    recorder.record(endpoint, status, time.perf_counter() - started)
+
+async def run_closed_loop(host: str, port: int, workload: Workload, recorder: Recorder, concurrency: int, deadline: float, limit: int) -> None:
+    sent = 0
+
+    async def worker():
+        nonlocal sent
+        conn = HTTPConnection(host, port)
+        while time.perf_counter() < deadline and sent < limit:
+            sent += 1
+            await _send(conn, workload, recorder, time.perf_counter())
+        conn.close()
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+
+async def run_open_loop(host: str, port: int, workload: Workload, recorder: Recorder, rate: float, poisson: bool,
+                        max_connections: int, deadline: float, limit: int, rng: random.Random) -> None:
+    idle: List[HTTPConnection] = []
+    slots = asyncio.Semaphore(max_connections)
+    tasks = set()
+
+    async def dispatch(scheduled: float):
+        async with slots:  # waiting here counts toward latency: the request was due at `scheduled`
+            conn = idle.pop() if idle else HTTPConnection(host, port)
+            await _send(conn, workload, recorder, scheduled)
+            idle.append(conn)
+
+    next_at = time.perf_counter()
+    sent = 0
+    while next_at < deadline and sent < limit:
+        delay = next_at - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        task = asyncio.create_task(dispatch(next_at))
+        tasks.add(task)
+        task.add_done_callback(tasks.discard)
+        sent += 1
+        next_at += rng.expovariate(rate) if poisson else 1.0 / rate
+    await asyncio.gather(*tasks)
+    for conn in idle:
+        conn.close()
+
+def summarize(recorder: Recorder, elapsed: float) -> Dict[str, Any]:
+    def stats(latencies: List[float], statuses: Dict[str, int]) -> Dict[str, Any]:
+        ordered = sorted(latencies)
+        total = len(ordered)
+
+        def pct(q: float) -> float:
+            return round(ordered[min(int(q * total), total - 1)] * 1000, 3)
+
+        errors = sum(n for s, n in statuses.items() if s.startswith("error") or s.startswith("5"))
+        return {
+            "requests": total,
+            "throughput_rps": round(total / elapsed, 1),
+            "p50_ms": pct(0.50), "p95_ms": pct(0.95), "p99_ms": pct(0.99), "max_ms": round(ordered[-1] * 1000, 3),
+            "error_rate": round(errors / total, 5),
+            "rejected_503": statuses.get("503", 0),
+            "client_errors_4xx": sum(n for s, n in statuses.items() if s.startswith("4")),
+            "statuses": dict(sorted(statuses.items())),
+        }
+
+    endpoints = {name: stats(recorder.latencies[name], recorder.statuses[name]) for name in sorted(recorder.latencies)}
+    merged: Dict[str, int] = {}
+    for counts in recorder.statuses.values():
+        for status, n in counts.items():
+            merged[status] = merged.get(status, 0) + n
+    everything = [s for latencies in recorder.latencies.values() for s in latencies]
+    return {"elapsed_s": round(elapsed, 3), "overall": stats(everything, merged) if everything else {}, "endpoints": endpoints}
+
+# --- Local server on synthetic data ---
+def start_synthetic_server(args: argparse.Namespace, work: str) -> subprocess.Popen:
+    from synthetic_matrices import generate
+    manifest = generate(os.path.join(work, "data"), args.start_months, args.extra_utilities, args.zip_exact, seed=args.seed)
+    env = dict(os.environ,
+               PRICING_DIR=os.path.join(work, "data"), ZIP_MAP_PATH=manifest["zip_map"]["path"],
+               FRAME_CACHE_DIR=os.path.join(work, "frames"), ZIP_TABLE_CACHE_DIR=os.path.join(work, "zipmap"),
+               PRICING_SNAPSHOT_DIR=os.path.join(work, "snapshots"))
+    os.makedirs("logs", exist_ok=True)
+    port = urlsplit(args.url).port or 8000
+    cmd = [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(port),
+           "--workers", str(args.server_workers), "--log-level", "warning"]
+    print(f"Starting {' '.join(cmd)} on synthetic data in {work}", file=sys.stderr)
+    return subprocess.Popen(cmd, env=env)
+
+def main_cli() -> None:
+    parser = argparse.ArgumentParser(description="Replay quote-like traffic against the pricing API.")
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument("--concurrency", type=int, help="closed loop with this many connections (default 16)")
+    mode.add_argument("--rate", type=float, help="open loop at this many requests per second")
+    parser.add_argument("--poisson", action="store_true", help="exponential inter-arrival times with --rate")
+    parser.add_argument("--max-connections", type=int, default=256, help="connection cap for --rate")
+    parser.add_argument("--duration", type=float, default=30.0, help="seconds to run")
+    parser.add_argument("--requests", type=int, default=0, help="stop after this many requests (0: no limit)")
+    parser.add_argument("--mix", default="get-prices=1", help="endpoint weights, e.g. get-prices=8,batch=1,zip-zones=1")
+    parser.add_argument("--batch-size", type=int, default=50, help="sites per /get-prices/batch request")
+    parser.add_argument("--zip-batch-size", type=int, default=1000, help="ZIPs per /zip-zones request")
+    parser.add_argument("--skew", type=float, default=1.0, help="popularity skew toward early catalog keys (0: uniform)")
+    parser.add_argument("--min-volume", type=float, default=10_000)
+    parser.add_argument("--max-volume", type=float, default=2_000_000)
+    parser.add_argument("--bad-zip-rate", type=float, default=0.0, help="fraction of quotes with an unknown or malformed ZIP")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", help="write the JSON report here as well")
+    parser.add_argument("--ready-timeout", type=float, default=300)
+    parser.add_argument("--serve-synthetic", action="store_true", help="start a local server on synthetic data (run from backend/)")
+    parser.add_argument("--server-workers", type=int, default=1)
+    parser.add_argument("--start-months", type=int, default=12)
+    parser.add_argument("--extra-utilities", type=int, default=0)
+    parser.add_argument("--zip-exact", type=int, default=3000)
+    args = parser.parse_args()
+
+    base_url = args.url.rstrip("/")
+    parts = urlsplit(base_url)
+    if parts.scheme != "http":
+        raise SystemExit("Only http:// URLs are supported")
+    work = tempfile.mkdtemp(prefix="pricing-loadgen-") if args.serve_synthetic else None
+    server = start_synthetic_server(args, work) if work else None
+    try:
+        wait_ready(base_url, args.ready_timeout)
+        catalog = http_get_json(base_url, "/debug/catalog?zips_per_zone=500")
+        rng = random.Random(args.seed)
+        workload = Workload(catalog, args, rng)
+        recorder = Recorder()
+        limit = args.requests or sys.maxsize
+        started = time.perf_counter()
+        deadline = started + args.duration
+        if args.rate:
+            asyncio.run(run_open_loop(parts.hostname, parts.port or 80, workload, recorder, args.rate, args.poisson,
+                                      args.max_connections, deadline, limit, rng))
+        else:
+            asyncio.run(run_closed_loop(parts.hostname, parts.port or 80, workload, recorder, args.concurrency or 16, deadline, limit))
+        report = {
+            "url": base_url,
+            "data_version": catalog["data_version"],
+            "catalog_keys": len(workload.keys),
+            "mode": {"rate": args.rate, "poisson": args.poisson} if args.rate else {"concurrency": args.concurrency or 16},
+            "mix": args.mix,
+            **summarize(recorder, time.perf_counter() - started),
+        }
+        if args.out:
+            with open(args.out, "w", encoding="utf-8") as f:
+                json.dump(report, f, indent=2)
+        print(json.dumps(report, indent=2))
+    finally:
+        if server is not None:
+            server.terminate()
+            try:
+                server.wait(timeout=20)
+            except subprocess.TimeoutExpired:
+                server.kill()
+            shutil.rmtree(work, ignore_errors=True)
+
+if __name__ == "__main__":
+    main_cli()
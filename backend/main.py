@@ -1,10 +1,14 @@
 import re
 import os
+import io
+import csv
+import json
 import glob
 import threading
 import time
 import logging
-from fastapi.responses import JSONResponse, PlainTextResponse
+from fastapi.responses import JSONResponse, PlainTextResponse, Response, StreamingResponse
+from starlette.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
 import numpy as np
 import pandas as pd
@@ -12,11 +16,21 @@ from logging.handlers import TimedRotatingFileHandler
 from fastapi import FastAPI, HTTPException, Request, Depends, Query
 from dotenv import load_dotenv # type: ignore
 from pydantic import BaseModel
-from typing import List
+from typing import List, Optional
+from contextlib import asynccontextmanager
 from datetime import datetime, timezone
-from engie_format import load_engie, filter_engie_data
-from atlantic_format import load_atlantic, filter_atlantic_data
-from utils import normalize_start_month, normalize_utility, normalize_zone, resolve_utility_for_rep, zip_to_zone, load_zip_zone_map, zip_map_status, zip_map_peek
+from engie_format import load_engie, filter_engie_data, engie_quote_rows
+from atlantic_format import load_atlantic, filter_atlantic_data, atlantic_quote_rows
+from quote_store import RenderedQuotes, match_quote_rows, render_quotes, volume_bucket
+from json_codec import JSON_ENCODER, dumps
+from response_cache import RESULT_CACHE_SIZE, cache_get, cache_put, cache_clear, cache_stats, make_etag, etag_matches
+from pricing_snapshot import CODE_VERSION, PricingSnapshot, EMPTY_SNAPSHOT, build_snapshot, changed_sources, keep_previous_sources
+from ingest import ingest_sources
+from pricing_executor import PRICING_RETRY_AFTER, PricingOverloaded, executor_stats, run_pricing
+from profiling import ProfilingMiddleware, recent_profiles, token_valid
+from metrics import REFRESH_SECONDS, REFRESHES, REP_QUOTES, CallbackMetric, MetricsMiddleware, observe_stage, render_metrics
+from shared_snapshot import SNAPSHOT_FOLLOW_SECONDS, IncompatibleSnapshot, attach_snapshot, current_version, ensure_published, try_become_loader
+from utils import UNKNOWN_START_MONTH, cached_start_month, zip_map_loaded, normalize_start_month, normalize_utility, normalize_zone, resolve_utility_for_rep, zip_to_zone, zips_to_zones, resolve_zips, load_zip_zone_map, zip_map_status, zip_map_peek, sample_zips_by_zone, UTILITY_MAPPING
 # Uncomment if Freepoint is needed
 #from freepoint_format import load_freepoint, filter_freepoint_data
 
@@ -51,7 +65,13 @@ console_handler.setFormatter(log_formatter)
 
 logging.basicConfig(level=logging.INFO, handlers=[log_handler, console_handler])
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    start_pricing_loader()  # returns immediately; pricing data loads in the background
+    yield
+
 app = FastAPI(
+    lifespan=lifespan,
     title="Energy Pricing API",
     description="API for retrieving and comparing energy pricing data from multiple sources",
     version="1.0.0",
@@ -67,12 +87,40 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
-
-# --- In-memory pricing sources ---
-pricing_sources = {}
-engie_df = None
-xcon_df = None
-last_refresh_status = {"timestamp": None, "success": False, "error": None}
+app.add_middleware(MetricsMiddleware)
+app.add_middleware(ProfilingMiddleware)
+
+# --- In-memory pricing data ---
+# Replaced wholesale by refresh_pricing_data; readers take one reference and use only that.
+pricing_snapshot: PricingSnapshot = EMPTY_SNAPSHOT
+last_refresh_status = {"timestamp": None, "success": False, "error": None, "reloaded": [], "failed": {}, "last_check": None}
+_refresh_lock = threading.Lock()
+
+PRICING_DIR = os.getenv("PRICING_DIR", "pricing_data")
+PRICING_POLL_SECONDS = float(os.getenv("PRICING_POLL_SECONDS", "60"))
+
+# rep -> (file pattern in PRICING_DIR, loader, sheet). REPs sharing a pattern come from the same workbook.
+PRICING_SOURCES = {
+    "Engie": ("TX_MATRIX_*.xlsx", load_engie, "All In Matrix"),
+    "X-Con": ("TX_MATRIX_*.xlsx", load_engie, "X-Con Matrix"),
+    "Atlantic": ("* - AE TEXAS.xlsx", load_atlantic, "AE Texas Matrix"),
+    # Uncomment if Freepoint is needed
+    #"Freepoint": ("*_Freepoint_Matrix_Offer_ERCOT_Adj.xlsx", load_freepoint, 0),
+}
+
+# REPs that get quoted and how their frame compiles into the quote store.
+# X-Con is loaded for inspection only and is not quoted.
+QUOTE_BUILDERS = {
+    "Engie": engie_quote_rows,
+    "Atlantic": atlantic_quote_rows,
+    #"Freepoint": freepoint_quote_rows,
+}
+
+# Vendor-shaped per-request filters, kept for /debug-pricing-filters to cross-check the store
+FRAME_FILTERS = {
+    "Engie": filter_engie_data,
+    "Atlantic": filter_atlantic_data,
+}
 
 # --- Utility: Get most recent file based on pattern ---
 def get_latest_file(directory: str, pattern: str) -> str:
@@ -82,56 +130,68 @@ def get_latest_file(directory: str, pattern: str) -> str:
     return max(files, key=os.path.getmtime)
 
 # --- Load pricing data from latest files ---
-def refresh_pricing_data():
-    global engie_df, xcon_df, pricing_sources, last_refresh_status
-    try:
-        pricing_dir = "pricing_data"
-        engie_path = get_latest_file(pricing_dir, "TX_MATRIX_*.xlsx")
-        atlantic_path = get_latest_file(pricing_dir, "* - AE TEXAS.xlsx")
-        # Uncomment if Freepoint is needed
-        #freepoint_path = get_latest_file(pricing_dir, "*_Freepoint_Matrix_Offer_ERCOT_Adj.xlsx")
-
-        load_zip_zone_map()  # pre-load map; avoids first-request latency
-
-        engie_df = load_engie(engie_path, sheet_name="All In Matrix")
-        xcon_df = load_engie(engie_path, sheet_name="X-Con Matrix")
-        atlantic_df = load_atlantic(atlantic_path, sheet_name="AE Texas Matrix")
-        #freepoint_df = load_freepoint(freepoint_path, sheet_name=0)
-
-        pricing_sources = {
-            "Engie": engie_df,
-            "X-Con": xcon_df,
-            "Atlantic": atlantic_df,
-            #"Freepoint": freepoint_df,
-        }
-
-        logging.info("Successfully refreshed pricing data from latest files.")
-        last_refresh_status.update({
-            "timestamp": datetime.now(timezone.utc).isoformat(),
-            "success": True,
-            "error": None
-        })
-
-    except Exception as e:
-        logging.error(f"Failed to refresh pricing data: {e}")
-        last_refresh_status.update({
-            "timestamp": datetime.now(timezone.utc).isoformat(),
-            "success": False,
-            "error": str(e)
-        })
-
-# --- Background thread for daily refresh ---
-def schedule_daily_refresh():
-    def refresh_loop():
-        while True:
-            refresh_pricing_data()
-            time.sleep(86400)  # Sleep for 24 hours
-
-    threading.Thread(target=refresh_loop, daemon=True).start()
-
-# --- Trigger initial load and schedule ---
-refresh_pricing_data()
-schedule_daily_refresh()
+def refresh_pricing_data(force: bool = False) -> bool:
+    """Reload only the REPs whose latest source file changed in content (all of them if force) and
+    install a new snapshot that reuses everything else. Returns True if a new snapshot was installed."""
+    global pricing_snapshot, last_refresh_status
+    with _refresh_lock:
+        started = time.perf_counter()
+        try:
+            load_zip_zone_map()  # pre-load map; avoids first-request latency
+
+            latest = {rep_name: get_latest_file(PRICING_DIR, pattern) for rep_name, (pattern, _, _) in PRICING_SOURCES.items()}
+            current = pricing_snapshot
+            changed, hashes, stats = changed_sources(current, latest)
+            if force:
+                changed = list(latest)
+            last_refresh_status["last_check"] = datetime.now(timezone.utc).isoformat()
+            if not changed:
+                return False
+
+            # Sheets are parsed in parallel worker processes; one bad workbook only fails its own REPs
+            loaded, failed = ingest_sources({
+                rep_name: (PRICING_SOURCES[rep_name][1], latest[rep_name], PRICING_SOURCES[rep_name][2], hashes[latest[rep_name]])
+                for rep_name in changed
+            })
+            for rep_name, error in failed.items():
+                logging.error(f"Failed to load {rep_name} pricing, keeping its previous data: {error}")
+            if not loaded:
+                last_refresh_status.update({
+                    "timestamp": datetime.now(timezone.utc).isoformat(),
+                    "success": False,
+                    "error": "; ".join(f"{rep_name}: {error}" for rep_name, error in failed.items()),
+                    "failed": failed,
+                })
+                REFRESHES.inc(("failed",))
+                return False
+            rep_hashes = keep_previous_sources(current, latest, hashes, stats, list(failed))
+            snapshot = build_snapshot(loaded, latest, hashes, stats, rep_hashes, QUOTE_BUILDERS, base=current)
+
+            pricing_snapshot = snapshot  # the only write readers can observe
+            cache_clear()
+
+            logging.info(f"Refreshed pricing data from latest files (reloaded: {list(loaded)}, failed: {list(failed)}).")
+            last_refresh_status.update({
+                "timestamp": datetime.now(timezone.utc).isoformat(),
+                "success": not failed,
+                "error": "; ".join(f"{rep_name}: {error}" for rep_name, error in failed.items()) or None,
+                "reloaded": list(loaded),
+                "failed": failed,
+            })
+            REFRESHES.inc(("partial" if failed else "success",))
+            REFRESH_SECONDS.observe((), time.perf_counter() - started)
+            return True
+
+        except Exception as e:
+            logging.error(f"Failed to refresh pricing data (still serving version {pricing_snapshot.version}): {e}")
+            last_refresh_status.update({
+                "timestamp": datetime.now(timezone.utc).isoformat(),
+                "success": False,
+                "error": str(e),
+                "failed": {},
+            })
+            REFRESHES.inc(("failed",))
+            return False
 
 class PriceRequest(BaseModel):
     start_month: str
@@ -147,52 +207,268 @@ class PriceResult(BaseModel):
     term: int
     price_cents_per_kwh: float
 
+class BatchPriceResult(BaseModel):
+    index: int  # position of the site in the request list
+    zipcode: str
+    results: List[PriceResult] = []
+    error: Optional[str] = None
+
+UNKNOWN_ZIP_DETAIL = "Unknown ZIP code. Please verify your 5-digit ZIP."
+MAX_BATCH_SITES = int(os.getenv("MAX_BATCH_SITES", "5000"))
+
 def _resolve_zone_from_request(req: PriceRequest) -> str:
     """Derive zone strictly from ZIP. Raise if unknown."""
     zone = zip_to_zone(req.zipcode)
     if not zone:
-        raise HTTPException(status_code=422, detail="Unknown ZIP code. Please verify your 5-digit ZIP.")
+        raise HTTPException(status_code=422, detail=UNKNOWN_ZIP_DETAIL)
     return normalize_zone(zone)
 
+def _quote_key(store: dict, req: PriceRequest, zone: str) -> tuple:
+    """Normalized (start, utility, zone, LF, volume bucket); requests with equal keys get identical quotes."""
+    return (
+        normalize_start_month(req.start_month),
+        normalize_utility(req.utility),
+        normalize_zone(zone),
+        req.load_factor.strip().upper(),
+        volume_bucket(store, req.annual_volume),
+    )
+
+def _request_key(store: dict, req: PriceRequest) -> tuple:
+    """Zone from the ZIP (422 if unknown) and the normalized pricing key, timed as the zip and normalize stages."""
+    t = time.perf_counter()
+    zone = _resolve_zone_from_request(req)
+    t = observe_stage("zip", t)
+    key = _quote_key(store, req, zone)
+    observe_stage("normalize", t)
+    return key
+
+def _request_key_is_cheap(req: PriceRequest) -> bool:
+    """Building the key costs microseconds: no ZIP map load and no start-month parse (pd.to_datetime)."""
+    return zip_map_loaded() and cached_start_month(req.start_month) is not None
+
+def _price_key(store: dict, key: tuple, annual_volume: float, record_stages: bool = False) -> RenderedQuotes:
+    start, utility, zone, load_factor, _ = key
+    utilities = {rep_name: normalize_utility(resolve_utility_for_rep(utility, rep_name)) for rep_name in store["reps"]}
+    t = time.perf_counter()
+    rows = match_quote_rows(store, start, utilities, zone, load_factor, annual_volume)
+    if record_stages:
+        t = observe_stage("filter", t)
+    quotes = render_quotes(store, rows)
+    if record_stages:
+        observe_stage("format", t)
+    return quotes
+
+def _count_rep_matches(store: dict, quotes: RenderedQuotes) -> None:
+    for rep_name in store["reps"]:
+        REP_QUOTES.inc((rep_name, "match" if rep_name in quotes.reps else "no_match"))
+
+def _cached_price_key(store: dict, version: str, key: tuple, annual_volume: float) -> RenderedQuotes:
+    results = cache_get((version, key))
+    if results is None:
+        results = _price_key(store, key, annual_volume)
+        cache_put((version, key), results)
+    return results
+
+# --- Background loading, warm-up and readiness ---
+# The server accepts connections immediately; one background thread loads the pricing data, warms it,
+# then keeps polling the source files. /readyz stays 503 until the first snapshot is loaded and warmed.
+# With several uvicorn workers only the one holding the loader lock parses workbooks; the others
+# attach the snapshot it publishes (see shared_snapshot.py).
+PRICING_WARMUP_ENTRIES = int(os.getenv("PRICING_WARMUP_ENTRIES", str(RESULT_CACHE_SIZE)))
+readiness = {"warmed_version": None, "warmup_entries": 0, "warmup_seconds": None}
+_loader_started = threading.Event()
+
+def _start_month_order(start: str) -> datetime:
+    try:
+        return datetime.strptime(start, "%B %Y")
+    except ValueError:
+        return datetime.max
+
+def request_keys(store: dict) -> List[tuple]:
+    """(start month, utility, zone, load factor) keys as /get-prices normalizes real requests, for every
+    combination at least one REP quotes. Utilities are the inputs UTILITY_MAPPING knows (what the
+    frontend offers), resolved per REP like _price_key does, rather than the REPs' own spellings ("cpt").
+    Start months from this month on come first, soonest first; past months go last."""
+    quoted = {}  # (rep, store utility) -> {(start, zone, LF)}
+    for rep_name, start, utility, zone, load_factor in store["index"]:
+        if start != UNKNOWN_START_MONTH:
+            quoted.setdefault((rep_name, utility), set()).add((start, zone, load_factor))
+    keys = set()
+    for utility in {normalize_utility(name) for name in UTILITY_MAPPING}:
+        for rep_name in store["reps"]:
+            resolved = normalize_utility(resolve_utility_for_rep(utility, rep_name))
+            keys.update((start, utility, zone, load_factor) for start, zone, load_factor in quoted.get((rep_name, resolved), ()))
+    this_month = datetime.now().replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+    def order(key: tuple) -> tuple:
+        month = _start_month_order(key[0])
+        return (month < this_month, month, key)
+
+    return sorted(keys, key=order)
+
+def warm_up_snapshot(snap: PricingSnapshot) -> int:
+    """Price synthetic requests for every request_keys() key and volume bracket through the same path
+    as /get-prices, filling the result cache with ready-to-send response bodies (up to
+    PRICING_WARMUP_ENTRIES)."""
+    t0 = time.perf_counter()
+    store, version = snap.store, snap.version
+    catalog = request_keys(store)
+    volumes = store["volume_bounds"].tolist() or [0.0]
+    budget = min(PRICING_WARMUP_ENTRIES, RESULT_CACHE_SIZE)
+    warmed = 0
+    for start, utility, zone, load_factor in catalog:
+        for volume in volumes:
+            if warmed >= budget or pricing_snapshot is not snap:  # superseded; the loop warms the new one
+                break
+            req = PriceRequest(start_month=start, utility=utility, zipcode="", load_factor=load_factor, annual_volume=volume)
+            _cached_price_key(store, version, _quote_key(store, req, zone), volume)
+            warmed += 1
+    readiness.update({"warmed_version": version, "warmup_entries": warmed, "warmup_seconds": round(time.perf_counter() - t0, 3)})
+    logging.info(f"Warmed {warmed} pricing keys for version {version} in {readiness['warmup_seconds']}s")
+    return warmed
+
+_incompatible_versions = set()  # published by other code (pre-deploy); wait for the loader to republish
+
+def follow_shared_snapshot() -> bool:
+    """Install the snapshot the loader worker last published, if it differs from ours."""
+    global pricing_snapshot
+    version = current_version()
+    if version is None or version == pricing_snapshot.version or version in _incompatible_versions:
+        return False
+    load_zip_zone_map()  # like refresh_pricing_data: loaded here, before readiness, never on the event loop
+    try:
+        snapshot = attach_snapshot(version)
+    except IncompatibleSnapshot as e:
+        _incompatible_versions.add(version)
+        logging.info(f"Not attaching shared snapshot: {e}")
+        return False
+    except Exception as e:
+        logging.warning(f"Failed to attach shared snapshot {version}: {e}")
+        return False
+    with _refresh_lock:
+        pricing_snapshot = snapshot
+        cache_clear()
+    last_refresh_status.update({"timestamp": datetime.now(timezone.utc).isoformat(), "success": True, "error": None, "reloaded": [], "failed": {}})
+    logging.info(f"Attached shared pricing snapshot {version}")
+    return True
+
+def pricing_loader_loop():
+    while True:
+        interval = SNAPSHOT_FOLLOW_SECONDS
+        try:
+            if try_become_loader():
+                if pricing_snapshot.version is None:
+                    follow_shared_snapshot()  # restart: start from what the last loader published, reload only what changed
+                refresh_pricing_data()
+                ensure_published(pricing_snapshot)  # also retries a publish that failed on an earlier poll
+                interval = PRICING_POLL_SECONDS
+            else:
+                follow_shared_snapshot()
+        except Exception as e:  # never let the loader thread die; /readyz would stay 503 for good
+            logging.error(f"Pricing loader iteration failed: {e}", exc_info=True)
+        snap = pricing_snapshot
+        if snap.version is not None and readiness["warmed_version"] != snap.version:
+            try:
+                warm_up_snapshot(snap)
+            except Exception as e:
+                logging.error(f"Warm-up failed for version {snap.version}: {e}")
+                readiness["warmed_version"] = snap.version  # serve cold rather than never becoming ready
+        time.sleep(interval)
+
+def start_pricing_loader():
+    if _loader_started.is_set():
+        return
+    _loader_started.set()
+    threading.Thread(target=pricing_loader_loop, daemon=True, name="pricing-loader").start()
+
+def _require_pricing_data(snap: PricingSnapshot) -> None:
+    if snap.version is None:
+        raise HTTPException(status_code=503, detail="Pricing data is still loading.", headers={"Retry-After": "5"})
+
+def _lookup_rows(snap: PricingSnapshot, rep_name: str, df: pd.DataFrame, start: str, utility: str, zone: str, load_factor: str) -> pd.DataFrame:
+    """Rows of a REP frame matching the normalized key; empty frame if none."""
+    span = snap.indexes.get(rep_name, {}).get((start, normalize_utility(utility), zone, load_factor))
+    if span is None:
+        return df.iloc[0:0]
+    return df.iloc[span[0]:span[1]]
+
+async def _run_pricing(fn, *args):
+    """Run pricing work on the bounded pricing executor; 503 + Retry-After when it is saturated."""
+    try:
+        return await run_pricing(fn, *args)
+    except PricingOverloaded as e:
+        raise HTTPException(status_code=503, detail=f"Pricing is overloaded ({e}), retry shortly.", headers={"Retry-After": PRICING_RETRY_AFTER})
+
 @app.post("/get-prices", response_model=List[PriceResult])
-def get_prices(req: PriceRequest):
-    results = []
-    normalized_start = normalize_start_month(req.start_month)
-    normalized_zone = _resolve_zone_from_request(req)
-    normalized_lf = req.load_factor.strip().upper()
-    for rep_name, df in pricing_sources.items():
-        resolved_utility = resolve_utility_for_rep(req.utility, rep_name)
-        df_filtered = df[
-            (df["Start Month"].apply(normalize_start_month) == normalized_start) &
-            (df["Utility"].apply(normalize_utility) == normalize_utility(resolved_utility)) &
-            (df["Congestion Zone"].apply(normalize_zone) == normalized_zone) &
-            (df["Load Factor"].str.strip().str.upper() == normalized_lf)
-        ]
-
-        if df_filtered.empty:
-            logging.info(f"No matches found for {rep_name} with filters: {req}")
+async def get_prices(req: PriceRequest, request: Request):
+    snap = pricing_snapshot
+    _require_pricing_data(snap)
+    store, version = snap.store, snap.version
+    # Stages are timed into pricing_stage_seconds (filter and format are timed on the pricing worker).
+    # The key is built on the event loop only when that cannot block it; otherwise on a pricing worker.
+    if _request_key_is_cheap(req):
+        key = _request_key(store, req)
+    else:
+        key = await _run_pricing(_request_key, store, req)
+    t = time.perf_counter()
+    etag = make_etag(version, key)
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers={"ETag": etag})
+    # Cache hits are answered on the event loop; only misses take a pricing worker
+    results = cache_get((version, key))
+    t = observe_stage("cache", t)
+    if results is None:
+        results = await _run_pricing(_price_key, store, key, req.annual_volume, True)
+        cache_put((version, key), results)
+        t = time.perf_counter()
+    _count_rep_matches(store, results)
+    # The body was encoded when the key was priced; returning a Response skips response_model validation
+    body = Response(results.body, media_type="application/json", headers={"ETag": etag})
+    observe_stage("serialize", t)
+    return body
+
+@app.post("/get-prices/batch", response_model=List[BatchPriceResult])
+async def get_prices_batch(reqs: List[PriceRequest]):
+    """Price a portfolio of sites in one call. Sites sharing a pricing key are priced once.
+    An unknown ZIP fails only its own site (error set, empty results)."""
+    if len(reqs) > MAX_BATCH_SITES:
+        raise HTTPException(status_code=413, detail=f"Batch too large: {len(reqs)} sites (max {MAX_BATCH_SITES}).")
+    snap = pricing_snapshot
+    _require_pricing_data(snap)
+    body = await _run_pricing(_price_batch, snap.store, snap.version, reqs)
+    return Response(body, media_type="application/json")
+
+def _price_batch(store: dict, version: str, reqs: List[PriceRequest]) -> bytes:
+    """The batch response as JSON bytes, spliced together from each key's cached body."""
+    zones = zips_to_zones([r.zipcode for r in reqs])
+    priced = {}
+    out = []
+    unknown_zip = dumps(UNKNOWN_ZIP_DETAIL)
+    for i, (req, zone) in enumerate(zip(reqs, zones)):
+        zipcode = dumps(req.zipcode)
+        if not zone:
+            out.append(b'{"index":%d,"zipcode":%b,"results":[],"error":%b}' % (i, zipcode, unknown_zip))
             continue
-
-        if rep_name == "Engie":
-            results.extend(filter_engie_data(df_filtered, req))
-        elif rep_name == "Atlantic":
-            results.extend(filter_atlantic_data(df_filtered, req))
-        #elif rep_name == "Freepoint":
-            #results.extend(filter_freepoint_data(df_filtered, req))
-    
-    return sorted(results, key=lambda r: (r["term"], r["rep"]))
+        key = _quote_key(store, req, zone)
+        if key not in priced:
+            priced[key] = _cached_price_key(store, version, key, req.annual_volume)
+        _count_rep_matches(store, priced[key])
+        out.append(b'{"index":%d,"zipcode":%b,"results":%b,"error":null}' % (i, zipcode, priced[key].body))
+    logging.info(f"Batch priced {len(reqs)} sites using {len(priced)} unique pricing keys")
+    return b"[" + b",".join(out) + b"]"
 
 @app.post("/debug-pricing-filters")
 def debug_filters(request: PriceRequest):
     try:
         result = {}
+        snap = pricing_snapshot
         logging.info(f"Debug request: {request}")
-        logging.info(f"Available pricing sources: {list(pricing_sources.keys())}")
+        logging.info(f"Available pricing sources: {list(snap.frames.keys())}")
         normalized_start = normalize_start_month(request.start_month)
         normalized_zone = _resolve_zone_from_request(request)
         normalized_lf = request.load_factor.strip().upper()
 
-        for rep_name, df in pricing_sources.items():
+        for rep_name, df in snap.frames.items():
             try:
                 logging.info(f"Processing {rep_name}")
                 if df.empty:
@@ -204,19 +480,15 @@ def debug_filters(request: PriceRequest):
                     logging.warning(f"{rep_name}: Missing required columns: {df.columns}")
                     continue
                 
-                df = df.dropna(subset=required_cols)
                 resolved_utility = resolve_utility_for_rep(request.utility, rep_name)
-                filtered = df[
-                    (df["Start Month"].apply(normalize_start_month) == normalized_start) &
-                    (df["Utility"].apply(normalize_utility) == normalize_utility(resolved_utility)) &
-                    (df["Congestion Zone"].apply(normalize_zone) == normalized_zone) &
-                    (df["Load Factor"].str.strip().str.upper() == normalized_lf)
-                ]
+                filtered = _lookup_rows(snap, rep_name, df, normalized_start, resolved_utility, normalized_zone, normalized_lf)
                 cleaned = filtered.head(3).replace({np.nan: None}).to_dict("records")
                 result[rep_name] = {
                     "match_count": len(filtered),
                     "sample": cleaned
                 }
+                if rep_name in FRAME_FILTERS and not filtered.empty:
+                    result[rep_name]["quotes"] = FRAME_FILTERS[rep_name](filtered, request)
             except Exception as rep_err:
                 logging.error(f"Error filtering {rep_name}: {rep_err}", exc_info=True)
                 continue  # Don’t let one REP break the endpoint
@@ -233,28 +505,30 @@ def debug_filters(request: PriceRequest):
 
 @app.get("/debug/start-months")
 def debug_start_months():
+    frames = pricing_snapshot.frames
     return {
-        "Engie": sorted(engie_df["Start Month"].dropna().unique().tolist()) if engie_df is not None else [],
-        "X-Con": sorted(xcon_df["Start Month"].dropna().unique().tolist()) if xcon_df is not None else [],
-        "Atlantic": sorted(pricing_sources["Atlantic"]["Start Month"].dropna().unique().tolist()) if pricing_sources.get("Atlantic") is not None else [],
+        "Engie": sorted(frames["Engie"]["Start Month"].dropna().unique().tolist()) if frames.get("Engie") is not None else [],
+        "X-Con": sorted(frames["X-Con"]["Start Month"].dropna().unique().tolist()) if frames.get("X-Con") is not None else [],
+        "Atlantic": sorted(frames["Atlantic"]["Start Month"].dropna().unique().tolist()) if frames.get("Atlantic") is not None else [],
         # Uncomment if Freepoint is needed
-        #"Freepoint": sorted(pricing_sources["Freepoint"]["Start Month"].dropna().unique().tolist()) if pricing_sources.get("Freepoint") is not None else []
+        #"Freepoint": sorted(frames["Freepoint"]["Start Month"].dropna().unique().tolist()) if frames.get("Freepoint") is not None else []
     }
 
 @app.get("/debug/columns")
 def debug_columns():
+    frames = pricing_snapshot.frames
     return {
-        "Engie": list(engie_df.columns) if engie_df is not None else [],
-        "X-Con": list(xcon_df.columns) if xcon_df is not None else [],
-        "Atlantic": list(pricing_sources["Atlantic"].columns) if pricing_sources.get("Atlantic") is not None else [],
+        "Engie": list(frames["Engie"].columns) if frames.get("Engie") is not None else [],
+        "X-Con": list(frames["X-Con"].columns) if frames.get("X-Con") is not None else [],
+        "Atlantic": list(frames["Atlantic"].columns) if frames.get("Atlantic") is not None else [],
         # Uncomment if Freepoint is needed
-        #"Freepoint": list(pricing_sources["Freepoint"].columns) if pricing_sources.get("Freepoint") is not None else []
+        #"Freepoint": list(frames["Freepoint"].columns) if frames.get("Freepoint") is not None else []
     }
 
 @app.get("/debug/unique-values")
 def debug_unique_values():
     result = {}
-    for rep, df in pricing_sources.items():
+    for rep, df in pricing_snapshot.frames.items():
         result[rep] = {
             "Start Month": sorted(df["Start Month"].dropna().unique().tolist()),
             "Utility": sorted(df["Utility"].dropna().unique().tolist()),
@@ -263,6 +537,25 @@ def debug_unique_values():
         }
     return result
 
+@app.get("/debug/catalog")
+def debug_catalog(zips_per_zone: int = Query(100, ge=1, le=5000)):
+    """What can be quoted: the (start month, utility, zone, load factor) keys requests use (request_keys,
+    the same set warm-up primes), the volume bracket edges and sample ZIPs per zone. Used by loadgen.py
+    to build realistic requests."""
+    snap = pricing_snapshot
+    _require_pricing_data(snap)
+    store = snap.store
+    keys = request_keys(store)
+    zips_by_zone = {}
+    for zone, zips in sample_zips_by_zone(zips_per_zone).items():  # map spellings can differ ("Houston ")
+        zips_by_zone.setdefault(normalize_zone(zone), []).extend(zips)
+    return {
+        "data_version": snap.version,
+        "keys": [list(key) for key in keys],
+        "volume_bounds": store["volume_bounds"].tolist(),
+        "zips_by_zone": zips_by_zone,
+    }
+
 @app.get("/debug/zip/{zipcode}")
 def debug_zip(zipcode: str):
     from utils import normalize_zip, zip_to_zone, load_zip_zone_map
@@ -280,33 +573,160 @@ def debug_zip_lookup(zip: str = Query(..., min_length=3, max_length=10)):
     zone = zip_to_zone(zip)
     return {"zip": zip, "zone": zone}
 
+# --- Bulk ZIP → zone ---
+# Body is a JSON array of ZIPs, a CSV whose ?column= holds the ZIPs, or plain text with one ZIP per line.
+# All ZIPs are resolved in one pass over the ZIP table; the response is streamed in chunks, one result
+# per input in input order, followed by the unknown/malformed counts.
+MAX_BULK_ZIPS = int(os.getenv("MAX_BULK_ZIPS", "500000"))
+# Bodies over this are refused before parsing (by Content-Length, or while reading a chunked upload)
+MAX_BULK_ZIP_BYTES = int(os.getenv("MAX_BULK_ZIP_BYTES", str(64 * MAX_BULK_ZIPS)))
+BULK_ZIP_CHUNK = 2000
+
+async def _read_body_capped(request: Request, limit: int) -> bytes:
+    too_large = HTTPException(status_code=413, detail=f"Request body too large (max {limit} bytes).")
+    try:
+        declared = int(request.headers.get("content-length", "0"))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid Content-Length header.")
+    if declared > limit:
+        raise too_large
+    chunks = []
+    received = 0
+    async for chunk in request.stream():
+        received += len(chunk)
+        if received > limit:
+            raise too_large
+        chunks.append(chunk)
+    return b"".join(chunks)
+
+def _parse_zip_body(body: bytes, content_type: str, column: str) -> List[str]:
+    if "json" in content_type:
+        data = json.loads(body)
+        if not isinstance(data, list):
+            raise ValueError("expected a JSON array of ZIP codes")
+        return ["" if z is None else str(z) for z in data]
+    text = body.decode("utf-8-sig")
+    if "csv" in content_type:
+        rows = [row for row in csv.reader(io.StringIO(text)) if row]
+        if not rows:
+            return []
+        header = [h.strip().lower() for h in rows[0]]
+        if column.strip().lower() not in header:
+            raise ValueError(f"column '{column}' not found in CSV header {rows[0]}")
+        i = header.index(column.strip().lower())
+        return [row[i] if i < len(row) else "" for row in rows[1:]]
+    return [line.strip() for line in text.splitlines() if line.strip()]
+
+def _stream_zip_zones(zips: List[str], zip5s: List[Optional[str]], zones: List[Optional[str]]):
+    unknown = malformed = 0
+    yield b'{"results":['
+    for start in range(0, len(zips), BULK_ZIP_CHUNK):
+        items = []
+        for z, z5, zone in zip(zips[start:start + BULK_ZIP_CHUNK], zip5s[start:start + BULK_ZIP_CHUNK], zones[start:start + BULK_ZIP_CHUNK]):
+            status = "ok" if zone else "unknown" if z5 else "malformed"
+            unknown += status == "unknown"
+            malformed += status == "malformed"
+            items.append(dumps({"zip": z, "zip5": z5, "zone": zone, "status": status}))
+        yield (b"," if start else b"") + b",".join(items)
+    yield b'],"count":%d,"unknown":%d,"malformed":%d}' % (len(zips), unknown, malformed)
+
+@app.post("/zip-zones")
+async def bulk_zip_zones(request: Request, column: str = Query("zip")):
+    """Resolve many ZIPs at once (JSON array, CSV column or one per line). Status per ZIP is
+    ok, unknown (valid ZIP, not in the map) or malformed (fewer than 5 digits)."""
+    body = await _read_body_capped(request, MAX_BULK_ZIP_BYTES)
+    try:
+        zips = await run_in_threadpool(_parse_zip_body, body, request.headers.get("content-type", ""), column)
+    except (ValueError, UnicodeDecodeError, csv.Error, RecursionError) as e:  # any malformed body is the client's error
+        raise HTTPException(status_code=400, detail=f"Malformed body: {e}")
+    if len(zips) > MAX_BULK_ZIPS:
+        raise HTTPException(status_code=413, detail=f"Too many ZIPs: {len(zips)} (max {MAX_BULK_ZIPS}).")
+    zip5s, zones = await run_in_threadpool(resolve_zips, zips)
+    logging.info(f"Bulk ZIP lookup: {len(zips)} ZIPs, {len(set(zips))} distinct")
+    return StreamingResponse(_stream_zip_zones(zips, zip5s, zones), media_type="application/json")
+
 @app.post("/debug/reload-zip-map")
 def debug_reload_zip_map():
     """Force reload the ZIP→Zone map; returns count. Useful for tests."""
     try:
         m = load_zip_zone_map(force=True)
-        return {"loaded_rows": len(m)}
+        return {"loaded_rows": sum(m["counts"].values())}
     except Exception as e:
         return PlainTextResponse(str(e), status_code=500)
     
 @app.get("/debug/zip-map-peek")
-def debug_zip_map_peek():
+def debug_zip_map_peek(rows: int = Query(10, ge=1, le=100)):
     try:
-        payload = zip_map_peek()
+        payload = zip_map_peek(rows)
         return JSONResponse(payload)
     except Exception as e:
         logging.exception("zip-map-peek failed")
         return JSONResponse({"error": str(e)}, status_code=500)
 
+@app.get("/healthz")
+def healthz():
+    """Liveness: the process is up and serving HTTP, whether or not pricing data is loaded."""
+    return {"status": "ok"}
+
+@app.get("/readyz")
+def readyz():
+    """Readiness: 200 once pricing data is loaded and warmed, 503 before that."""
+    snap = pricing_snapshot
+    if snap.version is None:
+        reason = "loading" if last_refresh_status["timestamp"] is None else f"load failed: {last_refresh_status['error']}"
+    elif readiness["warmed_version"] is None:
+        reason = "warming up"
+    else:
+        return {"ready": True, "data_version": snap.version, **readiness}
+    return JSONResponse({"ready": False, "reason": reason}, status_code=503, headers={"Retry-After": "5"})
+
 @app.get("/refresh-status")
 def get_refresh_status():
     return last_refresh_status
 
+# --- Metrics ---
+def _snapshot_age_seconds():
+    built_at = pricing_snapshot.built_at
+    if built_at is None:
+        return None
+    return (datetime.now(timezone.utc) - datetime.fromisoformat(built_at)).total_seconds()
+
+CallbackMetric("pricing_snapshot_age_seconds", "Seconds since the serving pricing snapshot was built.", _snapshot_age_seconds)
+CallbackMetric("pricing_ready", "1 once pricing data is loaded and warmed.", lambda: int(readiness["warmed_version"] is not None and pricing_snapshot.version is not None))
+CallbackMetric("pricing_quote_store_rows", "Rows in the serving quote store.", lambda: pricing_snapshot.store["rows"])
+CallbackMetric("pricing_result_cache_entries", "Entries in the pricing result cache.", lambda: cache_stats()["size"])
+CallbackMetric("pricing_result_cache_lookups_total", "Result cache lookups by outcome.",
+               lambda: {("hit",): cache_stats()["hits"], ("miss",): cache_stats()["misses"]}, ("result",), "counter")
+CallbackMetric("pricing_executor_queued", "Requests waiting for a pricing worker.", lambda: executor_stats()["queued"])
+CallbackMetric("pricing_executor_rejections_total", "Requests refused by the pricing executor.",
+               lambda: {("queue_full",): executor_stats()["rejected_full"], ("stale",): executor_stats()["rejected_stale"]}, ("reason",), "counter")
+
+@app.get("/metrics")
+def metrics():
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
+@app.get("/debug/profiles")
+def debug_profiles(request: Request):
+    """Most recent request profiles (see profiling.py); requires X-Admin-Token."""
+    if not token_valid(request.headers.get("x-admin-token")):
+        raise HTTPException(status_code=403, detail="Profiling is disabled or the admin token is wrong.")
+    return recent_profiles()
+
 @app.get("/status")
 def get_status():
+    snap = pricing_snapshot
     return {
         "refresh_status": last_refresh_status,
-        "sources_loaded": list(pricing_sources.keys()),
-        "engie_rows": len(engie_df) if engie_df is not None else 0,
-        "xcon_rows": len(xcon_df) if xcon_df is not None else 0
+        "sources_loaded": list(snap.frames.keys()),
+        "engie_rows": len(snap.frames["Engie"]) if "Engie" in snap.frames else 0,
+        "xcon_rows": len(snap.frames["X-Con"]) if "X-Con" in snap.frames else 0,
+        "data_version": snap.version,
+        "code_version": CODE_VERSION,
+        "snapshot_built_at": snap.built_at,
+        "source_hashes": dict(snap.source_hashes),
+        "rep_hashes": dict(snap.rep_hashes),
+        "result_cache": cache_stats(),
+        "json_encoder": JSON_ENCODER,
+        "warmup": readiness,
+        "pricing_executor": executor_stats(),
     }
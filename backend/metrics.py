@@ -0,0 +1,142 @@
+import time
+import bisect
+import threading
+from typing import Any, Callable, Dict, List, Sequence, Tuple
+from profiling import record_stage
+
+# --- In-process metrics registry, rendered in the Prometheus text format at /metrics ---
+# Counters and histograms keep a dict of label tuples -> values behind one lock each; recording is a
+# bisect plus a few additions, a microsecond or so. Gauges and other values that already live
+# elsewhere (snapshot age, executor stats) are registered as callbacks and read only at scrape time.
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+STAGE_BUCKETS = (0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.1)
+REFRESH_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+
+_REGISTRY: List[Any] = []
+
+class Counter:
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()):
+        self.name, self.help, self.labels = name, help, tuple(labels)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+        _REGISTRY.append(self)
+
+    def inc(self, labels: Tuple[str, ...] = (), amount: float = 1.0) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def render(self) -> List[str]:
+        with self._lock:
+            values = sorted(self._values.items())
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        lines += [f"{self.name}{_labels(self.labels, key)} {_num(value)}" for key, value in values]
+        return lines
+
+class Histogram:
+    def __init__(self, name: str, help: str, labels: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.name, self.help, self.labels = name, help, tuple(labels)
+        self.buckets = tuple(sorted(buckets))
+        self._values: Dict[Tuple[str, ...], list] = {}  # labels -> [per-bucket counts..., +Inf count, sum]
+        self._lock = threading.Lock()
+        _REGISTRY.append(self)
+
+    def observe(self, labels: Tuple[str, ...], value: float) -> None:
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(labels)
+            if entry is None:
+                entry = self._values[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+            entry[i] += 1
+            entry[-1] += value
+
+    def render(self) -> List[str]:
+        with self._lock:
+            values = sorted((key, list(entry)) for key, entry in self._values.items())
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for key, entry in values:
+            cumulative = 0
+            for le, count in zip(self.buckets + (float("inf"),), entry[:-1]):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{_labels(self.labels + ('le',), key + (_num(le),))} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labels, key)} {_num(entry[-1])}")
+            lines.append(f"{self.name}_count{_labels(self.labels, key)} {cumulative}")
+        return lines
+
+class CallbackMetric:
+    """Gauge or counter whose values are produced by fn() at scrape time: a number, or a dict of
+    label tuples -> number. A failing callback is skipped rather than failing the scrape."""
+    def __init__(self, name: str, help: str, fn: Callable[[], Any], labels: Sequence[str] = (), kind: str = "gauge"):
+        self.name, self.help, self.fn, self.labels, self.kind = name, help, fn, tuple(labels), kind
+        _REGISTRY.append(self)
+
+    def render(self) -> List[str]:
+        try:
+            value = self.fn()
+        except Exception:
+            return []
+        values = sorted(value.items()) if isinstance(value, dict) else [((), value)]
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        lines += [f"{self.name}{_labels(self.labels, key)} {_num(v)}" for key, v in values if v is not None]
+        return lines
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _labels(names: Tuple[str, ...], values: Tuple[str, ...]) -> str:
+    if not names:
+        return ""
+    return "{" + ",".join(f'{n}="{_escape(str(v))}"' for n, v in zip(names, values)) + "}"
+
+def _num(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+def render_metrics() -> str:
+    lines: List[str] = []
+    for metric in _REGISTRY:
+        lines += metric.render()
+    return "\n".join(lines) + "\n"
+
+# --- Application metrics ---
+HTTP_REQUESTS = Counter("pricing_http_requests_total", "HTTP requests by method, route and status.", ("method", "endpoint", "status"))
+HTTP_SECONDS = Histogram("pricing_http_request_seconds", "HTTP request latency by method and route.", ("method", "endpoint"))
+STAGE_SECONDS = Histogram("pricing_stage_seconds", "Time spent in each stage of /get-prices.", ("stage",), STAGE_BUCKETS)
+REP_QUOTES = Counter("pricing_rep_quotes_total", "Priced requests per REP, by whether the REP returned any quote.", ("rep", "result"))
+REFRESHES = Counter("pricing_refreshes_total", "Pricing data refreshes that reloaded at least one source, by outcome.", ("result",))
+REFRESH_SECONDS = Histogram("pricing_refresh_seconds", "Duration of pricing data refreshes that reloaded sources.", (), REFRESH_BUCKETS)
+
+def observe_stage(stage: str, started: float) -> float:
+    """Record the time since started under stage (and in the request's profile, if it is being
+    profiled) and return now, so stages can be chained."""
+    now = time.perf_counter()
+    STAGE_SECONDS.observe((stage,), now - started)
+    record_stage(stage, now - started)
+    return now
+
+class MetricsMiddleware:
+    """ASGI middleware counting requests and timing them until the last body chunk is sent. Requests
+    are labelled by route template (e.g. /debug/zip/{zipcode}), so label sets stay bounded."""
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        started = time.perf_counter()
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            route = scope.get("route")
+            labels = (scope["method"], getattr(route, "path", "unmatched"))
+            HTTP_REQUESTS.inc(labels + (str(status),))
+            HTTP_SECONDS.observe(labels, time.perf_counter() - started)
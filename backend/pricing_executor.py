@@ -0,0 +1,95 @@
+import os
+import time
+import asyncio
+import contextvars
+import threading
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict
+
+# --- Bounded executor for CPU-bound pricing work ---
+# Pricing runs on a small dedicated pool instead of Starlette's shared threadpool, so at most
+# PRICING_WORKERS threads compete for the GIL (with each other and the refresh thread) at any time.
+# Up to PRICING_QUEUE_LIMIT more requests may wait for a worker. Beyond that a request is refused
+# immediately, and one that already waited PRICING_MAX_QUEUE_SECONDS is dropped when it reaches a
+# worker; both surface as 503 + Retry-After instead of every request getting slower.
+PRICING_WORKERS = int(os.getenv("PRICING_WORKERS", "2"))
+PRICING_QUEUE_LIMIT = int(os.getenv("PRICING_QUEUE_LIMIT", "32"))
+PRICING_MAX_QUEUE_SECONDS = float(os.getenv("PRICING_MAX_QUEUE_SECONDS", "2"))
+PRICING_RETRY_AFTER = os.getenv("PRICING_RETRY_AFTER", "1")
+
+class PricingOverloaded(Exception):
+    """The pricing executor refused the work (queue full, or it waited too long to start)."""
+
+_executor = ThreadPoolExecutor(max_workers=PRICING_WORKERS, thread_name_prefix="pricing")
+_slots = threading.BoundedSemaphore(PRICING_WORKERS + PRICING_QUEUE_LIMIT)  # running + waiting
+_LOCK = threading.Lock()
+_STATS = {"submitted": 0, "started": 0, "completed": 0, "cancelled": 0, "rejected_full": 0, "rejected_stale": 0, "queue_seconds_total": 0.0, "queue_seconds_max": 0.0}
+_QUEUE_SAMPLES: "deque[float]" = deque(maxlen=1024)  # recent queue waits, for percentiles
+
+def _run(fn: Callable, args: tuple, enqueued: float) -> Any:
+    waited = time.perf_counter() - enqueued
+    with _LOCK:
+        _STATS["started"] += 1
+        _STATS["queue_seconds_total"] += waited
+        _STATS["queue_seconds_max"] = max(_STATS["queue_seconds_max"], waited)
+        _QUEUE_SAMPLES.append(waited)
+        stale = PRICING_MAX_QUEUE_SECONDS > 0 and waited > PRICING_MAX_QUEUE_SECONDS
+        if stale:
+            _STATS["rejected_stale"] += 1
+    if stale:
+        raise PricingOverloaded(f"waited {waited:.2f}s for a pricing worker")
+    result = fn(*args)
+    with _LOCK:
+        _STATS["completed"] += 1
+    return result
+
+def _release_slot(future: Future) -> None:
+    if future.cancelled():  # the client went away before a worker picked the request up
+        with _LOCK:
+            _STATS["cancelled"] += 1
+    _slots.release()
+
+async def run_pricing(fn: Callable, *args: Any) -> Any:
+    """Run fn(*args) on the pricing pool. Raises PricingOverloaded instead of queueing without bound."""
+    if not _slots.acquire(blocking=False):
+        with _LOCK:
+            _STATS["rejected_full"] += 1
+        raise PricingOverloaded("pricing queue is full")
+    with _LOCK:
+        _STATS["submitted"] += 1
+    try:
+        # Carry the request's context (e.g. its profile) onto the worker thread
+        future = _executor.submit(contextvars.copy_context().run, _run, fn, args, time.perf_counter())
+    except BaseException:
+        with _LOCK:
+            _STATS["submitted"] -= 1
+        _slots.release()
+        raise
+    future.add_done_callback(_release_slot)
+    return await asyncio.wrap_future(future)
+
+def executor_stats() -> Dict[str, Any]:
+    with _LOCK:
+        stats = dict(_STATS)
+        samples = sorted(_QUEUE_SAMPLES)
+    queued = stats["submitted"] - stats["started"] - stats["cancelled"]
+
+    def pct(q: float) -> Any:
+        return round(samples[min(int(q * len(samples)), len(samples) - 1)], 6) if samples else None
+
+    return {
+        "workers": PRICING_WORKERS,
+        "queue_limit": PRICING_QUEUE_LIMIT,
+        "max_queue_seconds": PRICING_MAX_QUEUE_SECONDS,
+        "queued": queued,
+        "submitted": stats["submitted"],
+        "completed": stats["completed"],
+        "cancelled": stats["cancelled"],
+        "rejected_full": stats["rejected_full"],
+        "rejected_stale": stats["rejected_stale"],
+        "queue_seconds_avg": round(stats["queue_seconds_total"] / stats["started"], 6) if stats["started"] else None,
+        "queue_seconds_p50": pct(0.50),
+        "queue_seconds_p95": pct(0.95),
+        "queue_seconds_max": round(stats["queue_seconds_max"], 6),
+    }
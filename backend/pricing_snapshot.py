@@ -0,0 +1,150 @@
+import os
+import hashlib
+import logging
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from types import MappingProxyType
+from typing import Any, Callable, Dict, List, Mapping, Optional, Tuple
+import pandas as pd
+from frame_cache import LOADER_VERSION
+from quote_store import build_quote_store, compile_quote_rows, empty_quote_store
+from utils import build_row_index
+
+# Bump whenever indexing, quote building or the shared snapshot layout changes. With LOADER_VERSION it
+# goes into every snapshot version, so after a deploy that changes either, a snapshot the old code
+# published is never reattached and the data is rebuilt instead.
+SNAPSHOT_FORMAT = 2  # 2: frames may pickle non str/int column labels
+CODE_VERSION = f"loader{LOADER_VERSION}.snapshot{SNAPSHOT_FORMAT}"
+
+@dataclass(frozen=True)
+class PricingSnapshot:
+    """Everything a pricing request reads, built completely off to the side and installed with one
+    reference assignment. Requests grab the current snapshot once and never see a half-built refresh.
+    Frames and arrays are shared between readers and must be treated as read-only."""
+    version: Optional[str] = None
+    frames: Mapping[str, pd.DataFrame] = field(default_factory=lambda: MappingProxyType({}))
+    indexes: Mapping[str, Dict[Tuple, Tuple[int, int]]] = field(default_factory=lambda: MappingProxyType({}))
+    quote_parts: Mapping[str, pd.DataFrame] = field(default_factory=lambda: MappingProxyType({}))  # rep -> quote rows
+    store: Mapping[str, Any] = field(default_factory=lambda: MappingProxyType(empty_quote_store()))
+    source_files: Mapping[str, str] = field(default_factory=lambda: MappingProxyType({}))   # rep -> path
+    source_hashes: Mapping[str, str] = field(default_factory=lambda: MappingProxyType({}))  # path -> sha256
+    rep_hashes: Mapping[str, str] = field(default_factory=lambda: MappingProxyType({}))  # rep -> sha256 its frame was parsed from
+    source_stats: Mapping[str, Tuple[int, int]] = field(default_factory=lambda: MappingProxyType({}))  # path -> (size, mtime_ns)
+    built_at: Optional[str] = None
+
+EMPTY_SNAPSHOT = PricingSnapshot()
+
+_HASH_CACHE: Dict[str, Tuple[Tuple[int, int], str]] = {}  # path -> ((size, mtime_ns), sha256)
+
+def file_stat(path: str) -> Tuple[int, int]:
+    st = os.stat(path)
+    return st.st_size, st.st_mtime_ns
+
+def file_sha256(path: str, chunk_size: int = 1 << 20) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+def cached_file_sha256(path: str) -> Tuple[str, Tuple[int, int]]:
+    """(sha256, stat) of path; the file is only re-read when its size or mtime moved."""
+    stat = file_stat(path)
+    hit = _HASH_CACHE.get(path)
+    if hit is None or hit[0] != stat:
+        hit = (stat, file_sha256(path))
+        _HASH_CACHE[path] = hit
+    return hit[1], stat
+
+def _freeze_store(store: Dict[str, Any]) -> Mapping[str, Any]:
+    for arr in store["columns"].values():
+        arr.flags.writeable = False
+    store["rep_rank"].flags.writeable = False
+    store["volume_bounds"].flags.writeable = False
+    return MappingProxyType(store)
+
+def changed_sources(snap: PricingSnapshot, latest: Dict[str, str]) -> Tuple[List[str], Dict[str, str], Dict[str, Tuple[int, int]]]:
+    """REPs whose latest file differs in content from what their frame in snap was parsed from.
+    A file is only re-hashed when its size or mtime moved, so an idle poll costs one stat per file."""
+    hashes: Dict[str, str] = {}
+    stats: Dict[str, Tuple[int, int]] = {}
+    for path in set(latest.values()):
+        hashes[path], stats[path] = cached_file_sha256(path)
+    changed = [
+        rep_name for rep_name, path in latest.items()
+        if rep_name not in snap.frames or snap.rep_hashes.get(rep_name) != hashes[path]
+    ]
+    return changed, hashes, stats
+
+def keep_previous_sources(
+    snap: PricingSnapshot,
+    latest: Dict[str, str],
+    hashes: Dict[str, str],
+    stats: Dict[str, Tuple[int, int]],
+    failed: List[str],
+) -> Dict[str, str]:
+    """Point REPs whose new file failed to load back at the file snap was built from (latest, hashes and
+    stats are updated in place) and return rep -> content hash of the data each REP will serve. A failed
+    REP keeps its old hash even when its workbook was edited in place and another sheet of it loaded, so
+    the new snapshot gets its own version and changed_sources() retries only the failed REP. A REP that
+    never loaded is dropped."""
+    rep_hashes = {rep_name: hashes[path] for rep_name, path in latest.items()}
+    for rep_name in failed:
+        old_path = snap.source_files.get(rep_name)
+        if old_path is None or rep_name not in snap.frames or rep_name not in snap.rep_hashes:
+            latest.pop(rep_name, None)
+            rep_hashes.pop(rep_name, None)
+            continue
+        latest[rep_name] = old_path
+        rep_hashes[rep_name] = snap.rep_hashes[rep_name]
+        if old_path not in hashes:  # superseded by a newer file; keep describing the one still served
+            hashes[old_path] = snap.source_hashes[old_path]
+            stats[old_path] = snap.source_stats[old_path]
+    return rep_hashes
+
+def build_snapshot(
+    loaded: Dict[str, pd.DataFrame],
+    source_files: Dict[str, str],
+    source_hashes: Dict[str, str],
+    source_stats: Dict[str, Tuple[int, int]],
+    rep_hashes: Dict[str, str],
+    builders: Dict[str, Callable[[pd.DataFrame], pd.DataFrame]],
+    base: PricingSnapshot = EMPTY_SNAPSHOT,
+) -> PricingSnapshot:
+    """Index freshly loaded REP frames and assemble a new snapshot. REPs in source_files that were not
+    reloaded reuse base's indexed frame, index and quote rows as-is.
+    The version is derived from CODE_VERSION and the content each REP was parsed from, so it is stable
+    across restarts and workers and changes whenever any REP's data or the code building it does."""
+    frames: Dict[str, pd.DataFrame] = {}
+    indexes: Dict[str, Dict[Tuple, Tuple[int, int]]] = {}
+    parts: Dict[str, pd.DataFrame] = {}
+    for rep_name in source_files:
+        if rep_name in loaded:
+            # Frames are re-sorted by key so every (start, utility, zone, LF) group is one contiguous slice
+            frames[rep_name], indexes[rep_name] = build_row_index(loaded[rep_name])
+            if rep_name in builders:
+                parts[rep_name] = compile_quote_rows(rep_name, frames[rep_name], builders[rep_name])
+        elif rep_name in base.frames:
+            frames[rep_name], indexes[rep_name] = base.frames[rep_name], base.indexes[rep_name]
+            if rep_name in base.quote_parts:
+                parts[rep_name] = base.quote_parts[rep_name]
+            elif rep_name in builders:  # base was attached from a shared snapshot, which keeps no quote rows
+                parts[rep_name] = compile_quote_rows(rep_name, base.frames[rep_name], builders[rep_name])
+    store = build_quote_store(parts)
+
+    used = sorted(set(source_files.values()))
+    ident = "|".join([CODE_VERSION] + [f"{rep_name}={rep_hashes[rep_name]}" for rep_name in sorted(source_files)])
+    version = hashlib.sha1(ident.encode("utf-8")).hexdigest()[:16]
+    logging.info(f"Quote store compiled: {store['rows']} rows across {store['reps']} (version {version}, reloaded {list(loaded)})")
+    return PricingSnapshot(
+        version=version,
+        frames=MappingProxyType(frames),
+        indexes=MappingProxyType(indexes),
+        quote_parts=MappingProxyType(parts),
+        store=_freeze_store(store),
+        source_files=MappingProxyType(dict(source_files)),
+        source_hashes=MappingProxyType({p: source_hashes[p] for p in used}),
+        source_stats=MappingProxyType({p: source_stats[p] for p in used}),
+        rep_hashes=MappingProxyType({rep_name: rep_hashes[rep_name] for rep_name in source_files}),
+        built_at=datetime.now(timezone.utc).isoformat(),
+    )
@@ -0,0 +1,160 @@
+import os
+import sys
+import hmac
+import json
+import time
+import uuid
+import logging
+import threading
+from collections import Counter, deque
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs
+
+# --- Opt-in per-request profiling ---
+# A request sent with "X-Profile: 1" (or ?profile=1) and "X-Admin-Token: <PROFILE_ADMIN_TOKEN>" is
+# profiled: the stages recorded through metrics.observe_stage are collected for that request only
+# (a context variable, carried onto the pricing worker), and a sampler thread snapshots the stacks of
+# the event loop and request worker threads every PROFILE_SAMPLE_SECONDS. The response gets a
+# Server-Timing header with the stage breakdown and an X-Profile-Id; the full profile, including the
+# hottest sampled functions, goes to PROFILE_LOG (one JSON object per line) and /debug/profiles.
+# Samples cover every request running at the same time, so profile on a quiet instance.
+# Sampling resolution is also bounded by the GIL switch interval (sys.getswitchinterval(), 5 ms by default).
+# Without PROFILE_ADMIN_TOKEN set the middleware passes requests straight through.
+PROFILE_ADMIN_TOKEN = os.getenv("PROFILE_ADMIN_TOKEN", "")
+PROFILE_SAMPLE_SECONDS = float(os.getenv("PROFILE_SAMPLE_SECONDS", "0.001"))
+PROFILE_TOP_FUNCTIONS = int(os.getenv("PROFILE_TOP_FUNCTIONS", "20"))
+PROFILE_LOG = os.getenv("PROFILE_LOG", os.path.join("logs", "profile.log"))
+PROFILE_KEEP = int(os.getenv("PROFILE_KEEP", "50"))
+
+# Threads that run request code besides the event loop: the pricing executor and Starlette's threadpool
+_WORKER_THREAD_PREFIXES = ("pricing_", "AnyIO worker")
+# A stack whose innermost frame is in one of these is a thread waiting for work, not doing it
+_IDLE_FILES = ("threading.py", "queue.py", "selectors.py", "thread.py")
+
+_stages: ContextVar[Optional[List[Tuple[str, float]]]] = ContextVar("profile_stages", default=None)
+_recent: "deque[Dict[str, Any]]" = deque(maxlen=PROFILE_KEEP)
+_logger = logging.getLogger("pricing.profile")
+_logger.propagate = False
+_log_lock = threading.Lock()
+_side_log: Optional[logging.Handler] = None  # ours; other handlers on _logger must not suppress it
+
+def record_stage(stage: str, seconds: float) -> None:
+    """Add a stage timing to the profile of the current request, if it is being profiled."""
+    stages = _stages.get()
+    if stages is not None:
+        stages.append((stage, seconds))
+
+def token_valid(token: Optional[str]) -> bool:
+    return bool(PROFILE_ADMIN_TOKEN) and token is not None and hmac.compare_digest(token, PROFILE_ADMIN_TOKEN)
+
+def recent_profiles() -> List[Dict[str, Any]]:
+    return list(_recent)
+
+def _profile_requested(scope) -> bool:
+    headers = dict(scope["headers"])
+    flagged = headers.get(b"x-profile", b"").strip() in (b"1", b"true") or \
+        parse_qs(scope.get("query_string", b"").decode("latin-1")).get("profile", [""])[-1] in ("1", "true")
+    return flagged and token_valid(headers.get(b"x-admin-token", b"").decode("latin-1"))
+
+def _frame_label(code) -> str:
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+def _sample_stacks(loop_thread: int, stop: threading.Event, own: Counter, total: Counter, taken: List[int]) -> None:
+    me = threading.get_ident()
+    while not stop.wait(PROFILE_SAMPLE_SECONDS):
+        watched = {loop_thread} | {t.ident for t in threading.enumerate() if t.name.startswith(_WORKER_THREAD_PREFIXES)}
+        for ident, frame in sys._current_frames().items():
+            if ident == me or ident not in watched or os.path.basename(frame.f_code.co_filename) in _IDLE_FILES:
+                continue
+            own[_frame_label(frame.f_code)] += 1
+            seen = set()
+            while frame is not None:
+                label = _frame_label(frame.f_code)
+                if label not in seen:
+                    seen.add(label)
+                    total[label] += 1
+                frame = frame.f_back
+        taken[0] += 1
+
+def _write_side_log(profile: Dict[str, Any]) -> None:
+    global _side_log
+    with _log_lock:
+        if _side_log is None and PROFILE_LOG:
+            _side_log = logging.FileHandler(PROFILE_LOG, encoding="utf-8")
+            _side_log.setFormatter(logging.Formatter("%(message)s"))
+            _logger.addHandler(_side_log)
+            _logger.setLevel(logging.INFO)
+    _logger.info(json.dumps(profile))
+
+def _server_timing(stages: List[Tuple[str, float]], total: float) -> str:
+    summed: Dict[str, float] = {}
+    for stage, seconds in stages:
+        summed[stage] = summed.get(stage, 0.0) + seconds
+    parts = [f"{stage};dur={seconds * 1000:.3f}" for stage, seconds in summed.items()]
+    parts.append(f"total;dur={total * 1000:.3f}")
+    return ", ".join(parts)
+
+class ProfilingMiddleware:
+    """ASGI middleware implementing the profiling mode above; a no-op unless PROFILE_ADMIN_TOKEN is set."""
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if not PROFILE_ADMIN_TOKEN or scope["type"] != "http" or not _profile_requested(scope):
+            await self.app(scope, receive, send)
+            return
+
+        profile_id = uuid.uuid4().hex[:12]
+        stages: List[Tuple[str, float]] = []
+        token = _stages.set(stages)
+        own, total, taken = Counter(), Counter(), [0]
+        stop = threading.Event()
+        sampler = threading.Thread(target=_sample_stacks, args=(threading.get_ident(), stop, own, total, taken), name="profile-sampler", daemon=True)
+        started = time.perf_counter()
+        status = 500
+        sampler.start()
+
+        async def send_with_timing(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                headers = list(message.get("headers", []))
+                headers.append((b"server-timing", _server_timing(stages, time.perf_counter() - started).encode("latin-1")))
+                headers.append((b"x-profile-id", profile_id.encode("latin-1")))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            elapsed = time.perf_counter() - started
+            stop.set()
+            sampler.join()
+            _stages.reset(token)
+            profile = {
+                "id": profile_id,
+                "at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+                "method": scope["method"],
+                "path": scope["path"],
+                "status": status,
+                "total_ms": round(elapsed * 1000, 3),
+                "stages_ms": [[stage, round(seconds * 1000, 3)] for stage, seconds in stages],
+                "unattributed_ms": round((elapsed - sum(seconds for _, seconds in stages)) * 1000, 3),
+                "samples": taken[0],
+                "sample_interval_ms": PROFILE_SAMPLE_SECONDS * 1000,
+                # Sample counts: "self" = innermost frame (where time is spent), "total" = anywhere on the stack
+                "hot_self": [
+                    {"function": label, "self": count, "total": total[label]}
+                    for label, count in own.most_common(PROFILE_TOP_FUNCTIONS)
+                ],
+                "hot_total": [
+                    {"function": label, "total": count, "self": own.get(label, 0)}
+                    for label, count in total.most_common(PROFILE_TOP_FUNCTIONS)
+                ],
+            }
+            _recent.append(profile)
+            try:
+                _write_side_log(profile)
+            except OSError as e:
+                logging.warning(f"Failed to write profile {profile_id} to {PROFILE_LOG}: {e}")
@@ -0,0 +1,91 @@
+import logging
+import numpy as np
+import pandas as pd
+from typing import Any, Callable, Dict, FrozenSet, List, NamedTuple
+from json_codec import dumps
+from utils import build_row_index
+
+# Long-format columns every REP compiles into (one row per start/utility/zone/LF/volume bracket/term)
+QUOTE_KEY_COLUMNS = ["Rep", "Start Month", "Utility", "Congestion Zone", "Load Factor"]
+QUOTE_COLUMNS = QUOTE_KEY_COLUMNS + ["Volume Min", "Volume Max", "Term", "Price Cents"]
+
+def empty_quote_store() -> Dict[str, Any]:
+    return {"reps": [], "rep_rank": np.zeros(0, dtype=np.int64), "columns": {}, "index": {}, "rows": 0,
+            "volume_bounds": np.zeros(0, dtype=np.float64)}
+
+def compile_quote_rows(rep_name: str, df: pd.DataFrame, builder: Callable[[pd.DataFrame], pd.DataFrame]) -> pd.DataFrame:
+    """One REP's contribution to the store, in QUOTE_COLUMNS layout. Kept per REP so an unchanged
+    REP's part can be reused when only another source is reloaded."""
+    long_df = builder(df)
+    long_df.insert(0, "Rep", rep_name)
+    return long_df[QUOTE_COLUMNS]
+
+def build_quote_store(parts: Dict[str, pd.DataFrame]) -> Dict[str, Any]:
+    """Assemble per-REP quote rows into one sorted, NumPy-backed long table.
+    The index maps (rep, start, utility, zone, LF) to a contiguous [start, stop) row range."""
+    parts = {rep_name: part for rep_name, part in parts.items() if not part.empty}
+    if not parts:
+        return empty_quote_store()
+
+    table, index = build_row_index(pd.concat(parts.values(), ignore_index=True), QUOTE_KEY_COLUMNS)
+    reps = list(parts)
+    rep_codes = table["Rep"].map({rep: i for i, rep in enumerate(reps)}).to_numpy(dtype=np.int64)
+    columns = {
+        "Rep": rep_codes,
+        "Volume Min": table["Volume Min"].to_numpy(dtype=np.float64),
+        "Volume Max": table["Volume Max"].to_numpy(dtype=np.float64),
+        "Term": table["Term"].to_numpy(dtype=np.int64),
+        "Price Cents": table["Price Cents"].to_numpy(dtype=np.float64),
+    }
+    # Results are ordered by (term, rep name); rank lets one lexsort do that across REPs
+    rep_rank = np.argsort(np.argsort(np.array(reps, dtype=object)))
+    # Every finite bracket edge across REPs; volumes between the same two edges get identical quotes
+    bounds = np.concatenate([columns["Volume Min"], columns["Volume Max"]])
+    volume_bounds = np.unique(bounds[np.isfinite(bounds)])
+    return {"reps": reps, "rep_rank": rep_rank, "columns": columns, "index": index, "rows": len(table),
+            "volume_bounds": volume_bounds}
+
+def volume_bucket(store: Dict[str, Any], volume: float) -> int:
+    """Bucket id of an annual volume; two volumes with the same bucket match the same quote rows."""
+    return int(np.searchsorted(store["volume_bounds"], volume, side="right"))
+
+def match_quote_rows(store: Dict[str, Any], start: str, utilities: Dict[str, str], zone: str, load_factor: str, volume: float) -> np.ndarray:
+    """Store rows quoting one normalized request, in result order (term, rep). utilities maps rep -> normalized utility."""
+    spans = []
+    for rep_name in store["reps"]:
+        span = store["index"].get((rep_name, start, utilities.get(rep_name), zone, load_factor))
+        if span is None:
+            logging.info(f"No matches found for {rep_name} with key: {(start, utilities.get(rep_name), zone, load_factor)}")
+            continue
+        spans.append(np.arange(span[0], span[1]))
+    if not spans:
+        return np.zeros(0, dtype=np.int64)
+
+    cols = store["columns"]
+    rows = np.concatenate(spans)
+    rows = rows[(cols["Volume Min"][rows] <= volume) & (volume < cols["Volume Max"][rows])]
+    order = np.lexsort((store["rep_rank"][cols["Rep"][rows]], cols["Term"][rows]))
+    return rows[order]
+
+def format_quotes(store: Dict[str, Any], rows: np.ndarray) -> List[Dict[str, Any]]:
+    cols = store["columns"]
+    reps = store["reps"]
+    return [
+        {"rep": reps[r], "term": t, "price_cents_per_kwh": p}
+        for r, t, p in zip(cols["Rep"][rows].tolist(), cols["Term"][rows].tolist(), cols["Price Cents"][rows].tolist())
+    ]
+
+class RenderedQuotes(NamedTuple):
+    """One request's quotes encoded once: the JSON body (a PriceResult array) and the REPs it quotes."""
+    body: bytes
+    reps: FrozenSet[str]
+
+def render_quotes(store: Dict[str, Any], rows: np.ndarray) -> RenderedQuotes:
+    """format_quotes encoded straight to JSON bytes, skipping response model validation."""
+    reps = store["reps"]
+    quoted = frozenset(reps[r] for r in np.unique(store["columns"]["Rep"][rows]).tolist())
+    return RenderedQuotes(dumps(format_quotes(store, rows)), quoted)
+
+def query_quote_store(store: Dict[str, Any], start: str, utilities: Dict[str, str], zone: str, load_factor: str, volume: float) -> List[Dict[str, Any]]:
+    """All REP quotes for one normalized request, sorted by (term, rep). utilities maps rep -> normalized utility."""
+    return format_quotes(store, match_quote_rows(store, start, utilities, zone, load_factor, volume))
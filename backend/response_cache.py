@@ -0,0 +1,62 @@
+import os
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional
+
+# --- Bounded LRU of rendered pricing results, keyed by (data version, normalized pricing key) ---
+RESULT_CACHE_SIZE = int(os.getenv("RESULT_CACHE_SIZE", "4096"))
+
+_CACHE: "OrderedDict[Hashable, Any]" = OrderedDict()
+_LOCK = threading.Lock()
+_STATS = {"hits": 0, "misses": 0}
+
+def cache_get(key: Hashable) -> Optional[Any]:
+    with _LOCK:
+        value = _CACHE.get(key)
+        if value is None:
+            _STATS["misses"] += 1
+            return None
+        _CACHE.move_to_end(key)
+        _STATS["hits"] += 1
+        return value
+
+def cache_put(key: Hashable, value: Any) -> None:
+    if RESULT_CACHE_SIZE <= 0:
+        return
+    with _LOCK:
+        _CACHE[key] = value
+        _CACHE.move_to_end(key)
+        while len(_CACHE) > RESULT_CACHE_SIZE:
+            _CACHE.popitem(last=False)
+
+def cache_clear() -> None:
+    """Drop all entries (called when new pricing data is installed). Hit/miss counters are kept."""
+    with _LOCK:
+        _CACHE.clear()
+
+def cache_stats() -> Dict[str, Any]:
+    with _LOCK:
+        lookups = _STATS["hits"] + _STATS["misses"]
+        return {
+            "size": len(_CACHE),
+            "max_size": RESULT_CACHE_SIZE,
+            "hits": _STATS["hits"],
+            "misses": _STATS["misses"],
+            "hit_rate": round(_STATS["hits"] / lookups, 4) if lookups else None,
+        }
+
+# --- ETags ---
+def make_etag(version: str, key: Hashable) -> str:
+    """Strong ETag for a pricing key under one data version; the body is fully determined by both."""
+    return '"' + hashlib.sha1(repr((version, key)).encode("utf-8")).hexdigest()[:20] + '"'
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """True if If-None-Match lists this ETag. "*" is not honoured: on a POST pricing key it would let a
+    client get an empty 304 for prices it has never been sent."""
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(","):
+        if candidate.strip().removeprefix("W/") == etag:
+            return True
+    return False
@@ -0,0 +1,204 @@
+import os
+import json
+import shutil
+import logging
+import tempfile
+import numpy as np
+from types import MappingProxyType
+from typing import Any, Dict, Optional
+from frame_cache import read_frame, write_frame
+from pricing_snapshot import CODE_VERSION, PricingSnapshot
+
+try:
+    import fcntl
+except ImportError:  # no flock (Windows): sharing is off and every worker loads for itself
+    fcntl = None
+
+# --- Pricing snapshot shared across uvicorn workers ---
+# One worker holds an flock on loader.lock and is the only one that parses workbooks. After installing a
+# snapshot it writes it to PRICING_SNAPSHOT_DIR/<version>/ (quote store arrays and indexed frames as
+# .npy columns) and then atomically repoints CURRENT at that version. The other workers poll CURRENT
+# and attach the version read-only via memory maps, so the OS page cache holds one copy of the arrays
+# for all workers. When the loader dies its lock is released and the next worker to poll takes over.
+# Set PRICING_SNAPSHOT_DIR="" to disable. If the directory cannot be used (read-only, permissions, no
+# flock support) or publishing keeps failing, sharing switches itself off and every worker loads for itself.
+SNAPSHOT_DIR = os.getenv("PRICING_SNAPSHOT_DIR", os.path.join("pricing_data", ".cache", "snapshots"))
+SNAPSHOT_KEEP = int(os.getenv("PRICING_SNAPSHOT_KEEP", "3"))
+SNAPSHOT_FOLLOW_SECONDS = float(os.getenv("PRICING_SNAPSHOT_FOLLOW_SECONDS", "1"))
+SNAPSHOT_PUBLISH_ATTEMPTS = int(os.getenv("PRICING_SNAPSHOT_PUBLISH_ATTEMPTS", "3"))
+
+_lock_fd: Optional[int] = None
+_sharing_broken = False
+_publish_failures = 0
+
+class IncompatibleSnapshot(Exception):
+    """A published snapshot was built by code with a different CODE_VERSION."""
+
+def sharing_enabled() -> bool:
+    return bool(SNAPSHOT_DIR) and fcntl is not None and not _sharing_broken
+
+def _disable_sharing(action: str, e: Exception) -> None:
+    global _sharing_broken, _lock_fd
+    if not _sharing_broken:
+        logging.warning(f"Cannot {action} in {SNAPSHOT_DIR} ({e}); snapshot sharing is off and this worker loads pricing data itself")
+    _sharing_broken = True
+    if _lock_fd is not None:  # let another worker take over as loader (it publishes, or gives up and loads for itself too)
+        os.close(_lock_fd)
+        _lock_fd = None
+
+def try_become_loader() -> bool:
+    """True if this process is (now) the one that parses workbooks. Non-blocking; safe to call every poll."""
+    global _lock_fd
+    if not sharing_enabled() or _lock_fd is not None:
+        return True
+    try:
+        os.makedirs(SNAPSHOT_DIR, exist_ok=True)
+        fd = os.open(os.path.join(SNAPSHOT_DIR, "loader.lock"), os.O_RDWR | os.O_CREAT, 0o644)
+    except OSError as e:
+        _disable_sharing("open loader.lock", e)
+        return True
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:  # another worker is the loader
+        os.close(fd)
+        return False
+    except OSError as e:
+        os.close(fd)
+        _disable_sharing("lock loader.lock", e)
+        return True
+    _lock_fd = fd  # held for the life of the process
+    logging.info(f"Worker {os.getpid()} is the pricing loader")
+    return True
+
+def current_version() -> Optional[str]:
+    try:
+        with open(os.path.join(SNAPSHOT_DIR, "CURRENT"), encoding="utf-8") as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+    except OSError as e:
+        _disable_sharing("read CURRENT", e)
+        return None
+
+def _write_store(directory: str, store: Dict[str, Any]) -> Dict[str, Any]:
+    names = list(store["columns"])
+    for i, name in enumerate(names):
+        np.save(os.path.join(directory, f"store.c{i}.npy"), store["columns"][name])
+    np.save(os.path.join(directory, "store.rep_rank.npy"), store["rep_rank"])
+    np.save(os.path.join(directory, "store.volume_bounds.npy"), store["volume_bounds"])
+    return {
+        "reps": store["reps"],
+        "rows": store["rows"],
+        "columns": names,
+        "index": [[*key, int(start), int(stop)] for key, (start, stop) in store["index"].items()],
+    }
+
+def _read_store(directory: str, meta: Dict[str, Any]) -> Dict[str, Any]:
+    def load(name: str) -> np.ndarray:
+        return np.asarray(np.load(os.path.join(directory, name), mmap_mode="r"))
+
+    return {
+        "reps": meta["reps"],
+        "rep_rank": load("store.rep_rank.npy"),
+        "columns": {name: load(f"store.c{i}.npy") for i, name in enumerate(meta["columns"])},
+        "index": {tuple(entry[:-2]): (entry[-2], entry[-1]) for entry in meta["index"]},
+        "rows": meta["rows"],
+        "volume_bounds": load("store.volume_bounds.npy"),
+    }
+
+def publish_snapshot(snap: PricingSnapshot) -> None:
+    """Write snap under its version (once) and point CURRENT at it."""
+    if not sharing_enabled() or snap.version is None:
+        return
+    final = os.path.join(SNAPSHOT_DIR, snap.version)
+    if not os.path.isdir(final):
+        os.makedirs(SNAPSHOT_DIR, exist_ok=True)
+        tmp = tempfile.mkdtemp(prefix=f".{snap.version}.", dir=SNAPSHOT_DIR)
+        try:
+            meta = {
+                "version": snap.version,
+                "code_version": CODE_VERSION,
+                "built_at": snap.built_at,
+                "store": _write_store(tmp, snap.store),
+                "frames": list(snap.frames),
+                "indexes": {rep_name: [[*key, int(start), int(stop)] for key, (start, stop) in index.items()] for rep_name, index in snap.indexes.items()},
+                "source_files": dict(snap.source_files),
+                "source_hashes": dict(snap.source_hashes),
+                "source_stats": {path: list(stat) for path, stat in snap.source_stats.items()},
+                "rep_hashes": dict(snap.rep_hashes),
+            }
+            for i, df in enumerate(snap.frames.values()):
+                frame_dir = os.path.join(tmp, f"frame{i}")
+                os.mkdir(frame_dir)
+                write_frame(frame_dir, df)
+            with open(os.path.join(tmp, "snapshot.json"), "w", encoding="utf-8") as f:
+                json.dump(meta, f)
+            os.replace(tmp, final)
+        except Exception:
+            shutil.rmtree(tmp, ignore_errors=True)
+            raise
+    fd, tmp_pointer = tempfile.mkstemp(prefix=".CURRENT.", dir=SNAPSHOT_DIR)
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        f.write(snap.version)
+    os.replace(tmp_pointer, os.path.join(SNAPSHOT_DIR, "CURRENT"))
+    _prune(snap.version)
+    logging.info(f"Published pricing snapshot {snap.version} for other workers")
+
+def attach_snapshot(version: str) -> PricingSnapshot:
+    """Read-only, memory-mapped view of a published snapshot. Quote rows are not kept; a worker that
+    later becomes the loader recompiles them from the frames when it needs them.
+    Raises IncompatibleSnapshot if it was published by code with another CODE_VERSION."""
+    directory = os.path.join(SNAPSHOT_DIR, version)
+    with open(os.path.join(directory, "snapshot.json"), encoding="utf-8") as f:
+        meta = json.load(f)
+    if meta.get("code_version") != CODE_VERSION:
+        raise IncompatibleSnapshot(f"snapshot {version} was built by code version {meta.get('code_version')}, this worker runs {CODE_VERSION}")
+    frames = {rep_name: read_frame(os.path.join(directory, f"frame{i}")) for i, rep_name in enumerate(meta["frames"])}
+    indexes = {
+        rep_name: {tuple(entry[:-2]): (entry[-2], entry[-1]) for entry in entries}
+        for rep_name, entries in meta["indexes"].items()
+    }
+    return PricingSnapshot(
+        version=meta["version"],
+        frames=MappingProxyType(frames),
+        indexes=MappingProxyType(indexes),
+        store=MappingProxyType(_read_store(directory, meta["store"])),
+        source_files=MappingProxyType(meta["source_files"]),
+        source_hashes=MappingProxyType(meta["source_hashes"]),
+        source_stats=MappingProxyType({path: tuple(stat) for path, stat in meta["source_stats"].items()}),
+        rep_hashes=MappingProxyType(meta["rep_hashes"]),
+        built_at=meta["built_at"],
+    )
+
+def ensure_published(snap: PricingSnapshot) -> bool:
+    """Loader side, every poll: publish snap unless CURRENT already points at it, so a failed publish is
+    retried even when no source changed. After SNAPSHOT_PUBLISH_ATTEMPTS failures in a row sharing is
+    switched off rather than leaving the other workers on no data or an older version.
+    Returns True if CURRENT points at snap."""
+    global _publish_failures
+    if not sharing_enabled() or snap.version is None:
+        return False
+    if current_version() == snap.version:
+        return True
+    try:
+        publish_snapshot(snap)
+    except Exception as e:
+        _publish_failures += 1
+        if _publish_failures >= SNAPSHOT_PUBLISH_ATTEMPTS:
+            _disable_sharing(f"publish snapshot {snap.version} after {_publish_failures} attempts", e)
+        else:
+            logging.warning(f"Failed to publish snapshot {snap.version} to other workers (attempt {_publish_failures} of {SNAPSHOT_PUBLISH_ATTEMPTS}): {e}")
+        return False
+    _publish_failures = 0
+    return True
+
+def _prune(keep_version: str) -> None:
+    """Drop all but the newest SNAPSHOT_KEEP versions. Workers still mapping a removed version keep
+    their pages until they attach the next one (POSIX unlink semantics)."""
+    entries = [
+        os.path.join(SNAPSHOT_DIR, d) for d in os.listdir(SNAPSHOT_DIR)
+        if not d.startswith(".") and d != keep_version and os.path.isdir(os.path.join(SNAPSHOT_DIR, d))
+    ]
+    entries.sort(key=os.path.getmtime, reverse=True)
+    for stale in entries[max(SNAPSHOT_KEEP - 1, 0):]:
+        shutil.rmtree(stale, ignore_errors=True)
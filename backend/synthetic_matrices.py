@@ -0,0 +1,136 @@
+"""Synthetic pricing workbooks and ZIP maps shaped like the real vendor files, at configurable sizes.
+
+    python synthetic_matrices.py --out /tmp/synthetic --start-months 24 --extra-utilities 5
+
+writes TX_MATRIX_<date>.xlsx ("All In Matrix" / "X-Con Matrix"), "<date> - AE TEXAS.xlsx"
+("AE Texas Matrix") and ZipCodeMap.xlsx (or .csv) into --out, plus synthetic.json describing them.
+Point the API at them with PRICING_DIR=<out> ZIP_MAP_PATH=<out>/ZipCodeMap.xlsx.
+"""
+import os
+import csv
+import json
+import random
+import argparse
+from datetime import datetime
+from typing import Any, Dict, List
+from openpyxl import Workbook
+from engie_format import VOLUME_BRACKETS
+
+ZONES = ["NORTH", "SOUTH", "WEST", "HOUSTON"]
+LOAD_FACTORS = ["HI", "LO", "MED"]
+# Utility spellings as each vendor writes them; extra synthetic utilities are appended to both
+ENGIE_UTILITIES = ["AEPCPL", "CPT", "ONCOR", "TNMP", "AEPWTU"]
+ATLANTIC_UTILITIES = ["AEP Central", "Centerpoint", "Oncor", "TNMP", "AEP North"]
+ENGIE_TERMS = [6, 12, 18, 24, 30, 36, 42, 48, 54, 60]
+ATLANTIC_TERMS = [6, 12, 18, 24, 36, 48]
+
+def _start_dates(first: datetime, count: int) -> List[datetime]:
+    return [datetime(first.year + (first.month - 1 + i) // 12, (first.month - 1 + i) % 12 + 1, 1) for i in range(count)]
+
+def write_engie_workbook(path: str, start_dates: List[datetime], utilities: List[str], rng: random.Random) -> int:
+    """Engie TX matrix: banner rows, header on row 5, one row per start/utility/zone/LF/term with a
+    price (cents/kWh) per volume bracket. Returns data rows per sheet."""
+    wb = Workbook(write_only=True)
+    header = ["Start Date", "Start Month", "State", "Utility", "Congestion Zone", "Term", "Load Factor", "Special Note"] + [col for _, col in VOLUME_BRACKETS]
+    rows = 0
+    for sheet, note, adder in (("All In Matrix", "Includes Congestion", 0.05), ("X-Con Matrix", "Excludes Congestion", 0.0)):
+        ws = wb.create_sheet(sheet)
+        for banner in ("*Highly Confidential*", " Prices displayed in cents/kWh", "Prices are subject to change without notice."):
+            ws.append([None] * 8 + [banner])
+        ws.append([None, "Customer Specific Parameters", None, None, None, None, None, None, "Annual Volume (kWh)"])
+        ws.append(header)
+        rows = 0
+        for start in start_dates:
+            for utility in utilities:
+                for zone in ZONES:
+                    for lf in LOAD_FACTORS:
+                        base = rng.uniform(6.5, 9.5)
+                        for term in ENGIE_TERMS:
+                            small = round(base + 2.8 + term * 0.004 + adder, 3)
+                            prices = [small] + [round(base + term * 0.004 + adder - 0.013 * i, 3) for i in range(len(VOLUME_BRACKETS) - 1)]
+                            ws.append([start, f"{start:%B %Y} Start", "TX", utility, zone, term, lf, note] + prices)
+                            rows += 1
+    wb.save(path)
+    return rows
+
+def write_atlantic_workbook(path: str, start_dates: List[datetime], utilities: List[str], rng: random.Random) -> int:
+    """AE Texas matrix: contact block, header on row 10, one row per utility/zone/LF/start with a
+    price ($/kWh) per term column ('6m', '12m', ...). Returns data rows."""
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("AE Texas Matrix")
+    ws.append([None, datetime.now().replace(hour=0, minute=0, second=0, microsecond=0), None, None, "Commercial Matrix"])
+    for line in ("", "Atlantic Energy LLC", "Ph: +1 (000) 000-0000", "Fax: (000) 000-0000", "Email: commercial@example.com", "", "", ""):
+        ws.append([None, None, None, None, line or None])
+    ws.append([None, "Utility", "Zone", "Load Factor", "Start Date"] + [f"{term}m" for term in ATLANTIC_TERMS])
+    rows = 0
+    for utility in utilities:
+        for zone in ZONES:
+            for lf in LOAD_FACTORS:
+                for start in start_dates:
+                    base = rng.uniform(0.070, 0.095)
+                    prices = [round(base + 0.0004 * i, 5) for i in range(len(ATLANTIC_TERMS))]
+                    ws.append([f"{utility}{zone}{lf}{start:%Y%m}", utility, zone, lf, start] + prices)
+                    rows += 1
+    wb.save(path)
+    return rows
+
+def write_zip_map(path: str, exact: int, ranges: int, prefixes: int, rng: random.Random) -> Dict[str, int]:
+    """ZIP map with Zip/FromZip/ToZip/Prefix/Zone columns (CSV or XLSX by extension). Exact ZIPs are
+    drawn from 70000-79999 so requests built from them land in Texas-like ranges."""
+    zips = rng.sample(range(70000, 80000), min(exact, 10000)) + [rng.randrange(100000) for _ in range(max(exact - 10000, 0))]
+    records: List[List[Any]] = [[f"{z:05d}", None, None, None, rng.choice(ZONES)] for z in zips]
+    for _ in range(ranges):
+        lo = rng.randrange(0, 99000)
+        records.append([None, f"{lo:05d}", f"{lo + rng.randrange(1, 1000):05d}", None, rng.choice(ZONES)])
+    for _ in range(prefixes):
+        records.append([None, None, None, f"{rng.randrange(10 ** 3):03d}", rng.choice(ZONES)])
+    header = ["Zip", "FromZip", "ToZip", "Prefix", "Zone"]
+    if path.lower().endswith(".csv"):
+        with open(path, "w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            writer.writerow(header)
+            writer.writerows([["" if v is None else v for v in record] for record in records])
+    else:
+        wb = Workbook(write_only=True)
+        ws = wb.create_sheet("ZipCodeMap")
+        ws.append(header)
+        for record in records:
+            ws.append(record)
+        wb.save(path)
+    return {"exact": len(zips), "ranges": ranges, "prefixes": prefixes}
+
+def generate(out_dir: str, start_months: int = 12, extra_utilities: int = 0, zip_exact: int = 3000,
+             zip_ranges: int = 0, zip_prefixes: int = 0, zip_format: str = "xlsx", seed: int = 0) -> Dict[str, Any]:
+    """Write one synthetic data set into out_dir and return its manifest (also saved as synthetic.json)."""
+    os.makedirs(out_dir, exist_ok=True)
+    rng = random.Random(seed)
+    starts = _start_dates(datetime(2025, 8, 1), start_months)
+    extras = [f"SYNUTIL{i:02d}" for i in range(extra_utilities)]
+    stamp = datetime(2025, 7, 24)
+    engie_path = os.path.join(out_dir, f"TX_MATRIX_{stamp:%Y.%m.%d}.xlsx")
+    atlantic_path = os.path.join(out_dir, f"{stamp.month}_{stamp.day}_{stamp.year} - AE TEXAS.xlsx")
+    zip_path = os.path.join(out_dir, f"ZipCodeMap.{zip_format}")
+    manifest = {
+        "seed": seed,
+        "start_months": [f"{s:%B %Y}" for s in starts],
+        "engie": {"path": engie_path, "rows_per_sheet": write_engie_workbook(engie_path, starts, ENGIE_UTILITIES + extras, rng)},
+        "atlantic": {"path": atlantic_path, "rows": write_atlantic_workbook(atlantic_path, starts, ATLANTIC_UTILITIES + extras, rng)},
+        "zip_map": {"path": zip_path, **write_zip_map(zip_path, zip_exact, zip_ranges, zip_prefixes, rng)},
+    }
+    with open(os.path.join(out_dir, "synthetic.json"), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Write synthetic Engie / AE Texas matrices and a ZIP map.")
+    parser.add_argument("--out", required=True, help="directory to write into")
+    parser.add_argument("--start-months", type=int, default=12, help="start months per matrix (Engie rows scale linearly)")
+    parser.add_argument("--extra-utilities", type=int, default=0, help="synthetic utilities added to both vendors")
+    parser.add_argument("--zip-exact", type=int, default=3000)
+    parser.add_argument("--zip-ranges", type=int, default=0)
+    parser.add_argument("--zip-prefixes", type=int, default=0)
+    parser.add_argument("--zip-format", choices=["xlsx", "csv"], default="xlsx")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    print(json.dumps(generate(args.out, args.start_months, args.extra_utilities, args.zip_exact,
+                              args.zip_ranges, args.zip_prefixes, args.zip_format, args.seed), indent=2))
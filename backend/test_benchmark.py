@@ -0,0 +1,12 @@
+import random
+import benchmark
+import utils
+
+def test_price_requests_come_from_the_public_catalog(pricing_app, client):
+    payloads = benchmark.build_price_requests(pricing_app, utils, 200, random.Random(0))
+    catalog = {tuple(key) for key in client.get("/debug/catalog").json()["keys"]}
+    for payload in payloads:
+        assert (payload["start_month"], payload["utility"], utils.normalize_zone(utils.zip_to_zone(payload["zipcode"])), payload["load_factor"]) in catalog
+    for payload in payloads[:20]:
+        response = client.post("/get-prices", json=payload)
+        assert response.status_code == 200 and response.json()
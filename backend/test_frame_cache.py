@@ -0,0 +1,49 @@
+import dataclasses
+from datetime import datetime
+from types import MappingProxyType
+import numpy as np
+import pandas as pd
+import pandas.testing as pdt
+import shared_snapshot
+from frame_cache import load_frame, read_frame, save_frame, write_frame
+
+def _frame(labels):
+    df = pd.DataFrame({
+        "a": [1.5, np.nan, 3.0],
+        "b": ["x", None, "z"],
+        "c": [1, 2, 3],
+        "d": [pd.Timestamp("2025-08-01"), pd.NaT, pd.Timestamp("2025-09-01")],
+        "e": [1, "mixed", None],
+    })
+    df.columns = labels
+    return df
+
+def test_round_trip_keeps_columns_and_labels(tmp_path):
+    for labels in (["Term", "Utility", 3, "Start", "Notes"],
+                   ["Term", datetime(2025, 8, 1), 12.5, np.nan, None],
+                   ["Term", "Term", pd.Timestamp("2025-08-01"), 7, "x"]):
+        directory = tmp_path / str(len(list(tmp_path.iterdir())))
+        directory.mkdir()
+        df = _frame(labels)
+        write_frame(str(directory), df)
+        pdt.assert_frame_equal(read_frame(str(directory)), df)
+
+def test_frames_with_odd_labels_are_cached(tmp_path, monkeypatch):
+    import frame_cache
+    monkeypatch.setattr(frame_cache, "FRAME_CACHE_DIR", str(tmp_path))
+    df = _frame(["Term", datetime(2025, 8, 1), 12.5, "Start", "Notes"])
+    assert save_frame("odd", df)
+    pdt.assert_frame_equal(load_frame("odd"), df)
+
+def test_snapshot_with_a_date_header_is_shared(pricing_app, tmp_path, monkeypatch):
+    monkeypatch.setattr(shared_snapshot, "SNAPSHOT_DIR", str(tmp_path / "snapshots"))
+    monkeypatch.setattr(shared_snapshot, "_sharing_broken", False)
+    monkeypatch.setattr(shared_snapshot, "_publish_failures", 0)
+    snap = pricing_app.pricing_snapshot
+    x_con = snap.frames["X-Con"].copy()
+    x_con.columns = list(x_con.columns[:-1]) + [datetime(2025, 8, 1)]
+    odd = dataclasses.replace(snap, version="odd-header", frames=MappingProxyType(dict(snap.frames, **{"X-Con": x_con})))
+    assert shared_snapshot.ensure_published(odd)
+    attached = shared_snapshot.attach_snapshot("odd-header")
+    pdt.assert_frame_equal(attached.frames["X-Con"], x_con)
+    assert shared_snapshot.sharing_enabled()
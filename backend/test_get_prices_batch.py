@@ -0,0 +1,51 @@
+import pytest
+
+def _site(price_request, **changes):
+    return dict(price_request, **changes)
+
+def test_batch_matches_single_requests(pricing_app, client, price_request):
+    top_bracket = float(pricing_app.pricing_snapshot.store["volume_bounds"][-1]) + 1
+    sites = [
+        price_request,
+        _site(price_request, annual_volume=top_bracket),
+        _site(price_request, zipcode="00000"),
+        _site(price_request, utility=price_request["utility"].upper()),
+    ]
+    response = client.post("/get-prices/batch", json=sites)
+    assert response.status_code == 200
+    results = response.json()
+    assert [r["index"] for r in results] == [0, 1, 2, 3]
+    assert [r["zipcode"] for r in results] == [s["zipcode"] for s in sites]
+    for site, result in zip(sites, results):
+        single = client.post("/get-prices", json=site)
+        if single.status_code == 422:
+            assert result["results"] == [] and result["error"] == pricing_app.UNKNOWN_ZIP_DETAIL
+        else:
+            assert result["error"] is None and result["results"] == single.json()
+    assert results[0]["results"]
+
+def test_sites_sharing_a_key_are_priced_once(pricing_app, client, price_request, monkeypatch):
+    calls = []
+    price_key = pricing_app._price_key
+    monkeypatch.setattr(pricing_app, "_price_key", lambda store, key, *args: calls.append(key) or price_key(store, key, *args))
+    sites = [price_request, _site(price_request, annual_volume=price_request["annual_volume"] + 1),
+             _site(price_request, load_factor=price_request["load_factor"].lower())] * 10
+    response = client.post("/get-prices/batch", json=sites)
+    assert response.status_code == 200
+    assert len({repr(r["results"]) for r in response.json()}) == 1
+    assert len(calls) == 1
+
+def test_oversized_batch_is_rejected(pricing_app, client, price_request, monkeypatch):
+    monkeypatch.setattr(pricing_app, "MAX_BATCH_SITES", 3)
+    assert client.post("/get-prices/batch", json=[price_request] * 3).status_code == 200
+    response = client.post("/get-prices/batch", json=[price_request] * 4)
+    assert response.status_code == 413
+    assert "max 3" in response.json()["detail"]
+
+@pytest.mark.parametrize("body", [{}, [{"zipcode": "75001"}]])
+def test_malformed_batch_is_a_validation_error(client, body):
+    assert client.post("/get-prices/batch", json=body).status_code == 422
+
+def test_empty_batch(client):
+    response = client.post("/get-prices/batch", json=[])
+    assert response.status_code == 200 and response.json() == []
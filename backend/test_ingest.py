@@ -0,0 +1,55 @@
+import uuid
+from concurrent.futures.process import BrokenProcessPool
+import pytest
+import ingest
+from ingest import ingest_sources
+
+@pytest.fixture
+def sources(synthetic_data):
+    """rep -> ingest spec for the synthetic workbooks, under a file hash no frame cache entry has."""
+    import main
+    paths = {"TX_MATRIX_*.xlsx": synthetic_data["engie"]["path"], "* - AE TEXAS.xlsx": synthetic_data["atlantic"]["path"]}
+    file_hash = uuid.uuid4().hex
+    return {rep_name: (loader, paths[pattern], sheet, file_hash) for rep_name, (pattern, loader, sheet) in main.PRICING_SOURCES.items()}
+
+@pytest.fixture
+def pool_calls(monkeypatch):
+    """Workbook groups handed to the process pool; the pool itself is replaced by in-process parsing."""
+    monkeypatch.setattr(ingest, "PRICING_LOAD_WORKERS", 4)
+    calls = []
+
+    def fake_parallel(sources, rep_names, loaded, errors):
+        calls.append(sorted(rep_names))
+        ingest._ingest_serial(sources, rep_names, loaded, errors)
+    monkeypatch.setattr(ingest, "_ingest_parallel", fake_parallel)
+    return calls
+
+def test_one_workbook_is_parsed_in_process(sources, pool_calls):
+    tx_only = {rep_name: sources[rep_name] for rep_name in ("Engie", "X-Con")}
+    loaded, errors = ingest_sources(tx_only)
+    assert sorted(loaded) == ["Engie", "X-Con"] and not errors
+    assert pool_calls == []
+
+def test_several_workbooks_use_the_pool(sources, pool_calls):
+    loaded, errors = ingest_sources(sources)
+    assert sorted(loaded) == ["Atlantic", "Engie", "X-Con"] and not errors
+    assert pool_calls == [["Atlantic", "Engie", "X-Con"]]
+
+def test_cached_frames_are_not_parsed_again(sources, pool_calls):
+    first, _ = ingest_sources(sources)
+    again, errors = ingest_sources(sources)
+    assert sorted(again) == sorted(first) and not errors
+    assert len(pool_calls) == 1
+    for rep_name, df in again.items():
+        assert df.equals(first[rep_name])
+
+def test_broken_pool_falls_back_to_in_process_loading(sources, monkeypatch):
+    monkeypatch.setattr(ingest, "PRICING_LOAD_WORKERS", 4)
+
+    def broken(sources, rep_names, loaded, errors):
+        loaded["Atlantic"] = None  # finished before the pool broke; kept as is
+        raise BrokenProcessPool("worker died")
+    monkeypatch.setattr(ingest, "_ingest_parallel", broken)
+    loaded, errors = ingest_sources(sources)
+    assert sorted(loaded) == ["Atlantic", "Engie", "X-Con"] and not errors
+    assert loaded["Atlantic"] is None
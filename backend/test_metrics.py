@@ -0,0 +1,80 @@
+import re
+import pytest
+import metrics
+from metrics import CallbackMetric, Counter, Histogram, render_metrics
+
+SAMPLE = re.compile(r'^([a-zA-Z_:][a-zA-Z0-9_:]*)(?:\{(.*)\})? (\S+)$')
+LABEL = re.compile(r'([a-zA-Z_][a-zA-Z0-9_]*)="((?:[^"\\]|\\.)*)"')
+
+def parse(text):
+    """{(name, frozenset of label pairs): value} for every sample; checks each metric has HELP and TYPE first."""
+    samples, declared = {}, set()
+    for line in text.splitlines():
+        if line.startswith("# HELP ") or line.startswith("# TYPE "):
+            declared.add((line[2:6], line.split()[2]))
+            continue
+        name, labels, value = SAMPLE.match(line).groups()
+        family = re.sub(r"_(bucket|sum|count)$", "", name)
+        assert ("HELP", family) in declared or ("HELP", name) in declared, line
+        samples[(name, frozenset(LABEL.findall(labels or "")))] = float(value)
+    return samples
+
+@pytest.fixture
+def registry(monkeypatch):
+    """An empty registry for metrics created by the test."""
+    monkeypatch.setattr(metrics, "_REGISTRY", [])
+
+def test_counter_and_labels(registry):
+    c = Counter("t_total", "Help.", ("path",))
+    c.inc(('a"b\\c\nd',))
+    c.inc(("x",), 2.5)
+    assert render_metrics() == (
+        '# HELP t_total Help.\n# TYPE t_total counter\n'
+        't_total{path="a\\"b\\\\c\\nd"} 1.0\n'
+        't_total{path="x"} 2.5\n'
+    )
+
+def test_histogram_buckets_are_cumulative(registry):
+    h = Histogram("t_seconds", "Help.", ("stage",), buckets=(0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 3.0):
+        h.observe(("zip",), value)
+    samples = parse(render_metrics())
+    bucket = lambda le: samples[("t_seconds_bucket", frozenset({("stage", "zip"), ("le", le)}))]
+    assert (bucket("0.1"), bucket("1.0"), bucket("+Inf")) == (2, 3, 4)
+    assert samples[("t_seconds_count", frozenset({("stage", "zip")}))] == 4
+    assert samples[("t_seconds_sum", frozenset({("stage", "zip")}))] == pytest.approx(3.65)
+
+def test_failing_or_empty_callbacks_are_skipped(registry):
+    CallbackMetric("t_broken", "Help.", lambda: 1 / 0)
+    CallbackMetric("t_none", "Help.", lambda: None)
+    CallbackMetric("t_by_kind", "Help.", lambda: {("b",): 2, ("a",): 1}, ("kind",), "counter")
+    assert render_metrics() == (
+        "# HELP t_none Help.\n# TYPE t_none gauge\n"
+        '# HELP t_by_kind Help.\n# TYPE t_by_kind counter\nt_by_kind{kind="a"} 1\nt_by_kind{kind="b"} 2\n'
+    )
+
+def test_metrics_endpoint(pricing_app, client, price_request):
+    def scrape():
+        response = client.get("/metrics")
+        assert response.status_code == 200 and response.headers["content-type"].startswith("text/plain; version=0.0.4")
+        return parse(response.text)
+
+    ok = ("pricing_http_requests_total", frozenset({("method", "POST"), ("endpoint", "/get-prices"), ("status", "200")}))
+    zip_route = ("pricing_http_requests_total", frozenset({("method", "GET"), ("endpoint", "/debug/zip/{zipcode}"), ("status", "200")}))
+    unmatched = ("pricing_http_requests_total", frozenset({("method", "GET"), ("endpoint", "unmatched"), ("status", "404")}))
+    before = scrape()
+    assert client.post("/get-prices", json=price_request).status_code == 200
+    client.get(f"/debug/zip/{price_request['zipcode']}")
+    client.get("/no-such-route")
+    after = scrape()
+    for sample in (ok, zip_route, unmatched):
+        assert after[sample] == before.get(sample, 0) + 1
+    for stage in ("zip", "normalize", "cache", "filter", "format", "serialize"):
+        key = ("pricing_stage_seconds_count", frozenset({("stage", stage)}))
+        assert after[key] >= before.get(key, 0) + 1, stage
+    assert after[("pricing_quote_store_rows", frozenset())] == pricing_app.pricing_snapshot.store["rows"]
+    assert after[("pricing_ready", frozenset())] == 0
+    assert after[("pricing_refreshes_total", frozenset({("result", "success")}))] >= 1
+    quoted = sum(v for (name, labels), v in after.items() if name == "pricing_rep_quotes_total") - \
+        sum(v for (name, labels), v in before.items() if name == "pricing_rep_quotes_total")
+    assert quoted == len(pricing_app.pricing_snapshot.store["reps"])
@@ -0,0 +1,40 @@
+import threading
+import pytest
+import pricing_executor
+from utils import normalize_start_month
+
+@pytest.fixture
+def saturated(pricing_app, monkeypatch):
+    """Every pricing worker and queue slot is taken."""
+    monkeypatch.setattr(pricing_executor, "_slots", threading.BoundedSemaphore(1))
+    pricing_executor._slots.acquire()
+    return pricing_app
+
+def test_cache_miss_is_503_with_retry_after(saturated, client, price_request):
+    normalize_start_month(price_request["start_month"])  # the key itself is built on the event loop
+    response = client.post("/get-prices", json=price_request)
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == pricing_executor.PRICING_RETRY_AFTER
+    assert "overloaded" in response.json()["detail"]
+
+def test_cache_hits_are_served_while_saturated(saturated, client, price_request):
+    saturated.warm_up_snapshot(saturated.pricing_snapshot)
+    response = client.post("/get-prices", json=price_request)
+    assert response.status_code == 200 and response.json()
+
+def test_key_that_needs_a_worker_is_503(saturated, client, price_request):
+    saturated.warm_up_snapshot(saturated.pricing_snapshot)
+    unseen_spelling = dict(price_request, start_month=f"  start {price_request['start_month']}  ")
+    response = client.post("/get-prices", json=unseen_spelling)
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == pricing_executor.PRICING_RETRY_AFTER
+
+def test_batch_is_503_with_retry_after(saturated, client, price_request):
+    response = client.post("/get-prices/batch", json=[price_request])
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == pricing_executor.PRICING_RETRY_AFTER
+
+def test_rejections_are_counted(saturated, client, price_request):
+    before = pricing_executor.executor_stats()["rejected_full"]
+    client.post("/get-prices/batch", json=[price_request])
+    assert pricing_executor.executor_stats()["rejected_full"] == before + 1
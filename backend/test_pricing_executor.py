@@ -0,0 +1,61 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+import pricing_executor
+from pricing_executor import PricingOverloaded, executor_stats, run_pricing
+
+@pytest.fixture
+def one_worker(monkeypatch):
+    """A pricing pool with one worker and room for one queued request."""
+    executor = ThreadPoolExecutor(max_workers=1)
+    monkeypatch.setattr(pricing_executor, "_executor", executor)
+    monkeypatch.setattr(pricing_executor, "_slots", threading.BoundedSemaphore(2))
+    yield executor
+    executor.shutdown(wait=True)
+
+def test_runs_work_and_returns_its_result(one_worker):
+    assert asyncio.run(run_pricing(lambda a, b: a + b, 2, 3)) == 5
+
+def test_worker_exceptions_reach_the_caller(one_worker):
+    def fail():
+        raise ValueError("bad key")
+    with pytest.raises(ValueError, match="bad key"):
+        asyncio.run(run_pricing(fail))
+    assert pricing_executor._slots.acquire(blocking=False)  # the slot was given back
+
+def test_full_queue_is_rejected(one_worker):
+    release = threading.Event()
+
+    async def scenario():
+        busy = asyncio.ensure_future(run_pricing(release.wait, 5))
+        queued = asyncio.ensure_future(run_pricing(lambda: "queued"))
+        await asyncio.sleep(0)
+        rejected_before = executor_stats()["rejected_full"]
+        with pytest.raises(PricingOverloaded, match="full"):
+            await run_pricing(lambda: "rejected")
+        assert executor_stats()["rejected_full"] == rejected_before + 1
+        release.set()
+        return await busy, await queued
+
+    assert asyncio.run(scenario()) == (True, "queued")
+
+def test_requests_that_waited_too_long_are_rejected(one_worker, monkeypatch):
+    monkeypatch.setattr(pricing_executor, "PRICING_MAX_QUEUE_SECONDS", 0.05)
+    started = threading.Event()
+
+    def slow():
+        started.set()
+        threading.Event().wait(0.2)
+        return "slow"
+
+    async def scenario():
+        busy = asyncio.ensure_future(run_pricing(slow))
+        await asyncio.get_running_loop().run_in_executor(None, started.wait, 5)
+        rejected_before = executor_stats()["rejected_stale"]
+        with pytest.raises(PricingOverloaded, match="waited"):
+            await run_pricing(lambda: "stale")
+        assert executor_stats()["rejected_stale"] == rejected_before + 1
+        return await busy
+
+    assert asyncio.run(scenario()) == "slow"
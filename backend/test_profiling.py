@@ -0,0 +1,69 @@
+import json
+from collections import deque
+import pytest
+import profiling
+from profiling import record_stage
+
+STAGES = ["zip", "normalize", "cache", "filter", "format", "serialize"]
+
+@pytest.fixture
+def profiling_on(tmp_path, monkeypatch):
+    """Profiling enabled with token "secret", logging to a private side log."""
+    monkeypatch.setattr(profiling, "PROFILE_ADMIN_TOKEN", "secret")
+    monkeypatch.setattr(profiling, "PROFILE_LOG", str(tmp_path / "profile.log"))
+    monkeypatch.setattr(profiling, "_recent", deque(maxlen=5))
+    monkeypatch.setattr(profiling, "_side_log", None)
+    yield tmp_path / "profile.log"
+    if profiling._side_log is not None:
+        profiling._logger.removeHandler(profiling._side_log)
+        profiling._side_log.close()
+
+def _timings(header):
+    return [part.split(";dur=")[0] for part in header.split(", ")]
+
+def test_profiled_request_gets_server_timing(profiling_on, client, price_request):
+    response = client.post("/get-prices", json=price_request, headers={"X-Profile": "1", "X-Admin-Token": "secret"})
+    assert response.status_code == 200
+    assert _timings(response.headers["Server-Timing"]) == STAGES + ["total"]
+    profile_id = response.headers["X-Profile-Id"]
+
+    profiles = client.get("/debug/profiles", headers={"X-Admin-Token": "secret"}).json()
+    assert [p["id"] for p in profiles] == [profile_id]
+    profile = profiles[0]
+    assert (profile["path"], profile["status"]) == ("/get-prices", 200)
+    assert [stage for stage, _ in profile["stages_ms"]] == STAGES
+    assert profile["total_ms"] >= sum(ms for _, ms in profile["stages_ms"])
+    logged = [json.loads(line) for line in profiling_on.read_text(encoding="utf-8").splitlines()]
+    assert [p["id"] for p in logged] == [profile_id]
+
+def test_query_flag_and_cache_hits(profiling_on, client, price_request):
+    client.post("/get-prices", json=price_request)
+    response = client.post("/get-prices?profile=1", json=price_request, headers={"X-Admin-Token": "secret"})
+    assert _timings(response.headers["Server-Timing"]) == ["zip", "normalize", "cache", "serialize", "total"]
+
+@pytest.mark.parametrize("headers", [
+    {"X-Profile": "1"},
+    {"X-Profile": "1", "X-Admin-Token": "wrong"},
+    {"X-Admin-Token": "secret"},
+    {"X-Profile": "0", "X-Admin-Token": "secret"},
+])
+def test_requests_without_flag_and_token_are_not_profiled(profiling_on, client, price_request, headers):
+    response = client.post("/get-prices", json=price_request, headers=headers)
+    assert response.status_code == 200
+    assert "Server-Timing" not in response.headers and "X-Profile-Id" not in response.headers
+    assert profiling.recent_profiles() == []
+
+def test_profiles_need_the_admin_token(profiling_on, client):
+    assert client.get("/debug/profiles").status_code == 403
+    assert client.get("/debug/profiles", headers={"X-Admin-Token": "wrong"}).status_code == 403
+    assert client.get("/debug/profiles", headers={"X-Admin-Token": "secret"}).status_code == 200
+
+def test_profiling_is_off_without_a_configured_token(client, price_request, monkeypatch):
+    monkeypatch.setattr(profiling, "PROFILE_ADMIN_TOKEN", "")
+    response = client.post("/get-prices", json=price_request, headers={"X-Profile": "1", "X-Admin-Token": ""})
+    assert "Server-Timing" not in response.headers
+    assert client.get("/debug/profiles", headers={"X-Admin-Token": ""}).status_code == 403
+
+def test_stages_outside_a_profiled_request_are_dropped():
+    record_stage("filter", 0.5)  # no profile in this context: a no-op
+    assert profiling._stages.get() is None
@@ -0,0 +1,94 @@
+import itertools
+from types import SimpleNamespace
+import numpy as np
+import pandas as pd
+from json_codec import dumps
+from quote_store import query_quote_store, render_quotes, match_quote_rows, volume_bucket
+from utils import PRICING_KEY_COLUMNS, build_row_index, normalize_utility, resolve_utility_for_rep
+
+def _scan(df, key):
+    """Rows of df matching a (start, utility, zone, LF) key, found without the index."""
+    mask = np.ones(len(df), dtype=bool)
+    for col, value in zip(PRICING_KEY_COLUMNS, key):
+        mask &= (df[col] == value).to_numpy()
+    return df[mask]
+
+def _rep_utilities(store, utility):
+    return {rep_name: normalize_utility(resolve_utility_for_rep(utility, rep_name)) for rep_name in store["reps"]}
+
+# --- Row index ---
+def test_row_index_keeps_row_order_within_a_key():
+    df = pd.DataFrame({
+        "Start Month": ["May 2026", "April 2026", "May 2026", "May 2026"],
+        "Utility": ["oncor"] * 4,
+        "Congestion Zone": ["NORTH"] * 4,
+        "Load Factor": ["HI", "HI", "HI", None],
+        "Term": [24, 12, 6, 36],
+    })
+    sorted_df, index = build_row_index(df)
+    start, stop = index[("May 2026", "oncor", "NORTH", "HI")]
+    assert sorted_df["Term"].iloc[start:stop].tolist() == [24, 6]
+    assert index[("April 2026", "oncor", "NORTH", "HI")] == (0, 1)
+    assert len(index) == 2  # the row without a load factor is not indexed
+
+def test_snapshot_indexes_match_a_full_scan(pricing_app):
+    snap = pricing_app.pricing_snapshot
+    assert set(snap.indexes) == set(pricing_app.PRICING_SOURCES)
+    for rep_name, index in snap.indexes.items():
+        df = snap.frames[rep_name]
+        assert index, f"{rep_name}: nothing indexed"
+        spans = sorted(index.values())
+        assert all(a[1] <= b[0] for a, b in zip(spans, spans[1:]))
+        assert sum(stop - start for start, stop in spans) == df[PRICING_KEY_COLUMNS].notna().all(axis=1).sum()
+        for key, (start, stop) in index.items():
+            assert list(_scan(df, key).index) == list(range(start, stop)), f"{rep_name} {key}"
+
+# --- Quote store ---
+def test_quote_store_matches_the_vendor_filters(pricing_app):
+    """For every key a real request can produce and every volume bracket, the store returns what the
+    vendor-shaped per-request filters return over a full scan of each REP's frame, sorted by (term, rep)."""
+    snap = pricing_app.pricing_snapshot
+    store = snap.store
+    bounds = store["volume_bounds"].tolist()
+    volumes = [bounds[0] / 2] + [b + 1 for b in bounds]
+    keys = pricing_app.request_keys(store)
+    assert keys
+    for (start, utility, zone, load_factor), volume in itertools.product(keys, volumes):
+        utilities = _rep_utilities(store, utility)
+        req = SimpleNamespace(annual_volume=volume)
+        expected = []
+        for rep_name, rep_filter in pricing_app.FRAME_FILTERS.items():
+            rows = _scan(snap.frames[rep_name], (start, utilities[rep_name], zone, load_factor))
+            if not rows.empty:
+                expected += rep_filter(rows, req)
+        expected.sort(key=lambda q: (q["term"], q["rep"]))
+        assert query_quote_store(store, start, utilities, zone, load_factor, volume) == expected, (start, utility, zone, load_factor, volume)
+
+def test_volumes_in_one_bucket_get_the_same_quotes(pricing_app):
+    store = pricing_app.pricing_snapshot.store
+    start, utility, zone, load_factor = pricing_app.request_keys(store)[0]
+    utilities = _rep_utilities(store, utility)
+    bounds = store["volume_bounds"].tolist()
+    for lo, hi in zip(bounds, bounds[1:]):
+        below_hi = float(np.nextafter(hi, 0))
+        assert volume_bucket(store, lo) == volume_bucket(store, (lo + hi) / 2) == volume_bucket(store, below_hi)
+        assert volume_bucket(store, hi) == volume_bucket(store, lo) + 1
+        assert query_quote_store(store, start, utilities, zone, load_factor, lo) == \
+            query_quote_store(store, start, utilities, zone, load_factor, below_hi)
+
+def test_rendered_quotes_are_the_encoded_quotes(pricing_app):
+    store = pricing_app.pricing_snapshot.store
+    start, utility, zone, load_factor = pricing_app.request_keys(store)[0]
+    utilities = _rep_utilities(store, utility)
+    rendered = render_quotes(store, match_quote_rows(store, start, utilities, zone, load_factor, 100_000))
+    quotes = query_quote_store(store, start, utilities, zone, load_factor, 100_000)
+    assert quotes
+    assert rendered.body == dumps(quotes)
+    assert rendered.reps == {q["rep"] for q in quotes}
+
+def test_unknown_key_has_no_quotes(pricing_app):
+    store = pricing_app.pricing_snapshot.store
+    start, utility, zone, load_factor = pricing_app.request_keys(store)[0]
+    utilities = _rep_utilities(store, utility)
+    assert query_quote_store(store, start, utilities, zone, "NOPE", 100_000) == []
+    assert render_quotes(store, match_quote_rows(store, "January 1990", utilities, zone, load_factor, 100_000)) == (b"[]", frozenset())
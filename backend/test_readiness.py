@@ -0,0 +1,68 @@
+from datetime import datetime
+import pytest
+from fastapi.testclient import TestClient
+from response_cache import cache_stats
+
+@pytest.fixture
+def loading_app(monkeypatch):
+    """main before any pricing data has loaded."""
+    import main
+    monkeypatch.setattr(main, "pricing_snapshot", main.EMPTY_SNAPSHOT)
+    monkeypatch.setattr(main, "last_refresh_status", dict.fromkeys(main.last_refresh_status, None))
+    monkeypatch.setattr(main, "readiness", dict.fromkeys(main.readiness, None))
+    return main
+
+BODY = {"start_month": "August 2025", "utility": "Oncor", "zipcode": "75001", "load_factor": "HI", "annual_volume": 100000}
+
+def test_not_ready_while_loading(loading_app):
+    client = TestClient(loading_app.app)
+    assert client.get("/healthz").status_code == 200
+    response = client.get("/readyz")
+    assert response.status_code == 503 and response.headers["Retry-After"] == "5"
+    assert response.json() == {"ready": False, "reason": "loading"}
+    response = client.post("/get-prices", json=BODY)
+    assert response.status_code == 503 and response.headers["Retry-After"] == "5"
+    assert client.post("/get-prices/batch", json=[BODY]).status_code == 503
+
+def test_failed_first_load_is_reported(loading_app, monkeypatch, tmp_path):
+    monkeypatch.setattr(loading_app, "PRICING_DIR", str(tmp_path))
+    assert not loading_app.refresh_pricing_data()
+    response = TestClient(loading_app.app).get("/readyz")
+    assert response.status_code == 503
+    assert response.json()["reason"].startswith("load failed: No files matching pattern")
+
+def test_ready_once_loaded_and_warmed(pricing_app, client):
+    response = client.get("/readyz")
+    assert response.status_code == 503 and response.json()["reason"] == "warming up"
+    pricing_app.warm_up_snapshot(pricing_app.pricing_snapshot)
+    response = client.get("/readyz")
+    assert response.status_code == 200
+    body = response.json()
+    assert body["ready"] and body["data_version"] == pricing_app.pricing_snapshot.version
+    assert body["warmed_version"] == pricing_app.pricing_snapshot.version
+
+def test_warm_up_fills_the_cache_real_requests_hit(pricing_app, client, price_request):
+    store = pricing_app.pricing_snapshot.store
+    expected = len(pricing_app.request_keys(store)) * len(store["volume_bounds"])
+    assert expected <= pricing_app.RESULT_CACHE_SIZE
+    assert pricing_app.warm_up_snapshot(pricing_app.pricing_snapshot) == expected
+    assert cache_stats()["size"] == expected
+    hits = cache_stats()["hits"]
+    for volume in store["volume_bounds"].tolist():
+        assert client.post("/get-prices", json=dict(price_request, annual_volume=volume)).status_code == 200
+    assert cache_stats()["hits"] == hits + len(store["volume_bounds"])
+    assert cache_stats()["size"] == expected
+
+def test_warm_up_stops_at_its_budget(pricing_app, monkeypatch):
+    monkeypatch.setattr(pricing_app, "PRICING_WARMUP_ENTRIES", 5)
+    assert pricing_app.warm_up_snapshot(pricing_app.pricing_snapshot) == 5
+    assert pricing_app.readiness["warmup_entries"] == 5
+
+def test_request_keys_use_request_spellings(pricing_app):
+    keys = pricing_app.request_keys(pricing_app.pricing_snapshot.store)
+    utilities = {utility for _, utility, _, _ in keys}
+    assert utilities <= {pricing_app.normalize_utility(name) for name in pricing_app.UTILITY_MAPPING}
+    assert "cpt" not in utilities  # Engie's own spelling for CenterPoint
+    this_month = datetime.now().replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    order = [(month < this_month, month) for month in (pricing_app._start_month_order(start) for start, _, _, _ in keys)]
+    assert order == sorted(order)  # upcoming months first, soonest first; past months last
@@ -0,0 +1,87 @@
+import os
+import glob
+from openpyxl import load_workbook
+from pricing_snapshot import changed_sources
+
+def _latest(main):
+    return {rep_name: main.get_latest_file(main.PRICING_DIR, pattern) for rep_name, (pattern, _, _) in main.PRICING_SOURCES.items()}
+
+def _rewrite(path, edit):
+    """Edit a workbook in place and move its mtime forward so the change is noticed."""
+    st = os.stat(path)
+    wb = load_workbook(path)
+    edit(wb)
+    wb.save(path)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+
+def _engie_path(main):
+    return glob.glob(os.path.join(main.PRICING_DIR, main.PRICING_SOURCES["Engie"][0]))[0]
+
+def _bump_all_in_prices(wb):
+    for row in wb["All In Matrix"].iter_rows(min_row=6):
+        row[8].value = (row[8].value or 0) + 1
+
+def _break_x_con(wb):
+    for row in wb["X-Con Matrix"].iter_rows(min_row=1, max_row=6):
+        for cell in row:
+            cell.value = None
+
+# --- Change detection ---
+def test_unchanged_sources_are_not_reloaded(pricing_app):
+    before = pricing_app.pricing_snapshot
+    assert not pricing_app.refresh_pricing_data()
+    path = _engie_path(pricing_app)
+    st = os.stat(path)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))  # touched, same content
+    assert not pricing_app.refresh_pricing_data()
+    assert pricing_app.pricing_snapshot is before
+
+def test_edited_workbook_reloads_only_its_reps(pricing_app):
+    before = pricing_app.pricing_snapshot
+    _rewrite(_engie_path(pricing_app), _bump_all_in_prices)
+    changed, _, _ = changed_sources(before, _latest(pricing_app))
+    assert sorted(changed) == ["Engie", "X-Con"]  # both are read from the TX matrix
+
+    assert pricing_app.refresh_pricing_data()
+    after = pricing_app.pricing_snapshot
+    assert sorted(pricing_app.last_refresh_status["reloaded"]) == ["Engie", "X-Con"]
+    assert after.version != before.version
+    assert after.frames["Atlantic"] is before.frames["Atlantic"]
+    assert after.rep_hashes["Atlantic"] == before.rep_hashes["Atlantic"]
+
+# --- Partial failure ---
+def test_failed_rep_keeps_its_data_and_is_retried(pricing_app):
+    before = pricing_app.pricing_snapshot
+    _rewrite(_engie_path(pricing_app), lambda wb: (_bump_all_in_prices(wb), _break_x_con(wb)))
+
+    assert pricing_app.refresh_pricing_data()
+    after = pricing_app.pricing_snapshot
+    status = pricing_app.last_refresh_status
+    assert list(status["failed"]) == ["X-Con"]
+    assert status["reloaded"] == ["Engie"]
+    assert not status["success"]
+    # The new Engie prices are served under a new version; X-Con keeps its old frame and source hash
+    assert after.version != before.version
+    assert after.frames["Engie"] is not before.frames["Engie"]
+    assert after.frames["X-Con"] is before.frames["X-Con"]
+    assert after.rep_hashes["X-Con"] == before.rep_hashes["X-Con"]
+    assert after.rep_hashes["Engie"] != before.rep_hashes["Engie"]
+
+    # The next poll retries only the REP that failed; if it still fails nothing is installed
+    changed, _, _ = changed_sources(after, _latest(pricing_app))
+    assert changed == ["X-Con"]
+    assert not pricing_app.refresh_pricing_data()
+    assert pricing_app.pricing_snapshot is after
+    assert list(pricing_app.last_refresh_status["failed"]) == ["X-Con"]
+
+def test_failed_refresh_keeps_serving_the_previous_snapshot(pricing_app):
+    before = pricing_app.pricing_snapshot
+    path = _engie_path(pricing_app)
+    st = os.stat(path)
+    with open(path, "wb") as f:
+        f.write(b"not a workbook")
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+
+    assert not pricing_app.refresh_pricing_data()
+    assert pricing_app.pricing_snapshot is before
+    assert sorted(pricing_app.last_refresh_status["failed"]) == ["Engie", "X-Con"]
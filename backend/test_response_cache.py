@@ -0,0 +1,51 @@
+import dataclasses
+from response_cache import cache_get, cache_put, cache_clear, make_etag, etag_matches
+
+# --- ETags ---
+def test_etag_matches_listed_tags_only():
+    etag = make_etag("v1", ("May 2026", "oncor", "NORTH", "HI", 2))
+    assert etag.startswith('"') and etag.endswith('"')
+    assert etag_matches(etag, etag)
+    assert etag_matches(f'"other", W/{etag}', etag)
+    assert not etag_matches(None, etag)
+    assert not etag_matches("", etag)
+    assert not etag_matches('"other"', etag)
+    assert not etag_matches("*", etag)
+
+def test_etag_depends_on_version_and_key():
+    key = ("May 2026", "oncor", "NORTH", "HI", 2)
+    assert make_etag("v1", key) == make_etag("v1", key)
+    assert make_etag("v2", key) != make_etag("v1", key)
+    assert make_etag("v1", key[:-1] + (3,)) != make_etag("v1", key)
+
+def test_cache_round_trip():
+    cache_clear()
+    cache_put(("v1", "key"), b"[]")
+    assert cache_get(("v1", "key")) == b"[]"
+    assert cache_get(("v2", "key")) is None
+    cache_clear()
+    assert cache_get(("v1", "key")) is None
+
+# --- /get-prices conditional requests ---
+def test_get_prices_answers_304_for_its_etag(pricing_app, client, price_request):
+    first = client.post("/get-prices", json=price_request)
+    assert first.status_code == 200 and first.json()
+    etag = first.headers["ETag"]
+
+    again = client.post("/get-prices", json=price_request, headers={"If-None-Match": etag})
+    assert again.status_code == 304 and again.content == b""
+    assert again.headers["ETag"] == etag
+
+    for if_none_match in ("*", '"stale"'):
+        fresh = client.post("/get-prices", json=price_request, headers={"If-None-Match": if_none_match})
+        assert fresh.status_code == 200 and fresh.content == first.content
+
+    top_bracket = float(pricing_app.pricing_snapshot.store["volume_bounds"][-1]) + 1
+    other = client.post("/get-prices", json=dict(price_request, annual_volume=top_bracket), headers={"If-None-Match": etag})
+    assert other.status_code == 200 and other.headers["ETag"] != etag
+
+def test_new_data_version_changes_the_etag(pricing_app, client, price_request, monkeypatch):
+    etag = client.post("/get-prices", json=price_request).headers["ETag"]
+    monkeypatch.setattr(pricing_app, "pricing_snapshot", dataclasses.replace(pricing_app.pricing_snapshot, version="next"))
+    response = client.post("/get-prices", json=price_request, headers={"If-None-Match": etag})
+    assert response.status_code == 200 and response.headers["ETag"] != etag
@@ -0,0 +1,88 @@
+import os
+import errno
+import fcntl
+import pytest
+import shared_snapshot
+from shared_snapshot import IncompatibleSnapshot, attach_snapshot, current_version, ensure_published, sharing_enabled, try_become_loader
+from quote_store import query_quote_store
+
+@pytest.fixture
+def snapshot_dir(tmp_path, monkeypatch):
+    """Snapshot sharing on, in a private directory, with fresh loader state."""
+    directory = str(tmp_path / "snapshots")
+    monkeypatch.setattr(shared_snapshot, "SNAPSHOT_DIR", directory)
+    monkeypatch.setattr(shared_snapshot, "_sharing_broken", False)
+    monkeypatch.setattr(shared_snapshot, "_publish_failures", 0)
+    monkeypatch.setattr(shared_snapshot, "_lock_fd", None)
+    yield directory
+    if shared_snapshot._lock_fd is not None:
+        os.close(shared_snapshot._lock_fd)
+
+def _fail_publishing(monkeypatch, times):
+    """Make the next `times` publish attempts fail with ENOSPC."""
+    publish = shared_snapshot.publish_snapshot
+    calls = []
+
+    def flaky(snap):
+        calls.append(snap.version)
+        if len(calls) <= times:
+            raise OSError(errno.ENOSPC, "No space left on device")
+        publish(snap)
+    monkeypatch.setattr(shared_snapshot, "publish_snapshot", flaky)
+    return calls
+
+def test_published_snapshot_attaches_with_the_same_quotes(pricing_app, snapshot_dir):
+    snap = pricing_app.pricing_snapshot
+    assert ensure_published(snap)
+    assert current_version() == snap.version
+    attached = attach_snapshot(snap.version)
+    assert attached.version == snap.version and dict(attached.rep_hashes) == dict(snap.rep_hashes)
+    for rep_name, df in snap.frames.items():
+        assert attached.frames[rep_name].equals(df)
+        assert dict(attached.indexes[rep_name]) == dict(snap.indexes[rep_name])
+    for start, utility, zone, load_factor in pricing_app.request_keys(snap.store)[:50]:
+        utilities = {rep_name: utility for rep_name in snap.store["reps"]}
+        assert query_quote_store(attached.store, start, utilities, zone, load_factor, 100_000) == \
+            query_quote_store(snap.store, start, utilities, zone, load_factor, 100_000)
+
+def test_already_published_snapshot_is_not_written_again(pricing_app, snapshot_dir, monkeypatch):
+    assert ensure_published(pricing_app.pricing_snapshot)
+    calls = _fail_publishing(monkeypatch, 0)
+    assert ensure_published(pricing_app.pricing_snapshot)
+    assert calls == []
+
+def test_failed_publish_is_retried_on_the_next_poll(pricing_app, snapshot_dir, monkeypatch):
+    snap = pricing_app.pricing_snapshot
+    calls = _fail_publishing(monkeypatch, 1)
+    assert not ensure_published(snap)
+    assert current_version() is None
+    assert not pricing_app.refresh_pricing_data()  # nothing changed on disk
+    assert ensure_published(snap)
+    assert current_version() == snap.version and calls == [snap.version, snap.version]
+    assert sharing_enabled()
+
+def test_publish_that_keeps_failing_hands_over_loading(pricing_app, snapshot_dir, monkeypatch):
+    monkeypatch.setattr(shared_snapshot, "SNAPSHOT_PUBLISH_ATTEMPTS", 3)
+    assert try_become_loader()
+    calls = _fail_publishing(monkeypatch, 100)
+    for _ in range(3):
+        assert not ensure_published(pricing_app.pricing_snapshot)
+    assert len(calls) == 3
+    assert not sharing_enabled()
+    assert shared_snapshot._lock_fd is None
+    # Another worker can take the loader lock now and this one keeps loading for itself
+    fd = os.open(os.path.join(snapshot_dir, "loader.lock"), os.O_RDWR)
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    finally:
+        os.close(fd)
+    assert try_become_loader()
+    assert not ensure_published(pricing_app.pricing_snapshot)
+    assert len(calls) == 3
+
+def test_snapshot_from_other_code_is_not_attached(pricing_app, snapshot_dir, monkeypatch):
+    snap = pricing_app.pricing_snapshot
+    assert ensure_published(snap)
+    monkeypatch.setattr(shared_snapshot, "CODE_VERSION", "loader0.snapshot0")
+    with pytest.raises(IncompatibleSnapshot):
+        attach_snapshot(snap.version)
@@ -0,0 +1,50 @@
+import pytest
+import utils
+from utils import load_zip_zone_map, zip_to_zone
+
+MAP_CSV = """Zip,FromZip,ToZip,Prefix,Zone
+75001,,,,exact
+75001,,,,Exact Later
+,75000,75099,,range a
+,75050,75199,,range b
+,,,750,prefix under range
+,,,753,prefix 3
+,,,7530,prefix 4
+,,,754,first
+,,,754,repeated
+,,,76,prefix 2
+, 77000 ,77099,, spaced
+,77200,77100,,backwards
+"""
+
+@pytest.fixture
+def zip_map(tmp_path, monkeypatch):
+    """Load MAP_CSV as the ZIP map; the previously loaded map is put back afterwards."""
+    for name in ("_ZIP_MAP_CACHE", "_ZIP_MAP_LOADED", "_ZIP_MAP_PATH_ACTUAL"):
+        monkeypatch.setattr(utils, name, getattr(utils, name))
+    path = tmp_path / "zips.csv"
+    path.write_text(MAP_CSV, encoding="utf-8")
+    monkeypatch.setenv("ZIP_MAP_PATH", str(path))
+    return load_zip_zone_map(force=True)
+
+@pytest.mark.parametrize("zipcode, zone", [
+    ("75001", "EXACT LATER"),      # exact beats every rule; a later exact row wins
+    ("75001-1234", "EXACT LATER"),
+    ("75010", "RANGE A"),          # range beats prefix
+    ("75060", "RANGE A"),          # overlapping ranges: the earlier one wins
+    ("75150", "RANGE B"),
+    ("75100", "RANGE B"),
+    ("75310", "PREFIX 3"),
+    ("75305", "PREFIX 4"),         # the longer prefix wins
+    ("75400", "FIRST"),            # the first rule for a prefix wins
+    ("76999", "PREFIX 2"),
+    ("77050", "SPACED"),
+    ("77150", None),               # FromZip > ToZip is skipped
+    ("10001", None),
+    ("abc", None),
+])
+def test_zip_precedence(zip_map, zipcode, zone):
+    assert zip_to_zone(zipcode) == zone
+
+def test_counts(zip_map):
+    assert zip_map["counts"] == {"exact": 1, "ranges": 3, "prefixes": 6}  # distinct exact ZIPs
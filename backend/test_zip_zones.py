@@ -0,0 +1,71 @@
+import json
+import pytest
+from conftest import zip_in_zone
+
+@pytest.fixture
+def zips(pricing_app):
+    """(known ZIP, its zone) from the synthetic ZIP map."""
+    zone = pricing_app.request_keys(pricing_app.pricing_snapshot.store)[0][2]
+    return zip_in_zone(zone), zone
+
+def test_json_array(client, zips):
+    known, zone = zips
+    response = client.post("/zip-zones", json=[known, "00000", "7500", None, f"{known}-1234"])
+    assert response.status_code == 200
+    body = response.json()
+    assert [r["status"] for r in body["results"]] == ["ok", "unknown", "malformed", "malformed", "ok"]
+    assert [r["zone"] for r in body["results"]] == [zone, None, None, None, zone]
+    assert [r["zip"] for r in body["results"]] == [known, "00000", "7500", "", f"{known}-1234"]
+    assert body["results"][0]["zip5"] == known
+    assert (body["count"], body["unknown"], body["malformed"]) == (5, 1, 2)
+
+def test_csv_column(client, zips):
+    known, zone = zips
+    csv_body = f"﻿Name,ZIP Code\nA,{known}\nB\n\nC,00000\n".encode("utf-8")
+    response = client.post("/zip-zones?column=zip code", content=csv_body, headers={"Content-Type": "text/csv"})
+    assert response.status_code == 200
+    assert [(r["zip"], r["zone"]) for r in response.json()["results"]] == [(known, zone), ("", None), ("00000", None)]
+
+def test_one_zip_per_line(client, zips):
+    known, zone = zips
+    response = client.post("/zip-zones", content=f"{known}\r\n\n  00000  \n".encode(), headers={"Content-Type": "text/plain"})
+    assert [(r["zip"], r["zone"]) for r in response.json()["results"]] == [(known, zone), ("00000", None)]
+
+def test_results_stream_across_chunks(pricing_app, client, zips, monkeypatch):
+    monkeypatch.setattr(pricing_app, "BULK_ZIP_CHUNK", 2)
+    known, _ = zips
+    response = client.post("/zip-zones", json=[known] * 5)
+    body = json.loads(response.content)
+    assert len(body["results"]) == body["count"] == 5
+
+@pytest.mark.parametrize("content, content_type", [
+    (b"[1, 2", "application/json"),
+    (b'{"zip": "75001"}', "application/json"),
+    (b"[" * 100_000 + b"]" * 100_000, "application/json"),
+    (b"name,city\nA,Dallas\n", "text/csv"),
+    (b"zip\n" + b"7" * 200_000 + b"\n", "text/csv"),  # field over the csv module's limit
+    (b"zip\n\xff\xfe7500\n", "text/csv"),
+], ids=["truncated-json", "json-object", "deep-json", "csv-no-column", "csv-huge-field", "not-utf8"])
+def test_malformed_bodies_are_400(client, content, content_type):
+    response = client.post("/zip-zones", content=content, headers={"Content-Type": content_type})
+    assert response.status_code == 400
+    assert response.json()["detail"].startswith("Malformed body")
+
+def test_body_over_the_byte_cap_is_413(pricing_app, client, zips, monkeypatch):
+    monkeypatch.setattr(pricing_app, "MAX_BULK_ZIP_BYTES", 100)
+    known, _ = zips
+    assert client.post("/zip-zones", json=[known] * 5).status_code == 200
+    assert client.post("/zip-zones", json=[known] * 20).status_code == 413
+
+    def chunked():  # no Content-Length: the cap is enforced while reading
+        for _ in range(20):
+            yield f"{known}\n".encode()
+    response = client.post("/zip-zones", content=chunked(), headers={"Content-Type": "text/plain"})
+    assert response.status_code == 413
+
+def test_too_many_zips_is_413(pricing_app, client, zips, monkeypatch):
+    monkeypatch.setattr(pricing_app, "MAX_BULK_ZIPS", 3)
+    known, _ = zips
+    assert client.post("/zip-zones", json=[known] * 3).status_code == 200
+    response = client.post("/zip-zones", json=[known] * 4)
+    assert response.status_code == 413 and "max 3" in response.json()["detail"]
@@ -2,11 +2,14 @@ from __future__ import annotations
 import os
 import re
 import csv
+import json
+import hashlib
 import logging
+import numpy as np
 import pandas as pd
 from datetime import datetime
-from functools import lru_cache
 from typing import Any, Dict, List, Tuple, Optional
+from ingest import read_sheet, sheet_frame
 
 UTILITY_MAPPING = {
     "centerpoint": {"engie": "cpt", "atlantic": "centerpoint"},
@@ -21,16 +24,42 @@ _DEFAULT_XLSX = os.path.join("pricing_data", "ZipCodeMap.xlsx")
 _DEFAULT_CSV  = os.path.join("pricing_data", "ZipCodeMap.csv")
 #_ZIP_MAP_PATH = os.getenv("ZIP_MAP_PATH") or (_DEFAULT_XLSX if os.path.isfile(_DEFAULT_XLSX) else _DEFAULT_CSV)
 
+UNKNOWN_START_MONTH = "Unknown Start Month"
+
 def normalize_start_month(val) -> str:
     #"""Normalize various date formats to 'Month YYYY'"""
     try:
         if pd.isnull(val):
-            return "Unknown Start Month"
+            return UNKNOWN_START_MONTH
         if isinstance(val, datetime):
             return val.strftime("%B %Y")
         if not isinstance(val, str):
             val = str(val)
+        hit = _START_MONTH_MEMO.get(val)
+        if hit is None:
+            hit = _normalize_start_month_str(val)
+            if len(_START_MONTH_MEMO) < _START_MONTH_MEMO_SIZE:
+                _START_MONTH_MEMO[val] = hit
+        return hit
+    except Exception as e:
+        logging.warning(f"Failed to normalize Start Month '{val}': {e}")
+        return UNKNOWN_START_MONTH
+
+# Memo of normalize_start_month's string path, so each distinct label is parsed (and warned about) once.
+# Bounded by count rather than LRU: the first labels seen (matrix labels, warm-up) are the ones that recur.
+_START_MONTH_MEMO: Dict[str, str] = {}
+_START_MONTH_MEMO_SIZE = 4096
+
+def cached_start_month(val: Any) -> Optional[str]:
+    """normalize_start_month(val) if it is already memoized (a dict lookup), else None."""
+    return _START_MONTH_MEMO.get(val) if isinstance(val, str) else None
+
+def _normalize_start_month_str(val: str) -> str:
+    """String path of normalize_start_month."""
+    try:
         val = val.strip()
+        if val == UNKNOWN_START_MONTH:
+            return UNKNOWN_START_MONTH  # already normalized; stripping "Start" would make it unparseable
         val = re.sub(r"\bstart\b", "", val, flags=re.IGNORECASE).strip()
         val = re.sub(r"[^\w\s/-]", "", val).strip()
         for fmt in ["%B %Y", "%b %Y", "%m/%d/%Y", "%Y-%m-%d"]:
@@ -45,7 +74,14 @@ def normalize_start_month(val) -> str:
         return parsed.strftime("%B %Y")
     except Exception as e:
         logging.warning(f"Failed to normalize Start Month '{val}': {e}")
-        return "Unknown Start Month"
+        return UNKNOWN_START_MONTH
+
+def normalize_start_month_series(s: pd.Series) -> pd.Series:
+    """Vectorized normalize_start_month: parse each distinct value once and map the results back."""
+    codes, uniques = pd.factorize(s)
+    # code -1 (missing) picks the trailing UNKNOWN_START_MONTH entry
+    normalized = np.array([normalize_start_month(u) for u in uniques] + [UNKNOWN_START_MONTH], dtype=object)
+    return pd.Series(normalized[codes], index=s.index, name=s.name)
     
 def normalize_utility(val: str) -> str:
     try:
@@ -89,31 +125,121 @@ def find_start_month_column(df):
             return col
     return None
 
+# --- Composite-key row index (built once per refresh) ---
+PRICING_KEY_COLUMNS = ["Start Month", "Utility", "Congestion Zone", "Load Factor"]
+
+def build_row_index(df: pd.DataFrame, key_cols: List[str] = PRICING_KEY_COLUMNS) -> Tuple[pd.DataFrame, Dict[Tuple, Tuple[int, int]]]:
+    """Sort df by its (already normalized) key columns and map each key to a [start, stop) row range.
+    Rows keep their original relative order inside a key. Rows with a missing key part are not indexed."""
+    df = df.sort_values(key_cols, kind="stable").reset_index(drop=True)
+    index: Dict[Tuple, Tuple[int, int]] = {}
+    for key, positions in df.groupby(key_cols, sort=False).indices.items():
+        index[key] = (int(positions[0]), int(positions[-1]) + 1)
+    return df, index
+
 # --- ZIP → Zone mapping (cached) ---
-_ZIP_MAP_CACHE: Dict[str, Any] = {"exact": {}, "ranges": [], "prefixes": []}
+# Every rule is compiled into one dense table: table[int(zip5)] is a zone id, zones[id] its name
+# (id 0 = unknown). Compiled tables are cached on disk by map file content so other workers and
+# restarts memory-map them instead of re-parsing. Set ZIP_TABLE_CACHE_DIR="" to disable.
+ZIP_SPACE = 100_000
+ZIP_TABLE_VERSION = 2  # bump when parsing or precedence changes
+ZIP_TABLE_CACHE_DIR = os.getenv("ZIP_TABLE_CACHE_DIR", os.path.join("pricing_data", ".cache", "zipmap"))
+
+def _empty_zip_map() -> Dict[str, Any]:
+    return {"table": np.zeros(ZIP_SPACE, dtype=np.uint8), "zones": [None],
+            "counts": {"exact": 0, "ranges": 0, "prefixes": 0}}
+
+_ZIP_MAP_CACHE: Dict[str, Any] = _empty_zip_map()
 _ZIP_MAP_LOADED = False
 _ZIP_MAP_PATH_ACTUAL: Optional[str] = None
 
-def _coerce_zone(v) -> Optional[str]:
-    if v is None: 
-        return None
-    if isinstance(v, float) and pd.isna(v): 
+def _compile_ranges(ranges: List[Tuple[int, int, str]]) -> Tuple[List[int], List[int], List[str]]:
+    """Flatten (start, end, zone) ranges, sorted by (start, end), into disjoint segments.
+    Where ranges overlap, the earlier one in that order keeps the shared ZIPs, as the linear scan did."""
+    starts: List[int] = []
+    ends: List[int] = []
+    zones: List[str] = []
+    covered = -1  # highest ZIP claimed by an earlier range
+    overlaps = 0
+    for a, b, zone in ranges:
+        if a <= covered:
+            overlaps += 1
+            if overlaps <= 5:
+                logging.warning(f"ZIP range {a:05d}-{b:05d} ({zone}) overlaps an earlier range; ZIPs up to {min(b, covered):05d} keep the earlier zone")
+        lo = max(a, covered + 1)
+        if lo <= b:
+            if zones and zones[-1] == zone and ends[-1] == lo - 1:
+                ends[-1] = b  # adjacent segment of the same zone
+            else:
+                starts.append(lo)
+                ends.append(b)
+                zones.append(zone)
+        covered = max(covered, b)
+    if overlaps:
+        logging.warning(f"ZIP map has {overlaps} overlapping ranges")
+    return starts, ends, zones
+
+def _compile_zip_table(exact: Dict[str, str], ranges: List[Tuple[int, int, str]], prefixes: List[Tuple[str, str]]) -> Tuple[np.ndarray, List[Optional[str]]]:
+    """Dense ZIP -> zone id table with the rules' precedence: exact beats ranges (the earlier range wins
+    where they overlap), ranges beat prefixes, a longer prefix beats a shorter one and the first rule
+    for a given prefix wins. Filled lowest precedence first so each layer overwrites the one below."""
+    zones: List[Optional[str]] = [None]
+    ids: Dict[str, int] = {}
+
+    def zone_id(zone: str) -> int:
+        if zone not in ids:
+            ids[zone] = len(zones)
+            zones.append(zone)
+        return ids[zone]
+
+    table = np.zeros(ZIP_SPACE, dtype=np.uint32)
+    first_rule: Dict[str, str] = {}
+    for prefix, zone in prefixes:
+        first_rule.setdefault(prefix, zone)
+    for prefix in sorted(first_rule, key=len):  # shorter prefixes first
+        if len(prefix) <= 5:
+            span = 10 ** (5 - len(prefix))
+            lo = int(prefix) * span
+            table[lo:lo + span] = zone_id(first_rule[prefix])
+    for start, end, zone in zip(*_compile_ranges(ranges)):
+        table[start:end + 1] = zone_id(zone)
+    for z, zone in exact.items():
+        table[int(z)] = zone_id(zone)
+    dtype = np.uint8 if len(zones) <= 1 << 8 else np.uint16 if len(zones) <= 1 << 16 else np.uint32
+    return table.astype(dtype), zones
+
+def _zip_table_key(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return f"v{ZIP_TABLE_VERSION}-{h.hexdigest()[:32]}"
+
+def _load_zip_table(key: str) -> Optional[Dict[str, Any]]:
+    if not ZIP_TABLE_CACHE_DIR:
         return None
-    try: 
-        return normalize_zone(str(v))
-    except Exception: 
+    base = os.path.join(ZIP_TABLE_CACHE_DIR, key)
+    if not (os.path.isfile(base + ".npy") and os.path.isfile(base + ".json")):
         return None
+    with open(base + ".json", encoding="utf-8") as f:
+        meta = json.load(f)
+    return {"table": np.load(base + ".npy", mmap_mode="r"), "zones": meta["zones"], "counts": meta["counts"]}
 
-def _norm_zip_str(z: Any) -> str:
-    digits = "".join(ch for ch in str(z) if ch.isdigit())
-    return digits[:5].zfill(5) if digits else ""
-
-def _to_int_zip(z: Any) -> int:
+def _save_zip_table(key: str, zip_map: Dict[str, Any]) -> None:
+    if not ZIP_TABLE_CACHE_DIR:
+        return
     try:
-        return int(_norm_zip_str(z))
-    except Exception:
-        return -1
-    
+        os.makedirs(ZIP_TABLE_CACHE_DIR, exist_ok=True)
+        base = os.path.join(ZIP_TABLE_CACHE_DIR, key)
+        with open(base + ".json.tmp", "w", encoding="utf-8") as f:
+            json.dump({"zones": zip_map["zones"], "counts": zip_map["counts"]}, f)
+        os.replace(base + ".json.tmp", base + ".json")
+        with open(base + ".npy.tmp", "wb") as f:
+            np.save(f, zip_map["table"])
+        os.replace(base + ".npy.tmp", base + ".npy")  # written last: its presence marks a complete entry
+    except OSError as e:
+        logging.warning(f"Failed to cache compiled ZIP table {key}: {e}")
+
 _HEADER_ALIASES: Dict[str, List[str]] = {
     "zip": [
         "zip","zipcode","zip_code","postal","postalcode","zip5","5-digit zip",
@@ -138,24 +264,38 @@ def _match_header(headers_std: Dict[str, str], logical: str) -> Optional[str]:
             return headers_std[probe_std]
     return None
 
-def _iter_rows_csv(path: str):
-    with open(path, newline="", encoding="utf-8") as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            yield { (k or "").strip(): v for k, v in (row or {}).items() }
+def _as_str_column(values) -> pd.Series:
+    """Cell values as str, with "" for blank cells."""
+    s = pd.Series(values, dtype=object)
+    if all(type(v) is str for v in values):
+        return s
+    blank = s.isna() | (s == "")
+    return s.astype(str).where(~blank, "")
 
-def _iter_rows_xlsx(path: str):
-    df = pd.read_excel(path, sheet_name=0, dtype=str, engine="openpyxl")
-    df = df.where(pd.notnull(df), None)
-    for _, row in df.iterrows():
-        yield { str(k): (None if v is None else str(v)) for k, v in row.to_dict().items() }
+def _digits(s: pd.Series) -> pd.Series:
+    return s.str.replace(r"\D", "", regex=True)
 
-def _iter_rows(path: str):
+def _read_zip_map_columns(path: str) -> Tuple[Dict[str, pd.Series], int]:
+    """({header: str column}, row count) without materializing a dict per row. Headers are stripped;
+    when a header repeats, a CSV keeps its last column (like csv.DictReader) and an XLSX its first."""
     ext = os.path.splitext(path)[1].lower()
     if ext in (".xlsx", ".xls"):
-        yield from _iter_rows_xlsx(path)
+        rows = read_sheet(path, 0)
+        keep_last = False
     else:
-        yield from _iter_rows_csv(path)
+        with open(path, newline="", encoding="utf-8") as f:
+            rows = [row for row in csv.reader(f) if row]  # DictReader skips empty lines too
+        keep_last = True
+    if len(rows) < 2:
+        return {}, 0
+    header = [str(h).strip() for h in rows[0]]
+    width = len(header)
+    body = [row[:width] + [""] * (width - len(row)) if len(row) != width else row for row in rows[1:]]
+    columns: Dict[str, pd.Series] = {}
+    for name, values in zip(header, zip(*body)):
+        if keep_last or name not in columns:
+            columns[name] = _as_str_column(values)
+    return columns, len(body)
 
 def _resolve_zip_map_path() -> Optional[str]:
     path = os.getenv("ZIP_MAP_PATH")
@@ -166,96 +306,94 @@ def _resolve_zip_map_path() -> Optional[str]:
 def load_zip_zone_map(force: bool = False) -> Dict[str, Any]:
     """Loads XLSX with columns Zip, Zone. Cached. Environment override: ZIP_MAP_PATH."""
     global _ZIP_MAP_CACHE, _ZIP_MAP_LOADED, _ZIP_MAP_PATH_ACTUAL
-    if _ZIP_MAP_LOADED and not force and any(_ZIP_MAP_CACHE.values()):
+    if _ZIP_MAP_LOADED and not force and any(_ZIP_MAP_CACHE["counts"].values()):
         return _ZIP_MAP_CACHE
     
     path = _resolve_zip_map_path()
     if not path:
         logging.warning("Zip map file not found (set ZIP_MAP_PATH or place ZipCodeMap.xlsx/.csv in pricing_data/)")
-        _ZIP_MAP_CACHE = {"exact": {}, "ranges": [], "prefixes": []}
+        _ZIP_MAP_CACHE = _empty_zip_map()
         _ZIP_MAP_LOADED = True
         _ZIP_MAP_PATH_ACTUAL = None
         return _ZIP_MAP_CACHE
 
-    exact: Dict[str, str] = {}
-    ranges: List[Tuple[int, int, str]] = []
-    prefixes: List[Tuple[str, str]] = []
+    try:
+        table_key = _zip_table_key(path)
+        cached = _load_zip_table(table_key)
+    except Exception as e:
+        logging.warning(f"Compiled ZIP table cache unreadable, re-parsing {path}: {e}")
+        table_key, cached = None, None
+    if cached is not None:
+        _ZIP_MAP_CACHE = cached
+        _ZIP_MAP_LOADED = True
+        _ZIP_MAP_PATH_ACTUAL = path
+        logging.info(f"ZIP map table for {path} loaded from cache ({len(cached['zones']) - 1} zones)")
+        return _ZIP_MAP_CACHE
 
-    parsed_exact = parsed_ranges = parsed_prefix = 0
     skipped_no_zip = skipped_no_zone = skipped_malformed = 0
 
     try:
-        rows = list(_iter_rows(path))
-        if not rows:
-            _ZIP_MAP_CACHE = {"exact": {}, "ranges": [], "prefixes": []}
+        columns, n_rows = _read_zip_map_columns(path)
+        if not n_rows:
+            _ZIP_MAP_CACHE = _empty_zip_map()
             _ZIP_MAP_LOADED = True
             _ZIP_MAP_PATH_ACTUAL = path
             logging.info("ZIP map is empty.")
             return _ZIP_MAP_CACHE
 
-        headers_std = _standardize_headers(list(rows[0].keys()))
-        zip_col    = _match_header(headers_std, "zip")
-        zone_col   = _match_header(headers_std, "zone")
-        from_col   = _match_header(headers_std, "fromzip")
-        to_col     = _match_header(headers_std, "tozip")
-        pref_col   = _match_header(headers_std, "prefix")
-
-        for row in rows:
-            # Column values (if columns exist)
-            z_raw   = row.get(zip_col)  if zip_col  else None
-            zn_raw  = row.get(zone_col) if zone_col else None
-            a_raw   = row.get(from_col) if from_col else None
-            b_raw   = row.get(to_col)   if to_col   else None
-            p_raw   = row.get(pref_col) if pref_col else None
-
-            # 1) Exact only if a Zip value is present
-            if z_raw is not None and str(z_raw).strip() != "":
-                z  = _norm_zip_str(z_raw)
-                zn = _coerce_zone(zn_raw)
-                if not z:
-                    skipped_no_zip += 1
-                elif not zn:
-                    skipped_no_zone += 1
-                else:
-                    exact[z] = zn
-                    parsed_exact += 1
-                continue  # handled exact path
-
-            # 2) Range: require FromZip, ToZip, Zone
-            if a_raw and b_raw and zn_raw:
-                zn2 = _coerce_zone(zn_raw)
-                a, b = _to_int_zip(a_raw), _to_int_zip(b_raw)
-                if zn2 and a != -1 and b != -1 and a <= b:
-                    ranges.append((a, b, zn2))
-                    parsed_ranges += 1
-                    continue
-                else:
-                    skipped_malformed += 1
-                    continue
-
-            # 3) Prefix: require Prefix, Zone
-            if p_raw and zn_raw:
-                zn3 = _coerce_zone(zn_raw)
-                p = "".join(ch for ch in str(p_raw) if ch.isdigit())
-                if zn3 and p:
-                    prefixes.append((p, zn3))
-                    parsed_prefix += 1
-                    continue
-                else:
-                    skipped_malformed += 1
-                    continue
-
-            # 4) Nothing matched
-            # if a row has only zone and no zip/from/to/prefix, it's incomplete
-            if zn_raw and not (a_raw or b_raw or p_raw or z_raw):
-                skipped_no_zip += 1
-            else:
-                skipped_malformed += 1
+        headers_std = _standardize_headers(list(columns))
+        blank = pd.Series([""] * n_rows, dtype=object)
+
+        def column(logical: str) -> pd.Series:
+            name = _match_header(headers_std, logical)
+            return columns[name].reset_index(drop=True) if name else blank
+
+        z_raw, zn_raw = column("zip"), column("zone")
+        a_raw, b_raw, p_raw = column("fromzip"), column("tozip"), column("prefix")
+        # Zones repeat heavily: normalize each distinct value once
+        zone = zn_raw.map({v: v.strip().upper() for v in zn_raw.unique()})
+        has_zone = zone != ""
+
+        # 1) Exact only if a Zip value is present
+        is_exact = z_raw != ""
+        is_exact[is_exact] = z_raw[is_exact].str.strip() != ""
+        z_digits = _digits(z_raw[is_exact])
+        has_digits = z_digits != ""
+        ok = has_digits & has_zone[is_exact]
+        exact = dict(zip(z_digits[ok].str[:5].str.zfill(5), zone[is_exact][ok]))  # later rows win
+        skipped_no_zip += int((~has_digits).sum())
+        skipped_no_zone += int((has_digits & ~ok).sum())
+
+        # 2) Range: require FromZip, ToZip, Zone
+        is_range = ~is_exact & (a_raw != "") & (b_raw != "") & (zn_raw != "")
+        a = pd.to_numeric(_digits(a_raw[is_range]).str[:5].mask(lambda s: s == ""), errors="coerce")
+        b = pd.to_numeric(_digits(b_raw[is_range]).str[:5].mask(lambda s: s == ""), errors="coerce")
+        ok = has_zone[is_range] & a.notna() & b.notna() & (a <= b)
+        ranges = list(zip(a[ok].astype(int).tolist(), b[ok].astype(int).tolist(), zone[is_range][ok].tolist()))
+        skipped_malformed += int((~ok).sum())
+
+        # 3) Prefix: require Prefix, Zone
+        is_prefix = ~is_exact & ~is_range & (p_raw != "") & (zn_raw != "")
+        p_digits = _digits(p_raw[is_prefix])
+        ok = has_zone[is_prefix] & (p_digits != "")
+        prefixes = list(zip(p_digits[ok].tolist(), zone[is_prefix][ok].tolist()))
+        skipped_malformed += int((~ok).sum())
+
+        # 4) Nothing matched
+        # if a row has only zone and no zip/from/to/prefix, it's incomplete
+        rest = ~is_exact & ~is_range & ~is_prefix
+        zone_only = (zn_raw != "") & (a_raw == "") & (b_raw == "") & (p_raw == "") & (z_raw == "")
+        skipped_no_zip += int((rest & zone_only).sum())
+        skipped_malformed += int((rest & ~zone_only).sum())
 
         ranges.sort(key=lambda x: (x[0], x[1]))
         prefixes.sort(key=lambda x: len(x[0]), reverse=True)
 
-        _ZIP_MAP_CACHE = {"exact": exact, "ranges": ranges, "prefixes": prefixes}
+        table, zones = _compile_zip_table(exact, ranges, prefixes)
+        _ZIP_MAP_CACHE = {"table": table, "zones": zones,
+                          "counts": {"exact": len(exact), "ranges": len(ranges), "prefixes": len(prefixes)}}
+        if table_key:
+            _save_zip_table(table_key, _ZIP_MAP_CACHE)
         _ZIP_MAP_LOADED = True
         _ZIP_MAP_PATH_ACTUAL = path
         logging.info(
@@ -266,7 +404,7 @@ def load_zip_zone_map(force: bool = False) -> Dict[str, Any]:
         return _ZIP_MAP_CACHE
     except Exception as e:
         logging.exception(f"Failed to load ZIP map from {path}: {e}")
-        _ZIP_MAP_CACHE = {"exact": {}, "ranges": [], "prefixes": []}
+        _ZIP_MAP_CACHE = _empty_zip_map()
         _ZIP_MAP_LOADED = True
         _ZIP_MAP_PATH_ACTUAL = path
         return _ZIP_MAP_CACHE
@@ -308,6 +446,10 @@ def load_zip_zone_map(force: bool = False) -> Dict[str, Any]:
     #logging.warning("No ZIP map found; ZIP→Zone resolution will return None.")
     #return _ZIP_ZONE_MAP
 
+def zip_map_loaded() -> bool:
+    """True once the ZIP map is in memory, i.e. zip_to_zone no longer reads a file."""
+    return _ZIP_MAP_LOADED
+
 def zip_to_zone(zipcode: Optional[str]) -> Optional[str]:
     if not _ZIP_MAP_LOADED:
         load_zip_zone_map()
@@ -315,40 +457,57 @@ def zip_to_zone(zipcode: Optional[str]) -> Optional[str]:
     if not z5:
         return None
     cache = _ZIP_MAP_CACHE
-    if z5 in cache["exact"]:
-        return cache["exact"][z5]
-    zi = int(z5)
-    for a, b, zone in cache["ranges"]:
-        if a <= zi <= b:
-            return zone
-    for pref, zone in cache["prefixes"]:
-        if z5.startswith(pref):
-            return zone
-    return None
+    return cache["zones"][cache["table"][int(z5)]]
+
+def resolve_zips(zipcodes: List[Optional[str]]) -> Tuple[List[Optional[str]], List[Optional[str]]]:
+    """(normalized 5-digit ZIP, zone) for each input; the ZIP is None when malformed, the zone when unmapped.
+    Each distinct ZIP is normalized once, then all are looked up in one gather."""
+    if not _ZIP_MAP_LOADED:
+        load_zip_zone_map()
+    cache = _ZIP_MAP_CACHE
+    codes: Dict[Optional[str], int] = {}
+    for z in zipcodes:
+        if z not in codes:
+            z5 = normalize_zip(z)
+            codes[z] = int(z5) if z5 else -1
+    ints = np.fromiter((codes[z] for z in zipcodes), dtype=np.int64, count=len(zipcodes))
+    ids = np.where(ints >= 0, cache["table"][np.maximum(ints, 0)], 0)
+    zones = cache["zones"]
+    return [f"{i:05d}" if i >= 0 else None for i in ints.tolist()], [zones[i] for i in ids.tolist()]
+
+def zips_to_zones(zipcodes: List[Optional[str]]) -> List[Optional[str]]:
+    """Bulk zip_to_zone."""
+    return resolve_zips(zipcodes)[1]
+
+def sample_zips_by_zone(per_zone: int = 100) -> Dict[str, List[str]]:
+    """Up to per_zone ZIPs (lowest first) that resolve to each zone, read straight off the ZIP table."""
+    if not _ZIP_MAP_LOADED:
+        load_zip_zone_map()
+    table, zones = _ZIP_MAP_CACHE["table"], _ZIP_MAP_CACHE["zones"]
+    return {zone: [f"{z:05d}" for z in np.flatnonzero(table == i)[:per_zone].tolist()] for i, zone in enumerate(zones) if i}
 
 def zip_map_status() -> Dict[str, Any]:
     """For debugging in an endpoint."""
     return {
         "path": _ZIP_MAP_PATH_ACTUAL,
         "loaded": _ZIP_MAP_LOADED,
-        "counts": {
-            "exact": len(_ZIP_MAP_CACHE.get("exact", {})),
-            "ranges": len(_ZIP_MAP_CACHE.get("ranges", [])),
-            "prefixes": len(_ZIP_MAP_CACHE.get("prefixes", [])),
-        }
+        "counts": dict(_ZIP_MAP_CACHE["counts"]),
+        "zones": len(_ZIP_MAP_CACHE["zones"]) - 1,
+        "table_bytes": int(_ZIP_MAP_CACHE["table"].nbytes),
     }
 
 def zip_map_peek(max_rows: int = 10) -> Dict[str, Any]:
-    """Inspect the active file: headers + first rows (for debugging)."""
+    """Inspect the active file: headers + first rows (for debugging).
+    Only the header and max_rows rows are read, so the cost does not grow with the map."""
     path = _resolve_zip_map_path()
     if not path:
         return {"path": None, "error": "file not found"}
     ext = os.path.splitext(path)[1].lower()
     if ext in (".xlsx", ".xls"):
-        df = pd.read_excel(path, sheet_name=0, dtype=str, engine="openpyxl")
+        df = sheet_frame(read_sheet(path, 0, max_rows=max_rows + 1), header=0, dtype=str)
     else:
-        df = pd.read_csv(path, dtype=str)
-    df = df.where(pd.notnull(df), None)
+        df = pd.read_csv(path, dtype=str, nrows=max_rows)
+    df = df.astype(object).where(pd.notnull(df), None)  # str columns would turn None back into NaN
     cols = list(map(str, df.columns.tolist()))
     head = df.head(max_rows).to_dict(orient="records")
     return {"path": path, "columns": cols, "sample": head}
@@ -20,9 +20,14 @@ export async function GET(request: NextRequest) {
   const load_factor = mapLoadFactor(load_factor_param);
 
   try {
+    // Forward the browser's validator so the API can answer 304 for unchanged prices
+    const headers: Record<string, string> = { 'Content-Type': 'application/json' };
+    const ifNoneMatch = request.headers.get('if-none-match');
+    if (ifNoneMatch) headers['If-None-Match'] = ifNoneMatch;
+
     const res = await fetch(`${API_BASE}/get-prices`, {
       method: 'POST',
-      headers: { 'Content-Type': 'application/json' },
+      headers,
       body: JSON.stringify({
         start_month,
         utility,
@@ -32,13 +37,18 @@ export async function GET(request: NextRequest) {
       }),
     });
 
+    const etag = res.headers.get('etag');
+    if (res.status === 304) {
+      return new NextResponse(null, { status: 304, headers: etag ? { ETag: etag } : {} });
+    }
+
     if (!res.ok) {
       const text = await res.text();
       return NextResponse.json({ error: text || 'Pricing API error' }, { status: res.status });
     }
 
     const data = await res.json();
-    return NextResponse.json(data);
+    return NextResponse.json(data, { headers: etag ? { ETag: etag } : {} });
   } catch {
     return NextResponse.json({ error: 'Failed to connect to pricing service' }, { status: 500 });
   }